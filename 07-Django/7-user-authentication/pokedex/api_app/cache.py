@@ -0,0 +1,88 @@
+# api_app/cache.py
+import asyncio
+import hashlib
+import threading
+import time
+from pokedex_proj.cache import pokedex_cache
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def background_loop():
+    # One event loop that lives as long as the process, in a thread of its own.
+    # Under WSGI every request runs on a loop that is closed (and its tasks cancelled)
+    # as soon as the request ends, a refresh started there would never finish
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="upstream-cache", daemon=True).start()
+    return _loop
+
+
+class UpstreamCache:
+    """
+    Caches the answers of an upstream API by key (e.g. the Noun Project icon for
+    a `types` value) in the pokedex cache.
+
+    - found answers are fresh for `ttl` seconds, "not found" answers for `negative_ttl`
+    - after that an entry is still served for up to `stale_ttl` more seconds while
+      ONE background task fetches a new answer (stale-while-revalidate)
+    - concurrent misses for the same key share one upstream call
+
+    Every fetch runs on background_loop(), requests only wait for it, so a refresh
+    outlives the request that started it and requests on any thread share it.
+
+    `fetch` is an async function returning `(status, value)`. Only 200 and 404
+    answers are cached, anything else is returned to the caller as is.
+    """
+
+    CACHED_STATUSES = (200, 404)
+
+    def __init__(self, namespace, ttl, stale_ttl, negative_ttl):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        # key -> the concurrent.futures.Future of the fetch running for it
+        self.pending = {}
+        # reentrant: a fetch that is already over runs done() right in add_done_callback()
+        self.lock = threading.RLock()
+
+    def cache_key(self, key):
+        return f"{self.namespace}:{hashlib.md5(key.encode()).hexdigest()}"
+
+    async def get(self, key, fetch):
+        entry = await pokedex_cache().aget(self.cache_key(key))
+        if entry is not None:
+            if time.time() > entry["fresh_until"]:
+                # answer right away with what we have, refresh it in the background
+                self.refresh(key, fetch)
+            return entry["status"], entry["value"]
+        # shield: a client giving up must not cancel the fetch other requests are waiting on
+        return await asyncio.shield(asyncio.wrap_future(self.refresh(key, fetch)))
+
+    def refresh(self, key, fetch):
+        with self.lock:
+            future = self.pending.get(key)
+            if future is None:
+                future = asyncio.run_coroutine_threadsafe(self.fetch_and_store(key, fetch), background_loop())
+                self.pending[key] = future
+                future.add_done_callback(lambda future: self.done(key, future))
+        return future
+
+    def done(self, key, future):
+        with self.lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+        # a failed background refresh just leaves the stale entry in place
+        future.cancelled() or future.exception()
+
+    async def fetch_and_store(self, key, fetch):
+        status, value = await fetch()
+        if status in self.CACHED_STATUSES:
+            fresh_for = self.ttl if status == 200 else self.negative_ttl
+            entry = {"status": status, "value": value, "fresh_until": time.time() + fresh_for}
+            await pokedex_cache().aset(self.cache_key(key), entry, fresh_for + self.stale_ttl)
+        return status, value
@@ -0,0 +1,46 @@
+# api_app/client.py
+# One pooled async HTTP client for every upstream call. Connections are kept
+# alive instead of opening a new one per call like requests.get() does, and
+# every call has a timeout.
+import asyncio
+import weakref
+import httpx
+from django.conf import settings
+
+UPSTREAM_HTTP = getattr(settings, "UPSTREAM_HTTP", {})
+
+# An httpx.AsyncClient belongs to the event loop it was first used on, so there is
+# one client per loop and it is closed when that loop shuts down.
+# Connections are only pooled between requests under ASGI
+# (uvicorn pokedex_proj.asgi:application), where a process has one loop for all
+# of its requests. Under runserver/WSGI every request runs on a loop of its own:
+# it opens its own connections and they are closed when the request ends.
+_clients = weakref.WeakKeyDictionary()
+
+
+async def close_with_loop(client):
+    # An async generator parked at its `yield` is closed by the loop's
+    # shutdown_asyncgens(), which asyncio.run() (and so asgiref's async_to_sync
+    # under WSGI) runs before closing the loop
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+def get_client():
+    loop = asyncio.get_running_loop()
+    if loop not in _clients:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(UPSTREAM_HTTP.get("TIMEOUT", 5), connect=UPSTREAM_HTTP.get("CONNECT_TIMEOUT", 2)),
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_HTTP.get("MAX_CONNECTIONS", 100),
+                max_keepalive_connections=UPSTREAM_HTTP.get("MAX_KEEPALIVE", 20),
+                keepalive_expiry=UPSTREAM_HTTP.get("KEEPALIVE_EXPIRY", 30),
+            ),
+        )
+        closer = close_with_loop(client)
+        # run it up to its `yield`, the loop keeps track of it from then on
+        loop.create_task(anext(closer))
+        _clients[loop] = (client, closer)
+    return _clients[loop][0]
@@ -1,22 +1,63 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.views import View
+from oauthlib.oauth1 import Client as OAuth1 #<== OAuth1 signs our request with our keys, the same way requests_oauthlib did
+from pokedex_proj.settings import env
+from rest_framework.permissions import IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
-import requests # <== import requests so we can utilize it within our CBV to make API calls
-from requests_oauthlib import OAuth1 #<== import OAuth1 which will essentially authenticate our keys when we send a request
-from pokedex_proj.settings import env
+from .cache import UpstreamCache
+from .upstream import Upstream, UpstreamUnavailable, metrics
 import pprint
 
 pp = pprint.PrettyPrinter(indent=2, depth=2)
 
-class Noun_Project(APIView):
+# Calls to api.thenounproject.com (settings.UPSTREAMS["noun_project"])
+noun_project = Upstream("noun_project")
+
+# Icon preview URLs almost never change, so answers (including "no icon") are cached per `types`
+icon_cache = UpstreamCache(
+    "noun:icon",
+    ttl=settings.NOUN_PROJECT_CACHE["TTL"],
+    stale_ttl=settings.NOUN_PROJECT_CACHE["STALE_TTL"],
+    negative_ttl=settings.NOUN_PROJECT_CACHE["NEGATIVE_TTL"],
+)
+
+async def fetch_icon(types):
+    # let's grab this body from the `get started` documentation from the NounAPI 
+    auth = OAuth1(env.get("API_KEY") or "", client_secret=env.get("SECRET_KEY") or "")
+    endpoint = f"{settings.NOUN_PROJECT_URL}/icon/{types}"
+    endpoint, headers, _ = auth.sign(endpoint)
+
+    # just like axios we `await` the response. noun_project adds the timeout, retries and circuit breaker
+    status, responseJSON = await noun_project.get_json(endpoint, headers=headers)
+    if status != 200:
+        return status, None
+    # pp.pprint(responseJSON)
+    # print(responseJSON['icon']['preview_url'])
+    return status, responseJSON['icon']['preview_url']
+
+# This view is async: while we wait for the NounAPI the worker can keep serving other
+# requests (run the project with an ASGI server, e.g. `uvicorn pokedex_proj.asgi:application`).
+# DRF's APIView can't run async methods so we use Django's View and JsonResponse
+class Noun_Project(View):
     # In our CBV lets create a method to interact with the NounAPI
-    def get(self, request, types):
-        # let's grab this body from the `get started` documentation from the NounAPI 
-        auth = OAuth1(env.get("API_KEY"), env.get("SECRET_KEY")) #<== for now place your corresponding keys here
-        endpoint = f"http://api.thenounproject.com/icon/{types}"
-
-        response = requests.get(endpoint, auth=auth) # notice with axios we had to wait for the promise to be completed, with requests it know to pause the program and wait until it receives a response
-        # print(response.content) # we can see that the content within this response comes back as a binary string lets fix that
-        responseJSON = response.json() # by calling the .json() method we are turning this request into a Python Dictionary that we can manipulate
-        # pp.pprint(responseJSON)
-        # print(responseJSON['icon']['preview_url'])
-        return Response(responseJSON['icon']['preview_url'])
\ No newline at end of file
+    async def get(self, request, types):
+        try:
+            status, preview_url = await icon_cache.get(types, lambda: fetch_icon(types))
+        except UpstreamUnavailable:
+            # timed out / kept failing / circuit open, and we have no earlier answer to fall back on
+            return JsonResponse("The Noun Project is unavailable", status=503, safe=False)
+        if status == 404:
+            return JsonResponse(f"No icon found for {types}", status=404, safe=False)
+        if status != 200:
+            return JsonResponse("The Noun Project is unavailable", status=502, safe=False)
+        return JsonResponse(preview_url, safe=False)
+
+class Upstream_metrics(APIView):
+    # Circuit state and call/retry/failure counters of every third-party API this process talks to
+    # (staff only: it shows which APIs we depend on and how they are doing)
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics())
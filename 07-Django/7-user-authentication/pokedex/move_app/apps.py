@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MoveAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'move_app'
+
+    def ready(self):
+        # registers the cache invalidation receivers
+        from . import signals
@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-18 16:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('move_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='move',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
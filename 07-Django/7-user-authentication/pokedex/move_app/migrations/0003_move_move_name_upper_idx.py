@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 15:49
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('move_app', '0002_move_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='move',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='move_name_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0 on 2026-10-18 15:52
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+from pokedex_proj.operations import AddPostgresIndex, CreateExtensionIfAvailable
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('move_app', '0003_move_move_name_upper_idx'),
+    ]
+
+    # GIN indexes only exist on Postgres, on other databases these only update the migration state
+    operations = [
+        CreateExtensionIfAvailable('pg_trgm'),
+        AddPostgresIndex(
+            model_name='move',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', config='english'), name='move_search_idx'),
+        ),
+        AddPostgresIndex(
+            model_name='move',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='move_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            extension='pg_trgm',
+        ),
+    ]
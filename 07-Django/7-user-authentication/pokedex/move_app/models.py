@@ -1,6 +1,9 @@
 from django.db import models
 from django.core import validators as v
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from .validators import validate_move_name
 
 # Create your models here.
@@ -17,6 +20,17 @@ class Move(models.Model):
     # We want to know just how much Power each move has
     power = models.PositiveIntegerField(
         default=80, validators=[v.MaxValueValidator(120)])
+    # Stamped on every save (and when the pokemon that know this move change), used for ETags
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # /api/v1/moves/<name>/ looks moves up with name__iexact, i.e. UPPER(name) = UPPER('...')
+            models.Index(Upper("name"), name="move_name_upper_idx"),
+            # /api/v1/moves/search/ (Postgres only)
+            GinIndex(SearchVector("name", config="english"), name="move_search_idx"),
+            GinIndex(fields=["name"], opclasses=["gin_trgm_ops"], name="move_name_trgm_idx"),
+        ]
 
     def __str__(self):
         return f"| {self.name} | accuracy: {self.accuracy} | power: {self.power} | current_pp: {self.pp}/20|"
\ No newline at end of file
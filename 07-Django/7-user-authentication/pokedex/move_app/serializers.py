@@ -1,6 +1,8 @@
 #move_app/serializers.py
 from rest_framework import serializers
 from .models import Move
+from pokemon_app.models import Pokemon
+from pokedex_proj.values import ValuesSerializer
 
 class MoveSerializer(serializers.ModelSerializer):
     pokemon = serializers.SerializerMethodField()
@@ -9,7 +11,19 @@ class MoveSerializer(serializers.ModelSerializer):
         model = Move
         fields = ['id', 'name', 'power', 'accuracy', 'pokemon']
 
+    # Loads every Move's pokemon in one batched query instead of one query per Move
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.prefetch_related("pokemon")
+
     def get_pokemon(self, obj):
-        pokemon = obj.pokemon.all()
+        # by id, like PokemonSerializer.get_moves
+        pokemon = sorted(obj.pokemon.all(), key=lambda pokemon: pokemon.id)
         pokemon = [x.name for x in pokemon]
-        return pokemon
\ No newline at end of file
+        return pokemon
+
+
+class MoveValuesSerializer(ValuesSerializer):
+    # MoveSerializer's output for GET /api/v1/moves/, built from values() rows
+    serializer_class = MoveSerializer
+    related = {"pokemon": (Pokemon, "moves", "name")}
@@ -0,0 +1,24 @@
+# move_app/signals.py
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from pokedex_proj import cache
+from .models import Move
+
+
+@receiver(post_save, sender=Move)
+def move_saved(sender, instance, **kwargs):
+    # Pokemon payloads list their moves by name so every pokemon that knows this move goes stale
+    pokemon_ids = [] if kwargs.get("created") else list(instance.pokemon.values_list("id", flat=True))
+    cache.invalidate("move", [instance.pk])
+    cache.invalidate("pokemon", pokemon_ids)
+
+
+@receiver(pre_delete, sender=Move)
+def move_deleted(sender, instance, **kwargs):
+    pokemon = instance.pokemon.all()
+    pokemon_ids = list(pokemon.values_list("id", flat=True))
+    # the move disappears from their payloads so their ETags have to change
+    pokemon.update(updated_at=timezone.now())
+    cache.invalidate("move", [instance.pk])
+    cache.invalidate("pokemon", pokemon_ids)
@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import All_moves, A_move
+from .views import All_moves, A_move, Move_export, Move_search
 
 urlpatterns = [
     path("", All_moves.as_view(), name="all_moves"),
+    path("export/", Move_export.as_view(), name="move_export"),
+    path("search/", Move_search.as_view(), name="move_search"),
     path("<str:name>/", A_move.as_view(), name="a_move"),
 ]
@@ -1,9 +1,12 @@
 from django.core.exceptions import ValidationError
 import re
 
+# compiled once, not on every call
+MOVE_NAME_PATTERN = re.compile(r"^[a-zA-Z]+ ?[a-zA-Z]+$")
+MOVE_NAME_ERROR = "Improper Format"
+
 def validate_move_name(name):
-    regex = r"^[a-zA-Z]+ ?[a-zA-Z]+$"
-    good_name = re.match(regex, name)
+    good_name = MOVE_NAME_PATTERN.match(name)
     if good_name:
         return name
-    raise ValidationError("Improper Format")
\ No newline at end of file
+    raise ValidationError(MOVE_NAME_ERROR)
@@ -1,18 +1,82 @@
 from .models import Move
-from .serializers import MoveSerializer
+from .serializers import MoveSerializer, MoveValuesSerializer
+from pokedex_proj.pagination import MovePagination
+from pokedex_proj.streaming import is_asgi, stream_queryset, wants_ndjson
+from pokedex_proj.search import search_response
+from pokedex_proj import cache
+from pokedex_proj.etags import make_etag
+from django.db.models import Count, Max
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
 
+# Cheap "has anything changed?" checks used for ETag / If-None-Match, cached next to the payloads
+def move_etag(queryset):
+    stamps = queryset.aggregate(
+        count=Count("id", distinct=True), last_id=Max("id"), updated=Max("updated_at"), pokemon=Max("pokemon__updated_at")
+    )
+    if not stamps["count"]:
+        return None
+    return make_etag("move", stamps["count"], stamps["last_id"], stamps["updated"], stamps["pokemon"])
+
+def all_moves_etag(request):
+    return cache.cached_list("move", request, lambda: move_etag(Move.objects.all()), part="etag")
+
+def a_move_etag(request, name):
+    pk = cache.lookup_name("move", name)
+    if pk is None:
+        return move_etag(Move.objects.filter(name__iexact = name))
+    return cache.cached_detail("move", pk, lambda: move_etag(Move.objects.filter(id = pk)), part="etag")
+
 # Create a view that utilizes APIView to inherit DRF's built in functionality
 class All_moves(APIView):
     # establish a get method that will be triggered by GET requests
+    @method_decorator(condition(etag_func=all_moves_etag))
+    def get(self, request):
+        moves = cache.cached_list("move", request, lambda: self.serialize_list(request))
+        return Response(moves)
+
+    def serialize_list(self, request):
+        # MoveSerializer's output built from values() rows plus one query for every move's pokemon
+        queryset = MoveValuesSerializer.values(Move.objects.order_by('id'))
+        paginator = MovePagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(MoveValuesSerializer(page).data).data
+        return MoveValuesSerializer(queryset).data
+
+# Streams every move as a JSON array (or NDJSON with ?ndjson=1) without loading the table into memory
+class Move_export(APIView):
     def get(self, request):
-        # utilize your ModelSerializer to serialize your queryset and return a proper response with DRF's Response
-        moves = MoveSerializer(Move.objects.all(), many=True)
-        return Response(moves.data)
-    
+        queryset = MoveSerializer.setup_eager_loading(Move.objects.order_by('id'))
+        return stream_queryset(queryset, MoveSerializer, ndjson=wants_ndjson(request), asynchronous=is_asgi(request))
+
+# GET /api/v1/moves/search/?q=thunder -> ranked, paginated moves matching by name
+class Move_search(APIView):
+    def get(self, request):
+        return search_response(request, Move.objects.all(), MoveSerializer, ["name"], view=self)
+
 class A_move(APIView):
+    def get_cached_move(self, pk):
+        return cache.cached_detail("move", pk, lambda: MoveSerializer(get_object_or_404(Move, id = pk)).data)
+
+    @method_decorator(condition(etag_func=a_move_etag))
     def get(self, request, name):
-        move = Move.objects.get(name = name.title())
-        return Response(MoveSerializer(move).data)
+        # name -> id is cached, the payload is cached by id and checked against the requested name
+        pk = cache.lookup_name("move", name)
+        if pk is not None:
+            try:
+                move = self.get_cached_move(pk)
+                if move["name"].lower() == name.lower():
+                    return Response(move)
+            except Http404:
+                pass
+        # case-insensitive lookup served by the move_name_upper_idx index, unknown names are a 404
+        pk = get_object_or_404(Move, name__iexact = name).pk
+        cache.remember_name("move", name, pk)
+        return Response(self.get_cached_move(pk))
+
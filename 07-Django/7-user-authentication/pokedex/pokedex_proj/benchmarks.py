@@ -0,0 +1,66 @@
+# pokedex_proj/benchmarks.py
+# Small helpers shared by the `bench_*` management commands. Every benchmark seeds
+# its rows inside a transaction that is rolled back at the end, so they can be run
+# against a development database without leaving anything behind.
+import re
+import string
+import time
+from django.db import connection
+
+
+def fake_name(number):
+    # 0 -> "Aaaaa", 1 -> "Aaaab", ... always matches validate_name's ^[A-Z][a-z]*$
+    letters = []
+    for _ in range(5):
+        number, remainder = divmod(number, 26)
+        letters.append(string.ascii_lowercase[remainder])
+    return "".join(reversed(letters)).title()
+
+
+def time_calls(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "median_ms": timings[len(timings) // 2],
+        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "calls": repeat,
+    }
+
+
+def report(stdout, label, stats):
+    stdout.write(f"{label:<45} median {stats['median_ms']:8.3f} ms   p99 {stats['p99_ms']:8.3f} ms   ({stats['calls']} calls)")
+
+
+def analyze(*tables):
+    # fresh planner statistics so EXPLAIN picks the plan production would
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(f"ANALYZE {table}")
+
+
+def full_scans(plan, table):
+    # EXPLAIN lines that read every row of `table` ("Seq Scan on ..." on Postgres,
+    # a bare "SCAN table" without "USING INDEX" on SQLite)
+    return [
+        line.strip() for line in plan.splitlines()
+        if f"Seq Scan on {table}" in line or (line.strip().endswith(f"SCAN {table}"))
+    ]
+
+
+def unbounded_seek(plan, column):
+    # EXPLAIN lines showing a keyset page doesn't start right at its cursor: Postgres has to
+    # seek with `column` in an "Index Cond:", a "Filter:" on it means rows before the cursor
+    # are read and thrown away. SQLite has to SEARCH an index on it
+    word = re.compile(rf"\b{column}\b")
+    lines = [line.strip() for line in plan.splitlines()]
+    filtered = [line for line in lines if line.startswith("Filter:") and word.search(line)]
+    bounded = any(
+        (line.startswith("Index Cond:") and word.search(line)) or ("SEARCH " in line and f"({column}" in line)
+        for line in lines
+    )
+    return filtered + ([] if bounded else [f"no index condition on {column}"])
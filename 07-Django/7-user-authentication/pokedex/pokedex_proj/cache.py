@@ -0,0 +1,82 @@
+# pokedex_proj/cache.py
+import hashlib
+from uuid import uuid4
+from django.core.cache import caches
+from django.db import transaction
+
+
+# Which entry of settings.CACHES holds serialized pokedex payloads
+CACHE_ALIAS = "pokedex"
+# Per-key TTLs (seconds). Writes invalidate entries right away, these only bound
+# how long an entry nobody writes to can sit in the cache
+LIST_TIMEOUT = 60
+DETAIL_TIMEOUT = 300
+NAME_TIMEOUT = 60 * 60
+
+
+def pokedex_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version(cache, group):
+    # Every group of entries ("pokemon:list", "pokemon:4", ...) is stored under a
+    # random version token. Invalidating a group just deletes its token, so a
+    # reader that started building a payload before a write can never publish
+    # it under the token that readers after the write will use.
+    key = f"{group}:version"
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_or_build(group, suffix, build, timeout):
+    cache = pokedex_cache()
+    key = f"{group}:{_version(cache, group)}:{suffix}"
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout)
+    return data
+
+
+def cached_list(namespace, request, build, part="payload"):
+    # query strings (cursor/page_size) and the host used for next/previous links are part of the key
+    suffix = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return get_or_build(f"{namespace}:list", f"{part}:{suffix}", build, LIST_TIMEOUT)
+
+
+def cached_detail(namespace, pk, build, part="payload"):
+    # `part` lets several values (the payload, its ETag) share one invalidation group
+    return get_or_build(f"{namespace}:{pk}", part, build, DETAIL_TIMEOUT)
+
+
+def lookup_name(namespace, name):
+    return pokedex_cache().get(f"{namespace}:name:{name.lower()}")
+
+
+def remember_name(namespace, name, pk):
+    pokedex_cache().set(f"{namespace}:name:{name.lower()}", pk, NAME_TIMEOUT)
+
+
+def forget_name(namespace, name):
+    pokedex_cache().delete(f"{namespace}:name:{name.lower()}")
+
+
+def invalidate(namespace, pks=(), lists=True):
+    """
+    Drop the cached payloads of `namespace` rows `pks` (and the list pages).
+
+    Runs immediately and once more after the surrounding transaction commits,
+    so a request that read the old rows before the commit can't leave them
+    behind in the cache.
+    """
+    groups = [f"{namespace}:{pk}:version" for pk in pks]
+    if lists:
+        groups.append(f"{namespace}:list:version")
+    if not groups:
+        return
+    pokedex_cache().delete_many(groups)
+    transaction.on_commit(lambda: pokedex_cache().delete_many(groups))
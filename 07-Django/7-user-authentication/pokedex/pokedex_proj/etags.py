@@ -0,0 +1,11 @@
+# pokedex_proj/etags.py
+import hashlib
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag out of the values that decide what a response looks
+    like (row ids, `updated_at` stamps, row counts...).
+    """
+    digest = hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
@@ -0,0 +1,175 @@
+# pokedex_proj/pagination.py
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Field, Func, Q, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def flip(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+class Row(Func):
+    # a row value, `(name, id)`, compared column by column like a tuple
+    template = "(%(expressions)s)"
+    output_field = Field()
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks straight to a page with `WHERE (a, b) > (x, y)`
+    instead of `OFFSET n`, so page 500 costs the same as page 1.
+
+    Pagination is opt-in: a request without `?cursor=` or `?page_size=` gets
+    `None` back from `paginate_queryset` and the view returns its full list.
+    """
+
+    # Columns the keyset is built on ("-level" for descending). The last one must
+    # be unique (usually `id`) so every row has exactly one position. Views can
+    # set `paginator.ordering` per request to match their queryset's order_by()
+    ordering = ("id",)
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            self.cursor_query_param not in request.query_params
+            and self.page_size_query_param not in request.query_params
+        ):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by(*[flip(field) for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.seek(queryset.model, position, reverse))
+            except (ValueError, TypeError, ValidationError):
+                # values that don't fit their column, e.g. a hand-edited cursor
+                raise NotFound(self.invalid_cursor_message)
+
+        # grab one extra row to know whether there is another page after this one
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = (has_more if not reverse else position is not None) and bool(results)
+        self.has_previous = (has_more if reverse else position is not None) and bool(results)
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size < 1:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def seek(self, model, position, reverse):
+        """
+        The rows after `position` in this ordering (before it when `reverse`). The
+        cursor's values are converted by their model fields first, values that don't
+        fit raise ValueError/ValidationError.
+        """
+        fields = [field.lstrip("-") for field in self.ordering]
+        position = [model._meta.get_field(name).to_python(value) for name, value in zip(fields, position)]
+        descending = {field.startswith("-") != reverse for field in self.ordering}
+        if len(descending) == 1:
+            # every column goes the same way: (a, b) > (x, y). The database compares the
+            # rows as a whole, which is one range of the (a, b) index it can seek to
+            lookup = LessThan if descending.pop() else GreaterThan
+            columns = Row(*fields)
+            values = Row(*[Value(value, output_field=model._meta.get_field(name)) for name, value in zip(fields, position)])
+            return lookup(columns, values)
+        # Mixed directions expand (a, b, c) > (x, y, z) into
+        # a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        # (descending columns compare with < instead). The OR chain alone doesn't bound
+        # the first column, so a >= x is ANDed on to give the index a range to start from
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            lookup = "lt" if field.startswith("-") != reverse else "gt"
+            equal = {fields[j]: position[j] for j in range(i)}
+            condition |= Q(**equal, **{f"{fields[i]}__{lookup}": position[i]})
+        first = "lte" if self.ordering[0].startswith("-") != reverse else "gte"
+        return Q(**{f"{fields[0]}__{first}": position[0]}) & condition
+
+    def get_position(self, instance):
+        # pages hold model instances or values() dicts (see pokedex_proj/values.py)
+        if isinstance(instance, dict):
+            return [instance[field.lstrip("-")] for field in self.ordering]
+        return [getattr(instance, field.lstrip("-")) for field in self.ordering]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        # The cursor is opaque to clients: base64 of the last seen keyset values,
+        # the ordering they belong to and the direction to walk from them
+        payload = json.dumps({"p": position, "o": list(self.ordering), "r": reverse}, separators=(",", ":"))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            position, ordering, reverse = payload["p"], payload["o"], bool(payload["r"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        # a cursor from another ?ordering= holds the values of other columns
+        if ordering != list(self.ordering) or not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+
+class PokemonPagination(KeysetPagination):
+    ordering = ("name", "id")
+
+
+class MovePagination(KeysetPagination):
+    ordering = ("id",)
+
+
+class SearchPagination(PageNumberPagination):
+    # Search results are a ranked list of at most MAX_RESULTS ids (see pokedex_proj/search.py),
+    # so plain ?page= numbers are cheap here. Responses look like {"count", "next", "previous", "results"}
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -0,0 +1,71 @@
+# pokedex_proj/renderers.py
+# The JSON renderer/parser behind every DRF view (see REST_FRAMEWORK in settings.py).
+# With orjson installed (`pip install orjson`) bodies are encoded/decoded by orjson,
+# which is several times faster than the stdlib `json` module on big lists. Without
+# it, or for anything orjson handles differently, they fall back to DRF's own
+# JSONRenderer/JSONParser, so the bytes on the wire are the same either way.
+import codecs
+import io
+from django.conf import settings
+from rest_framework import parsers, renderers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Dates, times and datetimes are handed to DRF's encoder (`default`) instead of being
+# formatted by orjson, so they come out exactly like before: "2008-01-01" and
+# "2023-08-22T15:05:52.618249Z" (orjson would write "+00:00" instead of "Z")
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    DRF's JSONRenderer, but encoded with orjson when the output would be the
+    compact UTF-8 JSON DRF renders by default. Pretty printed (`indent=`)
+    responses, ASCII-only settings and values orjson refuses (e.g. integers
+    over 64 bits) go through DRF's json based renderer.
+
+    Floats are where the two can differ: orjson writes 1e16 where json writes
+    1e+16 (the same number once parsed) and NaN/Infinity as null where DRF
+    (STRICT_JSON) raises. None of our models store floats.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # DRF escapes these two line separators so the JSON is also valid JavaScript, so do we
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(parsers.JSONParser):
+    """
+    DRF's JSONParser, decoding UTF-8 bodies with orjson. A body orjson rejects is
+    parsed again by DRF's parser, which either accepts it (huge integers, NaN
+    when STRICT_JSON is off) or raises the same "JSON parse error" as always.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
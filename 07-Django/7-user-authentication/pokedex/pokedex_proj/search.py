@@ -0,0 +1,137 @@
+# pokedex_proj/search.py
+import difflib
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connections, transaction
+from rest_framework.response import Response
+from rest_framework.status import HTTP_400_BAD_REQUEST
+from .pagination import SearchPagination
+
+
+# Never rank more than this many matches for a single search
+MAX_RESULTS = 1000
+# How similar (0 - 1) a misspelled name has to be to count as a match
+TRIGRAM_THRESHOLD = 0.3
+FUZZY_THRESHOLD = 0.75
+SEARCH_CONFIG = "english"
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def search_ids(queryset, q, fields):
+    """
+    Return the ids of the rows in `queryset` matching `q`, best match first.
+
+    On Postgres `fields` are matched with full-text search (every word of `q`
+    is treated as a prefix so "pika" finds "Pikachu") and when that finds
+    nothing the `name` column is compared with trigram similarity so typos
+    like "pikachoo" still work. Other databases (SQLite in local test runs)
+    use an in-process index that behaves the same way.
+    """
+    words = WORD.findall(q.lower())
+    if not words:
+        return []
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        return postgres_search(queryset, words, q, fields, connection)
+    return InProcessIndex(queryset, fields).search(words)
+
+
+def search_response(request, queryset, serializer_class, fields, view=None):
+    # Shared by the pokemon and move search views: rank the ids, cut out the
+    # requested page and only load + serialize the rows on that page
+    q = request.query_params.get("q", "").strip()
+    if not q:
+        return Response("Missing search query ?q=", status=HTTP_400_BAD_REQUEST)
+    paginator = SearchPagination()
+    page = paginator.paginate_queryset(search_ids(queryset, q, fields), request, view=view)
+    rows = serializer_class.setup_eager_loading(queryset).in_bulk(page)
+    # in_bulk returns a dict, put the rows back in ranked order. Rows deleted since
+    # they were ranked are left out
+    return paginator.get_paginated_response(serializer_class([rows[id] for id in page if id in rows], many=True).data)
+
+
+def postgres_search(queryset, words, q, fields, connection):
+    # same expression as the GIN indexes in the migrations so Postgres can use them
+    vector = SearchVector(*fields, config=SEARCH_CONFIG)
+    query = SearchQuery(" & ".join(f"{word}:*" for word in words), config=SEARCH_CONFIG, search_type="raw")
+    matches = (
+        queryset.annotate(document=vector, rank=SearchRank(vector, query))
+        .filter(document=query)
+        .order_by("-rank", "name", "id")
+        .values_list("id", flat=True)[:MAX_RESULTS]
+    )
+    matches = list(matches)
+    if matches or not has_trigram(connection):
+        return matches
+    with transaction.atomic(using=queryset.db):
+        with connection.cursor() as cursor:
+            # `%` matches above pg_trgm.similarity_threshold, set for this transaction only
+            cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", [str(TRIGRAM_THRESHOLD)])
+        return list(trigram_matches(queryset, q))
+
+
+def trigram_matches(queryset, q):
+    # Typo-tolerant fallback. `name % q` (trigram_similar) is answered by the gin_trgm_ops
+    # index, filtering on the similarity() annotation instead would compute it for every row.
+    # The annotation only ranks the rows the index found
+    return (
+        queryset.filter(name__trigram_similar=q)
+        .annotate(similarity=TrigramSimilarity("name", q))
+        .order_by("-similarity", "name", "id")
+        .values_list("id", flat=True)[:MAX_RESULTS]
+    )
+
+
+def has_trigram(connection):
+    # pg_trgm is optional (some hosted databases don't ship it), check once per connection
+    if not hasattr(connection, "_pokedex_has_trigram"):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            connection._pokedex_has_trigram = cursor.fetchone() is not None
+    return connection._pokedex_has_trigram
+
+
+class InProcessIndex:
+    """
+    A tiny inverted index (word -> row ids) built from `fields` in Python, used
+    when the database can't do full-text search. Rows score 1 per word that is
+    an exact match, 0.8 per prefix match and their similarity ratio (scaled
+    down) per misspelled word. Only rows matching every word are returned.
+    """
+
+    def __init__(self, queryset, fields):
+        self.words = {}
+        self.names = {}
+        for id, name, *text in queryset.values_list("id", "name", *[f for f in fields if f != "name"]):
+            self.names[id] = name
+            for word in WORD.findall(" ".join([name, *text]).lower()):
+                self.words.setdefault(word, set()).add(id)
+
+    def search(self, words):
+        scores = None
+        for word in words:
+            word_scores = self.score_word(word)
+            if scores is None:
+                scores = word_scores
+            else:
+                # every word has to match, like the " & " in the Postgres query
+                scores = {id: scores[id] + word_scores[id] for id in scores.keys() & word_scores.keys()}
+        ranked = sorted(scores, key=lambda id: (-scores[id], self.names[id], id))
+        return ranked[:MAX_RESULTS]
+
+    def score_word(self, word):
+        scores = {}
+        for candidate, ids in self.words.items():
+            if candidate == word:
+                score = 1
+            elif candidate.startswith(word):
+                score = 0.8
+            else:
+                ratio = difflib.SequenceMatcher(None, word, candidate).ratio()
+                if ratio < FUZZY_THRESHOLD:
+                    continue
+                score = ratio / 2
+            for id in ids:
+                scores[id] = max(scores.get(id, 0), score)
+        return scores
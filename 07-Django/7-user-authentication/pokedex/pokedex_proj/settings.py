@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "pokemon_app",
     "rest_framework",
     'rest_framework.authtoken',
@@ -52,6 +53,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # runs last on the way out so it compresses the final body (pokedex_proj/compression.py)
+    'pokedex_proj.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,12 +95,119 @@ DATABASES = {
     }
 }
 
+# Serialized pokedex responses are cached under the "pokedex" alias (see pokedex_proj/cache.py).
+# Local memory by default; point POKEDEX_CACHE_BACKEND/LOCATION in your .env at redis/memcached
+# to share the cache between processes. LocMemCache evicts the least recently used entries once
+# MAX_ENTRIES is reached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pokedex': {
+        'BACKEND': env.get("POKEDEX_CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env.get("POKEDEX_CACHE_LOCATION", 'pokedex'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'trainer_app.authentication.CachedTokenAuthentication',
     ],
+    # JSON bodies are encoded/decoded with orjson when it's installed (pokedex_proj/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'pokedex_proj.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'pokedex_proj.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Accept-Encoding negotiated response compression (pokedex_proj/compression.py). Check other
+# levels with `python manage.py bench_compression`: past these they cost a lot more CPU for a few % less bytes
+RESPONSE_COMPRESSION = {
+    "MIN_SIZE": 1024,
+    "ENCODINGS": ["zstd", "br", "gzip"],
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 4,
+    "ZSTD_LEVEL": 3,
 }
 
+# Recently used tokens are kept in memory (per process) so authenticated requests
+# skip the Token + Trainer query. TTL in seconds
+TOKEN_CACHE = {
+    "TTL": 60,
+    "MAX_ENTRIES": 10000,
+}
+
+
+# Third-party APIs proxied by api_app, tests point these at a local stub server
+NOUN_PROJECT_URL = env.get("NOUN_PROJECT_URL", "http://api.thenounproject.com")
+
+# Noun Project answers cached per `types` (api_app/cache.py), in seconds: how long an
+# icon / a "no icon" answer is fresh, and how long after that a stale icon may still
+# be served while it is refreshed in the background
+NOUN_PROJECT_CACHE = {
+    "TTL": 60 * 60 * 24,
+    "NEGATIVE_TTL": 60 * 10,
+    "STALE_TTL": 60 * 60 * 24 * 7,
+}
+
+# Timeouts (seconds), retries and circuit breaker of each third-party API (api_app/upstream.py)
+UPSTREAMS = {
+    "noun_project": {
+        "TIMEOUT": 3,
+        "RETRIES": 2,
+        "BACKOFF": 0.1,
+        "RETRY_BUDGET": 0.2,
+        "FAILURE_THRESHOLD": 5,
+        "RESET_TIMEOUT": 30,
+    },
+}
+
+# Pooled async HTTP client used for upstream calls (api_app/client.py). Timeouts in seconds
+UPSTREAM_HTTP = {
+    "CONNECT_TIMEOUT": 2,
+    "TIMEOUT": 5,
+    "MAX_CONNECTIONS": 100,
+    "MAX_KEEPALIVE": 20,
+    "KEEPALIVE_EXPIRY": 30,
+}
+
+# Password hashing (trainer_app/hashers.py)
+PASSWORD_HASHING = {
+    # pbkdf2 (default), argon2 (pip install argon2-cffi) or bcrypt (pip install bcrypt)
+    "ALGORITHM": env.get("PASSWORD_HASHER", "pbkdf2"),
+    # Cost of each algorithm, None keeps Django's default. Existing hashes are
+    # upgraded to the current algorithm/cost on the trainer's next login
+    "PBKDF2_ITERATIONS": env.get("PBKDF2_ITERATIONS"),
+    "ARGON2_TIME_COST": env.get("ARGON2_TIME_COST"),
+    "ARGON2_MEMORY_COST": env.get("ARGON2_MEMORY_COST"),
+    "BCRYPT_ROUNDS": env.get("BCRYPT_ROUNDS"),
+    # Hashes run on at most WORKERS threads with up to QUEUE more waiting (for at
+    # most QUEUE_TIMEOUT seconds), past that sign up / log in answer 503
+    "WORKERS": 4,
+    "QUEUE": 16,
+    "QUEUE_TIMEOUT": 5,
+}
+
+_PASSWORD_HASHERS = {
+    "pbkdf2": "trainer_app.hashers.PBKDF2PasswordHasher",
+    "argon2": "trainer_app.hashers.Argon2PasswordHasher",
+    "bcrypt": "trainer_app.hashers.BCryptSHA256PasswordHasher",
+}
+# The first hasher hashes new passwords, the rest can still check (and upgrade) older hashes
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHING["ALGORITHM"]],
+    *[hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHING["ALGORITHM"]],
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
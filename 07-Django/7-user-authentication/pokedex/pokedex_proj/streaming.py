@@ -0,0 +1,72 @@
+# pokedex_proj/streaming.py
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from .renderers import FastJSONRenderer
+
+
+# How many rows Postgres hands us per round-trip of the server-side cursor
+CHUNK_SIZE = 500
+
+
+def stream_queryset(queryset, serializer_class, ndjson=False, chunk_size=CHUNK_SIZE, asynchronous=False):
+    """
+    Stream a queryset as JSON without building the whole list in memory.
+
+    `queryset.iterator()` reads rows through a server-side cursor `chunk_size`
+    rows at a time and each row is serialized and sent before the next one is
+    read, so memory stays flat no matter how big the table is. With
+    `ndjson=True` every row is its own line, otherwise the rows are wrapped in a
+    regular JSON array that is identical to the list endpoint's body.
+
+    Under ASGI pass `asynchronous=True` (see `is_asgi`): Django's ASGI handler
+    reads a sync iterator into a list before sending any of it, so there the
+    rows come from `queryset.aiterator()` through an async generator instead.
+    """
+    # the same renderer as a normal Response, so every row is encoded exactly like the list endpoint's
+    renderer = FastJSONRenderer()
+    if asynchronous:
+        rows = (
+            renderer.render(serializer_class(instance).data)
+            async for instance in queryset.aiterator(chunk_size=chunk_size)
+        )
+    else:
+        rows = (
+            renderer.render(serializer_class(instance).data)
+            for instance in queryset.iterator(chunk_size=chunk_size)
+        )
+
+    if ndjson:
+        content = (row + b"\n" async for row in rows) if asynchronous else (row + b"\n" for row in rows)
+        content_type = "application/x-ndjson"
+    else:
+        content = ajson_array(rows) if asynchronous else json_array(rows)
+        content_type = "application/json"
+    return StreamingHttpResponse(content, content_type=content_type)
+
+
+def json_array(rows):
+    # yields "[", then each row with a leading comma (except the first), then "]"
+    yield b"["
+    for i, row in enumerate(rows):
+        yield row if i == 0 else b"," + row
+    yield b"]"
+
+
+async def ajson_array(rows):
+    yield b"["
+    first = True
+    async for row in rows:
+        yield row if first else b"," + row
+        first = False
+    yield b"]"
+
+
+def is_asgi(request):
+    # a DRF Request wraps Django's HttpRequest
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+def wants_ndjson(request):
+    return request.query_params.get("ndjson") in ("1", "true") or (
+        "application/x-ndjson" in request.headers.get("Accept", "")
+    )
@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse
 import math
+from api_app.views import Upstream_metrics
 
 def square_area_view(request):
     area_of_a_square = 2 ** 2
@@ -41,5 +42,6 @@ urlpatterns = [
     path("api/v1/pokemon/", include("pokemon_app.urls")),
     path('api/v1/moves/', include("move_app.urls")),
     path('api/v1/noun/', include("api_app.urls")),
+    path('api/v1/upstreams/', Upstream_metrics.as_view(), name='upstream_metrics'),
     path('api/v1/users/', include("trainer_app.urls")),
 ]
@@ -0,0 +1,86 @@
+# pokedex_proj/values.py
+from django.db.models.query import QuerySet
+from rest_framework import serializers
+
+# DRF fields whose to_representation doesn't change what the database hands back
+# (an int stays an int, a str stays a str, ...), their values are copied as they are
+PASSTHROUGH = (serializers.IntegerField, serializers.CharField, serializers.BooleanField, serializers.FloatField)
+
+
+class ValuesSerializer:
+    """
+    Read-only twin of a ModelSerializer for list endpoints. Instead of building a
+    model instance per row and running every DRF field on it, rows are read with
+    `values()`, the related names come from ONE extra `values_list()` query and
+    the output dicts are built directly. The output is the same as
+    `serializer_class(queryset, many=True).data`: same keys in the same order,
+    dates/datetimes formatted by the serializer's own fields.
+
+    `related` maps each SerializerMethodField that lists related names to
+    `(related model, its lookup back to this model, column to list)`.
+
+        rows = PokemonValuesSerializer.values(queryset)   # or a page of those rows
+        data = PokemonValuesSerializer(rows).data
+    """
+
+    serializer_class = None
+    related = {}
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def plan(cls):
+        # [(name, column, converter)] in the serializer's output order, worked out once per class.
+        # converter is None for values that are copied as they are
+        if "_plan" not in cls.__dict__:
+            plan = []
+            for name, field in cls.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                if name in cls.related:
+                    plan.append((name, None, None))
+                elif isinstance(field, serializers.SerializerMethodField) or "." in field.source:
+                    raise TypeError(f"{cls.__name__} can't build {name!r}, add it to `related`")
+                else:
+                    plan.append((name, field.source, None if isinstance(field, PASSTHROUGH) else field.to_representation))
+            cls._plan = plan
+        return cls._plan
+
+    @classmethod
+    def values(cls, queryset):
+        # prefetch_related() doesn't apply to values() rows, the related names are queried in `data`
+        model = cls.serializer_class.Meta.model
+        columns = {model._meta.pk.attname: None, **{column: None for _, column, _ in cls.plan() if column}}
+        return queryset.prefetch_related(None).values(*columns)
+
+    @property
+    def data(self):
+        rows = self.rows
+        pk = self.serializer_class.Meta.model._meta.pk.attname
+        # a whole (unsliced) queryset is matched with a subquery instead of sending every id back
+        ids = rows.values(pk) if isinstance(rows, QuerySet) and not rows.query.is_sliced else None
+        rows = list(rows)
+        if ids is None:
+            ids = [row[pk] for row in rows]
+
+        related = {}
+        for name, (model, lookup, column) in self.related.items():
+            grouped = related[name] = {}
+            # related names are listed by id, the order the model serializers' methods use too
+            links = model.objects.filter(**{f"{lookup}__in": ids}).order_by("pk")
+            for id, value in links.values_list(lookup, column):
+                grouped.setdefault(id, []).append(value)
+
+        plan = self.plan()
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in plan:
+                if column is None:
+                    item[name] = related[name].get(row[pk]) or []
+                else:
+                    value = row[column]
+                    item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PokemonAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pokemon_app'
+
+    def ready(self):
+        # registers the cache invalidation receivers
+        from . import signals
@@ -0,0 +1,92 @@
+# pokemon_app/filters.py
+# Query parameters accepted by GET /api/v1/pokemon/. Only filters and orderings
+# listed here are allowed, and every one of them is answered by an index in
+# Pokemon.Meta.indexes (see `python manage.py bench_pokemon_filters`):
+#
+#   ?type=fire                       pokemon_type_level_idx     (type, level)
+#   ?type=fire&level_min=10          pokemon_type_level_idx
+#   ?level_min=10&level_max=20       pokemon_level_id_idx       (level, id)
+#   ?captured=true                   pokemon_captured_name_idx  (captured, name)
+#   ?move=thunder / ?move=3          move_name_upper_idx + the moves table's move_id index
+#   ?ordering=name|-name|level|-level pokemon_name_id_idx / pokemon_level_id_idx, ?cursor= pages
+#                                    seek straight to the cursor in them (pokedex_proj/pagination.py)
+from rest_framework import serializers
+from .models import Pokemon
+from .validators import ALLOWED_TYPES, type_error
+
+# ?ordering= value -> the columns we sort (and keyset paginate) by. The trailing id
+# keeps the order stable for Pokemon with the same name/level
+ORDERINGS = {
+    "name": ("name", "id"),
+    "-name": ("-name", "-id"),
+    "level": ("level", "id"),
+    "-level": ("-level", "-id"),
+}
+DEFAULT_ORDERING = "name"
+FILTERS = ["type", "captured", "level_min", "level_max", "move"]
+
+
+def parse_level(value):
+    return serializers.IntegerField(min_value=1, max_value=100).run_validation(value)
+
+
+def parse_type(value):
+    if value.lower() not in ALLOWED_TYPES:
+        raise serializers.ValidationError(type_error(value))
+    # types are stored lowercase (PokemonSerializer.validate_type, migration 0011)
+    return value.lower()
+
+
+def parse_captured(value):
+    return serializers.BooleanField().to_internal_value(value)
+
+
+def parse_move(value):
+    return int(value) if value.isdigit() else value
+
+
+PARSERS = {
+    "type": parse_type,
+    "captured": parse_captured,
+    "level_min": parse_level,
+    "level_max": parse_level,
+    "move": parse_move,
+}
+
+
+def filter_pokemon(queryset, query_params):
+    """
+    Apply the whitelisted filters in `query_params` to `queryset` and return
+    `(queryset, ordering)`. Everything ends up in a single SELECT, invalid
+    values raise a ValidationError (400) listing every bad parameter.
+    """
+    values, errors = {}, {}
+    for name in FILTERS:
+        if name in query_params:
+            try:
+                values[name] = PARSERS[name](query_params[name])
+            except serializers.ValidationError as e:
+                errors[name] = e.detail
+    ordering = query_params.get("ordering", DEFAULT_ORDERING)
+    if ordering not in ORDERINGS:
+        errors["ordering"] = [f"Invalid ordering: {ordering}. Please choose from {', '.join(ORDERINGS)}."]
+    if errors:
+        raise serializers.ValidationError(errors)
+
+    if "type" in values:
+        queryset = queryset.filter(type=values["type"])
+    if "captured" in values:
+        queryset = queryset.filter(captured=values["captured"])
+    if "level_min" in values:
+        queryset = queryset.filter(level__gte=values["level_min"])
+    if "level_max" in values:
+        queryset = queryset.filter(level__lte=values["level_max"])
+    if "move" in values:
+        # a subquery instead of joining moves so a Pokemon can't show up twice
+        links = Pokemon.moves.through.objects
+        if type(values["move"]) == int:
+            links = links.filter(move_id=values["move"])
+        else:
+            links = links.filter(move__name__iexact=values["move"])
+        queryset = queryset.filter(id__in=links.values("pokemon_id"))
+    return queryset, ORDERINGS[ordering]
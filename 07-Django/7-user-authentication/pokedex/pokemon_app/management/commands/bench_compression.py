@@ -0,0 +1,79 @@
+# python manage.py bench_compression --rows 10000
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from pokedex_proj.benchmarks import fake_name
+from pokedex_proj.compression import CODECS, DEFAULTS, compress, compress_blocks
+from pokedex_proj.renderers import FastJSONRenderer
+from move_app.models import Move
+from move_app.serializers import MoveValuesSerializer
+from pokemon_app.models import Pokemon
+from pokemon_app.serializers import PokemonValuesSerializer
+from pokemon_app.validators import allowed_types
+
+# levels worth comparing for each encoding, including the defaults (pokedex_proj/compression.py)
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 6, 9], "zstd": [1, 3, 9, 19]}
+
+
+class Command(BaseCommand):
+    help = "CPU time against bytes saved of every encoding/level for the list endpoints' bodies and the streamed export"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--moves", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, moves = options["rows"], options["moves"]
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {rows} pokemon with 2 of {moves} moves each...")
+            move_rows = Move.objects.bulk_create((Move(name=fake_name(i)) for i in range(moves)), batch_size=5000)
+            pokemon = Pokemon.objects.bulk_create(
+                (Pokemon(name=fake_name(i), level=random.randint(1, 100), type=random.choice(allowed_types)) for i in range(rows)),
+                batch_size=5000,
+            )
+            Through = Pokemon.moves.through
+            Through.objects.bulk_create(
+                (Through(pokemon_id=p.id, move_id=move.id) for p in pokemon for move in random.sample(move_rows, 2)),
+                batch_size=5000,
+            )
+            renderer = FastJSONRenderer()
+            pokemon_list = PokemonValuesSerializer(PokemonValuesSerializer.values(Pokemon.objects.order_by("name", "id"))).data
+            bodies = [
+                ("GET /api/v1/pokemon/", renderer.render(pokemon_list)),
+                ("GET /api/v1/pokemon/?page_size=100", renderer.render({"next": None, "previous": None, "results": pokemon_list[:100]})),
+                ("GET /api/v1/moves/", renderer.render(MoveValuesSerializer(MoveValuesSerializer.values(Move.objects.order_by("id"))).data)),
+            ]
+            # the export streams one chunk per row
+            export_rows = [renderer.render(row) for row in pokemon_list]
+            transaction.set_rollback(True)
+
+        for label, body in bodies:
+            self.stdout.write(f"{label} ({len(body):,} bytes)")
+            for encoding in CODECS:
+                for level in LEVELS[encoding]:
+                    ms, size = self.timed(lambda: compress(body, encoding, level), options["repeat"])
+                    self.write_row(f"{encoding} {level}", ms, size, len(body))
+
+        total = sum(len(row) for row in export_rows)
+        self.stdout.write(f"GET /api/v1/pokemon/export/ streamed, {len(export_rows):,} rows ({total:,} bytes)")
+        for encoding in CODECS:
+            level = DEFAULTS[CODECS[encoding][1]]
+            for block in [1, DEFAULTS["STREAM_BLOCK"]]:
+                stream = lambda: b"".join(compress_blocks(iter(export_rows), CODECS[encoding][0](level), block))
+                ms, size = self.timed(stream, options["repeat"])
+                self.write_row(f"{encoding} {level}, {'flush every row' if block == 1 else f'{block} byte blocks'}", ms, size, total)
+
+    def timed(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            size = len(function())
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)[len(timings) // 2], size
+
+    def write_row(self, label, ms, size, original):
+        self.stdout.write(
+            f"  {label:<32} {size:>12,} bytes  {100 - size * 100 / original:5.1f}% saved  {ms:9.2f} ms  {original / 1e6 / (ms / 1000):8.1f} MB/s"
+        )
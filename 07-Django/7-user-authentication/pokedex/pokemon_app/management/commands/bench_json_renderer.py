@@ -0,0 +1,61 @@
+# python manage.py bench_json_renderer --rows 10000
+import random
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from pokedex_proj.benchmarks import fake_name, report, time_calls
+from pokedex_proj.renderers import FastJSONRenderer, orjson
+from move_app.models import Move
+from move_app.serializers import MoveValuesSerializer
+from pokemon_app.models import Pokemon
+from pokemon_app.serializers import PokemonSerializer, PokemonValuesSerializer
+from pokemon_app.validators import allowed_types
+
+
+class Command(BaseCommand):
+    help = "Encode time and size of the list endpoints' payloads with DRF's JSONRenderer and with FastJSONRenderer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--moves", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write("orjson isn't installed, FastJSONRenderer is DRF's JSONRenderer here")
+        rows, moves = options["rows"], options["moves"]
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {rows} pokemon with 2 of {moves} moves each...")
+            move_rows = Move.objects.bulk_create((Move(name=fake_name(i)) for i in range(moves)), batch_size=5000)
+            pokemon = Pokemon.objects.bulk_create(
+                (Pokemon(name=fake_name(i), level=random.randint(1, 100), type=random.choice(allowed_types)) for i in range(rows)),
+                batch_size=5000,
+            )
+            Through = Pokemon.moves.through
+            Through.objects.bulk_create(
+                (Through(pokemon_id=p.id, move_id=move.id) for p in pokemon for move in random.sample(move_rows, 2)),
+                batch_size=5000,
+            )
+            # the payloads the views hand to Response
+            pokemon_list = PokemonValuesSerializer(PokemonValuesSerializer.values(Pokemon.objects.order_by("name", "id"))).data
+            payloads = [
+                ("GET /api/v1/pokemon/", pokemon_list),
+                ("GET /api/v1/pokemon/?page_size=100", {"next": "http://testserver/api/v1/pokemon/?cursor=x", "previous": None, "results": pokemon_list[:100]}),
+                ("GET /api/v1/pokemon/<id>/", PokemonSerializer(Pokemon.objects.first()).data),
+                ("GET /api/v1/moves/", MoveValuesSerializer(MoveValuesSerializer.values(Move.objects.order_by("id"))).data),
+            ]
+            transaction.set_rollback(True)
+
+        for label, data in payloads:
+            self.run(label, data, options["repeat"])
+
+    def run(self, label, data, repeat):
+        before, after = JSONRenderer().render(data), FastJSONRenderer().render(data)
+        if before != after:
+            raise CommandError(f"{label}: FastJSONRenderer's output differs from JSONRenderer's")
+        drf = time_calls(lambda: JSONRenderer().render(data), repeat)
+        fast = time_calls(lambda: FastJSONRenderer().render(data), repeat)
+        self.stdout.write(f"{label} ({len(after):,} bytes)")
+        report(self.stdout, "  JSONRenderer", drf)
+        report(self.stdout, "  FastJSONRenderer", fast)
+        self.stdout.write(f"{'':<45} {drf['median_ms'] / fast['median_ms']:.1f}x faster")
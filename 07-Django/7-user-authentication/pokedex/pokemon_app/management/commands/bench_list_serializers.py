@@ -0,0 +1,63 @@
+# python manage.py bench_list_serializers --rows 10000 100000
+import random
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from pokedex_proj.benchmarks import analyze, fake_name, report, time_calls
+from move_app.models import Move
+from move_app.serializers import MoveSerializer, MoveValuesSerializer
+from pokemon_app.models import Pokemon
+from pokemon_app.serializers import PokemonSerializer, PokemonValuesSerializer
+from pokemon_app.validators import allowed_types
+
+
+class Command(BaseCommand):
+    help = "Time the full Pokemon/Move list payloads with the ModelSerializers and with the values() serializers, and check both give the same bytes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+        parser.add_argument("--moves", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for rows in options["rows"]:
+                # every size gets its own rows, rolled back before the next one
+                with transaction.atomic():
+                    self.seed(rows, options["moves"])
+                    self.run(rows, options["repeat"])
+                    transaction.set_rollback(True)
+            transaction.set_rollback(True)
+
+    def seed(self, rows, moves):
+        self.stdout.write(f"Seeding {rows} pokemon with 2 of {moves} moves each...")
+        move_rows = Move.objects.bulk_create((Move(name=fake_name(i)) for i in range(moves)), batch_size=5000)
+        pokemon = Pokemon.objects.bulk_create(
+            (Pokemon(name=fake_name(i), level=random.randint(1, 100), type=random.choice(allowed_types)) for i in range(rows)),
+            batch_size=5000,
+        )
+        Through = Pokemon.moves.through
+        Through.objects.bulk_create(
+            (Through(pokemon_id=p.id, move_id=move.id) for p in pokemon for move in random.sample(move_rows, 2)),
+            batch_size=5000,
+        )
+        analyze(Pokemon._meta.db_table, Move._meta.db_table, Through._meta.db_table)
+
+    def run(self, rows, repeat):
+        pokemon = Pokemon.objects.order_by("name", "id")
+        moves = Move.objects.order_by("id")
+        cases = [
+            ("Pokemon", lambda: PokemonSerializer(PokemonSerializer.setup_eager_loading(pokemon), many=True).data,
+             lambda: PokemonValuesSerializer(PokemonValuesSerializer.values(pokemon)).data),
+            ("Move", lambda: MoveSerializer(MoveSerializer.setup_eager_loading(moves), many=True).data,
+             lambda: MoveValuesSerializer(MoveValuesSerializer.values(moves)).data),
+        ]
+        renderer = JSONRenderer()
+        for label, model_serializer, values_serializer in cases:
+            if renderer.render(model_serializer()) != renderer.render(values_serializer()):
+                raise CommandError(f"{label}: the values() serializer's output differs from the ModelSerializer's")
+            before = time_calls(model_serializer, repeat)
+            after = time_calls(values_serializer, repeat)
+            report(self.stdout, f"{label} list, {rows} rows, ModelSerializer", before)
+            report(self.stdout, f"{label} list, {rows} rows, values()", after)
+            self.stdout.write(f"{'':<45} {before['median_ms'] / after['median_ms']:.1f}x faster")
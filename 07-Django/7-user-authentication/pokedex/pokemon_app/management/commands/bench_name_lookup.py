@@ -0,0 +1,42 @@
+# python manage.py bench_name_lookup --rows 100000
+import random
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from pokedex_proj.benchmarks import analyze, fake_name, report, time_calls
+from move_app.models import Move
+from pokemon_app.models import Pokemon
+
+
+class Command(BaseCommand):
+    help = "Time Pokemon/Move lookups by name (name__iexact) against a seeded table, with and without the UPPER(name) indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--lookups", type=int, default=500)
+
+    def handle(self, *args, **options):
+        rows, lookups = options["rows"], options["lookups"]
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {rows} pokemon and {rows} moves...")
+            Pokemon.objects.bulk_create((Pokemon(name=fake_name(i)) for i in range(rows)), batch_size=5000)
+            Move.objects.bulk_create((Move(name=fake_name(i)) for i in range(rows)), batch_size=5000)
+            analyze(Pokemon._meta.db_table, Move._meta.db_table)
+
+            names = [fake_name(random.randrange(rows)).lower() for _ in range(lookups)]
+            self.run_lookups(names, "(indexes in place)")
+            self.stdout.write(Pokemon.objects.filter(name__iexact=names[0]).explain())
+
+            if connection.vendor == "postgresql":
+                # DDL is transactional on Postgres, the indexes come back with the rollback below
+                with connection.cursor() as cursor:
+                    cursor.execute("DROP INDEX pokemon_name_upper_idx")
+                    cursor.execute("DROP INDEX move_name_upper_idx")
+                self.run_lookups(names, "(indexes dropped)")
+                self.stdout.write(Pokemon.objects.filter(name__iexact=names[0]).explain())
+
+            transaction.set_rollback(True)
+
+    def run_lookups(self, names, label):
+        pokemon, moves = iter(names * 2), iter(names * 2)
+        report(self.stdout, f"Pokemon name__iexact {label}", time_calls(lambda: Pokemon.objects.get(name__iexact=next(pokemon)), len(names)))
+        report(self.stdout, f"Move name__iexact {label}", time_calls(lambda: Move.objects.get(name__iexact=next(moves)), len(names)))
@@ -0,0 +1,99 @@
+# python manage.py bench_pokemon_filters --rows 100000
+import random
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.http import QueryDict
+from pokedex_proj.benchmarks import analyze, fake_name, full_scans, report, time_calls, unbounded_seek
+from pokedex_proj.pagination import KeysetPagination
+from move_app.models import Move
+from pokemon_app.filters import ORDERINGS, filter_pokemon
+from pokemon_app.models import Pokemon
+from pokemon_app.validators import allowed_types
+
+# one query string per supported filter/ordering of GET /api/v1/pokemon/
+CASES = [
+    "type=fire",
+    "type=fire&level_min=40&level_max=45",
+    "level_min=40&level_max=45",
+    "captured=true",
+    "captured=true&ordering=-name",
+    "move=Aaabc",
+    "type=water&ordering=-level",
+    "ordering=level",
+    "ordering=-level&level_max=10",
+]
+PAGE_SIZE = 20
+
+
+def cursor_page(ordering):
+    # a page from the middle of the list, the query the list view runs for ?ordering=...&cursor=...
+    paginator = KeysetPagination()
+    paginator.ordering = ordering
+    queryset = Pokemon.objects.order_by(*ordering)
+    position = list(queryset.values_list(*[field.lstrip("-") for field in ordering])[queryset.count() // 2])
+    return queryset.filter(paginator.seek(Pokemon, position, False))[: PAGE_SIZE + 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN and time every supported Pokemon list filter and a cursor page of every ordering against a seeded table, "
+        "fails if one needs a full table scan or a cursor page doesn't seek in an index"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--moves", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--plans", action="store_true", help="print the full EXPLAIN output of every case")
+
+    def handle(self, *args, **options):
+        rows, moves = options["rows"], options["moves"]
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {rows} pokemon with 2 of {moves} moves each...")
+            move_rows = Move.objects.bulk_create((Move(name=fake_name(i)) for i in range(moves)), batch_size=5000)
+            pokemon = Pokemon.objects.bulk_create(
+                (
+                    Pokemon(
+                        name=fake_name(i),
+                        level=random.randint(1, 100),
+                        type=random.choice(allowed_types),
+                        # most Pokemon out there haven't been caught yet
+                        captured=random.random() < 0.05,
+                    )
+                    for i in range(rows)
+                ),
+                batch_size=5000,
+            )
+            Through = Pokemon.moves.through
+            Through.objects.bulk_create(
+                (Through(pokemon_id=p.id, move_id=move.id) for p in pokemon for move in random.sample(move_rows, 2)),
+                batch_size=5000,
+            )
+            analyze(Pokemon._meta.db_table, Move._meta.db_table, Through._meta.db_table)
+
+            failures = [case for case in CASES if not self.run_case(case, options)]
+            failures += [f"cursor page of ordering={name}" for name, ordering in ORDERINGS.items() if not self.run_cursor_case(name, ordering, options)]
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(f"Full table scans or unbounded cursor pages for: {', '.join(failures)}")
+
+    def run_case(self, case, options):
+        queryset, ordering = filter_pokemon(Pokemon.objects.all(), QueryDict(case))
+        # the first keyset page, the query the list view runs for ?page_size=20
+        page = queryset.order_by(*ordering)[: PAGE_SIZE + 1]
+        plan = page.explain()
+        scans = full_scans(plan, Pokemon._meta.db_table)
+        report(self.stdout, f"{case:<38} {'SEQ SCAN' if scans else 'index'}", time_calls(lambda: list(page.all()), options["repeat"]))
+        if options["plans"] or scans:
+            self.stdout.write(plan)
+        return not scans
+
+    def run_cursor_case(self, name, ordering, options):
+        # the first page has no cursor, what matters for deep pages is where the scan starts
+        page = cursor_page(ordering)
+        plan = page.explain()
+        lines = unbounded_seek(plan, ordering[0].lstrip("-"))
+        report(self.stdout, f"{'cursor page, ordering=' + name:<38} {'UNBOUNDED' if lines else 'index seek'}", time_calls(lambda: list(page.all()), options["repeat"]))
+        if options["plans"] or lines:
+            self.stdout.write(plan)
+        return not lines
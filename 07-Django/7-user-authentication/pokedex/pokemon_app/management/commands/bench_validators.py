@@ -0,0 +1,75 @@
+# python manage.py bench_validators --rows 100000
+import random
+import re
+import time
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from pokedex_proj.benchmarks import fake_name
+from move_app import validators as move_validators
+from pokemon_app import validators
+
+
+# the validators as they were before, kept here to compare against
+def old_validate_name(name):
+    error_message = "Improper name format"
+    regex = r'^[A-Z][a-z]*$'
+    if re.match(regex, name):
+        return name
+    raise ValidationError(error_message, params={'name': name})
+
+
+def old_validate_type(value):
+    allowed_types = ['rock', "normal", 'bug', 'ghost', 'steel', 'fire', 'water', 'grass', 'electric', 'psychic', 'ice', 'dragon', 'dark', 'fairy', 'unknown', 'shadow']
+    if value.lower() not in allowed_types:
+        raise ValidationError(f"Invalid type: {value}. Please choose from {', '.join(allowed_types)}.")
+
+
+def old_validate_move_name(name):
+    regex = r"^[a-zA-Z]+ ?[a-zA-Z]+$"
+    if re.match(regex, name):
+        return name
+    raise ValidationError("Improper Format")
+
+
+def one_by_one(validate, values):
+    errors = 0
+    for value in values:
+        try:
+            validate(value)
+        except ValidationError:
+            errors += 1
+    return errors
+
+
+class Command(BaseCommand):
+    help = "Rows/second of the name and type validators: per call before/after precompiling, and validate_many on a whole batch"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, self.repeat = options["rows"], options["repeat"]
+        # a bulk import looks like this: a few hundred distinct names, mostly valid, and the usual types
+        names = [fake_name(random.randrange(500)) if random.random() > 0.01 else "bad name" for _ in range(rows)]
+        types = [random.choice(validators.allowed_types) if random.random() > 0.01 else "plasma" for _ in range(rows)]
+        pokemon = [{"name": name, "type": value} for name, value in zip(names, types)]
+        move_names = [name.lower() for name in names]
+
+        self.run("validate_name (re.match per call)", rows, lambda: one_by_one(old_validate_name, names))
+        self.run("validate_name (precompiled)", rows, lambda: one_by_one(validators.validate_name, names))
+        self.run("validate_type (list per call)", rows, lambda: one_by_one(old_validate_type, types))
+        self.run("validate_type (frozenset)", rows, lambda: one_by_one(validators.validate_type, types))
+        self.run("validate_many (name + type)", rows, lambda: validators.validate_many(pokemon))
+        self.run("validate_move_name (re.match per call)", rows, lambda: one_by_one(old_validate_move_name, move_names))
+        self.run("validate_move_name (precompiled)", rows, lambda: one_by_one(move_validators.validate_move_name, move_names))
+
+    def run(self, label, rows, function):
+        # best of `repeat` runs, the others mostly measure whatever else the machine was doing
+        best = min(self.timed(function) for _ in range(self.repeat))
+        self.stdout.write(f"{label:<45} {rows / best:>14,.0f} rows/s")
+
+    def timed(self, function):
+        start = time.perf_counter()
+        function()
+        return time.perf_counter() - start
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('move_app', '0001_initial'),
+        ('pokemon_app', '0005_pokemon_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['name', 'id'], name='pokemon_name_id_idx'),
+        ),
+    ]
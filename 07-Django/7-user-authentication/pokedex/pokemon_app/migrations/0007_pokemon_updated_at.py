@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-18 16:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon_app', '0006_pokemon_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pokemon',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
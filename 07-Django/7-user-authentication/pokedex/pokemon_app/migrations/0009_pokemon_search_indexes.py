@@ -0,0 +1,28 @@
+# Generated by Django 5.0 on 2026-10-18 15:52
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+from pokedex_proj.operations import AddPostgresIndex, CreateExtensionIfAvailable
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('move_app', '0004_move_search_indexes'),
+        ('pokemon_app', '0008_pokemon_pokemon_name_upper_idx'),
+    ]
+
+    # GIN indexes only exist on Postgres, on other databases these only update the migration state
+    operations = [
+        CreateExtensionIfAvailable('pg_trgm'),
+        AddPostgresIndex(
+            model_name='pokemon',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', 'description', config='english'), name='pokemon_search_idx'),
+        ),
+        AddPostgresIndex(
+            model_name='pokemon',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='pokemon_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            extension='pg_trgm',
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0 on 2026-10-18 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('move_app', '0004_move_search_indexes'),
+        ('pokemon_app', '0009_pokemon_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['type', 'level'], name='pokemon_type_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['captured', 'name'], name='pokemon_captured_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['level', 'id'], name='pokemon_level_id_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Pokemon types are stored lowercase from now on (PokemonSerializer.validate_type,
+# Pokemon.save), so `?type=fire` can keep filtering with `type = 'fire'` on
+# pokemon_type_level_idx. This lowercases the rows written before that.
+
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Lower, Now
+
+
+def lowercase_types(apps, schema_editor):
+    Pokemon = apps.get_model("pokemon_app", "Pokemon")
+    # .update() skips auto_now, bump the ETag stamp of the rows that change by hand
+    Pokemon.objects.exclude(type=Lower(F("type"))).update(type=Lower("type"), updated_at=Now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon_app', '0010_pokemon_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_types, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 # models has many different methods we will utilize when creating our Models
 from django.db import models
 from django.utils import timezone
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 # import built-in Django Validators
 from django.core import validators as v
 from .validators import validate_name, validate_type
@@ -26,6 +29,34 @@ class Pokemon(models.Model):
     captured = models.BooleanField(default = False)
     moves = models.ManyToManyField(Move, related_name="pokemon")
     type = models.CharField(default="normal", validators=[validate_type])
+    # Stamped on every save (and when this Pokemon's moves change), ETags are built from it
+    # so the API can answer "has this changed?" without serializing anything
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination walks the pokedex in (name, id) order, this index lets
+            # Postgres seek directly to the next page instead of scanning from the start
+            models.Index(fields=["name", "id"], name="pokemon_name_id_idx"),
+            # Composite indexes behind the list filters/orderings in pokemon_app/filters.py
+            models.Index(fields=["type", "level"], name="pokemon_type_level_idx"),
+            models.Index(fields=["captured", "name"], name="pokemon_captured_name_idx"),
+            models.Index(fields=["level", "id"], name="pokemon_level_id_idx"),
+            # Functional index on UPPER(name) for the case-insensitive (`name__iexact`) lookups
+            # done by /api/v1/pokemon/<name>/ so they don't have to scan the whole table
+            models.Index(Upper("name"), name="pokemon_name_upper_idx"),
+            # /api/v1/pokemon/search/: full-text search over name + description and
+            # trigram (typo tolerant) matching on name. Postgres only, see pokedex_proj/search.py
+            GinIndex(SearchVector("name", "description", config="english"), name="pokemon_search_idx"),
+            GinIndex(fields=["name"], opclasses=["gin_trgm_ops"], name="pokemon_name_trgm_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # types are stored lowercase (`?type=` filters with an exact match), the API already
+        # sends them that way, this covers the admin and code creating Pokemon directly
+        if "type" not in self.get_deferred_fields():
+            self.type = self.type.lower()
+        super().save(*args, **kwargs)
 
     # DUNDER METHOD
     def __str__(self):
@@ -33,10 +64,14 @@ class Pokemon(models.Model):
 
     # RAISES POKEMON'S LEVEL
     def level_up(self):
-        self.level += 1
-        self.save()
+        # F("level") + 1 makes the database do the math (UPDATE ... SET level = level + 1)
+        # so two level-ups happening at the same time both count
+        self.level = models.F("level") + 1
+        self.save(update_fields=["level", "updated_at"])
+        self.refresh_from_db(fields=["level"])
 
     # Switches Pokemon's captured status from True to False and vise versa
     def change_caught_status(self, captured):
         self.captured = captured
-        self.save()
\ No newline at end of file
+        # only write the column that changed
+        self.save(update_fields=["captured", "updated_at"])
\ No newline at end of file
@@ -1,15 +1,195 @@
 # pokemon_app/serializers.py
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers # import serializers from DRF
+from move_app.models import Move
 from .models import Pokemon # import Pokemon model from models.py
+from .validators import validate_many, validate_name, validate_type
+from .signals import invalidate_pokemon, touch
+from pokedex_proj.values import ValuesSerializer
+
+# How many rows go into each INSERT/UPDATE statement of a bulk write
+BULK_BATCH_SIZE = 1000
+
+
+def missing_move_ids(move_ids):
+    # one query no matter how many ids we are checking
+    found = set(Move.objects.filter(id__in=move_ids).values_list("id", flat=True))
+    return set(move_ids) - found
+
+
+def link_moves(pokemon, move_ids):
+    # Inserts every (pokemon, move) row of the through table in batches instead of
+    # calling pokemon.moves.add() once per Pokemon. Links that already exist are skipped.
+    Through = Pokemon.moves.through
+    links = [
+        Through(pokemon_id=p.id, move_id=move_id)
+        for p, ids in zip(pokemon, move_ids)
+        for move_id in ids
+    ]
+    Through.objects.bulk_create(links, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+    return {link.move_id for link in links}
+
+
+def merge_errors(*error_lists):
+    # [{field: [errors]}, ...] per item from several checks -> one list
+    merged = []
+    for item_errors in zip(*error_lists):
+        errors = {}
+        for field_errors in item_errors:
+            for field, messages in field_errors.items():
+                errors.setdefault(field, []).extend(messages)
+        merged.append(errors)
+    return merged
+
+
+def reject_duplicate_ids(data):
+    # A bulk update touching the same pokemon twice would write both changes and keep
+    # whichever came last, every repeat after the first one is an error instead
+    seen, errors = set(), []
+    for item in data:
+        id = item.get("id") if type(item) == dict else None
+        errors.append({"id": ["This pokemon appears more than once in the batch."]} if id is not None and id in seen else {})
+        seen.add(id)
+    if any(errors):
+        raise serializers.ValidationError(errors)
+
+
+class PokemonListSerializer(serializers.ListSerializer):
+    """
+    What `PokemonSerializer(many=True)` turns into. Reading works like any other
+    list serializer, saving writes the whole batch with bulk_create/bulk_update
+    in a single transaction instead of one save() per Pokemon.
+    """
+
+    def to_internal_value(self, data):
+        if self.instance is not None and type(data) == list:
+            reject_duplicate_ids(data)
+        # names and types of the whole batch are checked in one go (the child serializer skips them)
+        batch_errors = validate_many(data) if type(data) == list else []
+        try:
+            validated_data = super().to_internal_value(data)
+        except serializers.ValidationError as e:
+            if type(e.detail) != list or not any(batch_errors):
+                raise
+            raise serializers.ValidationError(merge_errors(e.detail, batch_errors))
+        if any(batch_errors):
+            raise serializers.ValidationError(batch_errors)
+        # every Pokemon was validated on its own, now check all of the move ids in one query
+        missing = missing_move_ids({id for item in validated_data for id in item.get("move_ids", [])})
+        if missing:
+            errors = [
+                {"moves": [f"Invalid move id {id}" for id in item.get("move_ids", []) if id in missing]}
+                if missing.intersection(item.get("move_ids", [])) else {}
+                for item in validated_data
+            ]
+            raise serializers.ValidationError(errors)
+        return validated_data
+
+    def create(self, validated_data):
+        move_ids = [item.pop("move_ids", []) for item in validated_data]
+        with transaction.atomic():
+            pokemon = Pokemon.objects.bulk_create(
+                [Pokemon(**item) for item in validated_data], batch_size=BULK_BATCH_SIZE
+            )
+            linked_moves = link_moves(pokemon, move_ids)
+            # bulk writes skip the model signals so keep the moves' ETags and the cache in sync by hand
+            touch(Move, linked_moves)
+            invalidate_pokemon([], linked_moves)
+        return pokemon
+
+    def update(self, instances, validated_data):
+        move_ids = [item.pop("move_ids", []) for item in validated_data]
+        # only the columns that were actually sent are written
+        fields = {field for item in validated_data for field in item}
+        now = timezone.now()
+        for instance, item in zip(instances, validated_data):
+            for field, value in item.items():
+                setattr(instance, field, value)
+            instance.updated_at = now
+        pokemon_ids = [instance.id for instance in instances]
+        with transaction.atomic():
+            if fields:
+                Pokemon.objects.bulk_update(instances, [*fields, "updated_at"], batch_size=BULK_BATCH_SIZE)
+            link_moves(instances, move_ids)
+            # their moves list them by name, so those payloads change too
+            linked_moves = set(
+                Pokemon.moves.through.objects.filter(pokemon_id__in=pokemon_ids).values_list("move_id", flat=True)
+            )
+            touch(Move, linked_moves)
+            invalidate_pokemon(pokemon_ids, linked_moves)
+        return instances
+
 
 class PokemonSerializer(serializers.ModelSerializer):
     moves = serializers.SerializerMethodField()
 
     class Meta:
         model = Pokemon # specify what model this serializer is for
-        fields = "__all__" # specify the fields you would like this serializer to return
+        exclude = ["updated_at"] # return every field except the internal ETag stamp
+        list_serializer_class = PokemonListSerializer # PokemonSerializer(many=True) saves in bulk
+
+    # Serializing many Pokemon would call `instance.moves.all()` once per row (the N+1 problem).
+    # Views should pass their queryset through this method so every Pokemon's moves are
+    # loaded in ONE extra query and `get_moves` reads them from the prefetch cache.
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.prefetch_related("moves")
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if isinstance(self.parent, PokemonListSerializer):
+            # the list serializer validates every name/type of the batch at once with validate_many
+            for name, validator in [("name", validate_name), ("type", validate_type)]:
+                fields[name].validators = [v for v in fields[name].validators if v is not validator]
+        return fields
 
     def get_moves(self, instance):
-        moves = instance.moves.all()
+        # `.all()` returns the prefetched moves when they exist instead of hitting the DB again.
+        # Sorted by id so the list comes out the same whatever order the database joined them in
+        moves = sorted(instance.moves.all(), key=lambda move: move.id)
         move_names = [move.name for move in moves]
-        return move_names
\ No newline at end of file
+        return move_names
+
+    def validate_type(self, value):
+        # stored lowercase so the ?type= filter is an exact match on pokemon_type_level_idx
+        return value.lower()
+
+    def to_internal_value(self, data):
+        validated_data = super().to_internal_value(data)
+        # `moves` is read-only on the way out (move names), on the way in it can hold move ids
+        if "moves" in data:
+            moves = data["moves"] if isinstance(data["moves"], list) else [data["moves"]]
+            try:
+                validated_data["move_ids"] = serializers.ListField(child=serializers.IntegerField()).run_validation(moves)
+            except serializers.ValidationError as e:
+                raise serializers.ValidationError({"moves": e.detail})
+        return validated_data
+
+    def validate(self, attrs):
+        # inside a PokemonListSerializer the whole batch is checked with one query instead
+        if self.parent is None and attrs.get("move_ids"):
+            missing = missing_move_ids(attrs["move_ids"])
+            if missing:
+                raise serializers.ValidationError({"moves": [f"Invalid move id {id}" for id in missing]})
+        return attrs
+
+    def create(self, validated_data):
+        move_ids = validated_data.pop("move_ids", [])
+        pokemon = super().create(validated_data)
+        if move_ids:
+            pokemon.moves.add(*move_ids)
+        return pokemon
+
+    def update(self, instance, validated_data):
+        move_ids = validated_data.pop("move_ids", [])
+        pokemon = super().update(instance, validated_data)
+        if move_ids:
+            pokemon.moves.add(*move_ids)
+        return pokemon
+
+
+class PokemonValuesSerializer(ValuesSerializer):
+    # PokemonSerializer's output for GET /api/v1/pokemon/, built from values() rows
+    serializer_class = PokemonSerializer
+    related = {"moves": (Move, "pokemon", "name")}
@@ -0,0 +1,59 @@
+# pokemon_app/signals.py
+# Keeps the cached pokedex payloads and ETags in sync with the database. Anything
+# that calls Pokemon.save()/delete() (including level_up and change_caught_status)
+# or changes a Pokemon's moves lands in one of these receivers.
+from django.db.models.signals import post_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from pokedex_proj import cache
+from move_app.models import Move
+from .models import Pokemon
+
+
+def invalidate_pokemon(pokemon_ids, move_ids=()):
+    cache.invalidate("pokemon", pokemon_ids)
+    # Move payloads list their pokemon by name so they go stale too
+    cache.invalidate("move", move_ids)
+
+
+def touch(model, ids):
+    # .update() skips auto_now, so bump the ETag stamp by hand
+    if ids:
+        model.objects.filter(id__in=ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Pokemon)
+def pokemon_saved(sender, instance, **kwargs):
+    move_ids = [] if kwargs.get("created") else list(instance.moves.values_list("id", flat=True))
+    invalidate_pokemon([instance.pk], move_ids)
+
+
+@receiver(pre_delete, sender=Pokemon)
+def pokemon_deleted(sender, instance, **kwargs):
+    # pre_delete because the move links are gone by the time post_delete fires
+    move_ids = list(instance.moves.values_list("id", flat=True))
+    # those moves lose a pokemon from their payload
+    touch(Move, move_ids)
+    invalidate_pokemon([instance.pk], move_ids)
+
+
+@receiver(m2m_changed, sender=Pokemon.moves.through)
+def pokemon_moves_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # clear() doesn't send the removed ids so grab them before they are deleted
+        related = instance.pokemon if reverse else instance.moves
+        instance._cleared_pks = set(related.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    other_ids = pk_set if action != "post_clear" else getattr(instance, "_cleared_pks", set())
+    if reverse:
+        # move.pokemon.add(...) / remove(...) / clear()
+        pokemon_ids, move_ids = other_ids, [instance.pk]
+    else:
+        # pokemon.moves.add(...) / remove(...) / clear()
+        pokemon_ids, move_ids = [instance.pk], other_ids
+    # both sides now serialize differently
+    touch(Pokemon, pokemon_ids)
+    touch(Move, move_ids)
+    invalidate_pokemon(pokemon_ids, move_ids)
@@ -1,7 +1,7 @@
 # pokemon_app/urls.py
 from django.urls import path, register_converter
 # Explicit imports
-from .views import All_pokemon, A_pokemon
+from .views import All_pokemon, A_pokemon, Pokemon_export, Pokemon_bulk, Pokemon_search
 from .converters import IntOrStrConverter
 
 register_converter(IntOrStrConverter, 'int_or_str')
@@ -9,5 +9,9 @@ register_converter(IntOrStrConverter, 'int_or_str')
 urlpatterns = [
     # Currently only takes GET requests
     path('', All_pokemon.as_view(), name='all_pokemon'),
+    # these must come before <int_or_str:id>/ or "export"/"bulk"/"search" would be treated as a pokemon's name
+    path('export/', Pokemon_export.as_view(), name='pokemon_export'),
+    path('bulk/', Pokemon_bulk.as_view(), name='pokemon_bulk'),
+    path('search/', Pokemon_search.as_view(), name='pokemon_search'),
     path('<int_or_str:id>/', A_pokemon.as_view(), name='a_pokemon')
 ]
\ No newline at end of file
@@ -4,30 +4,62 @@ from django.core.exceptions import ValidationError
 # This will allow us to search through our string to match our regex function
 import re
 
+# Everything a validator needs is built once when the module loads, not on every call
+NAME_PATTERN = re.compile(r'^[A-Z][a-z]*$')
+# ^: The caret symbol denotes the start of the string.
+# [A-Z]: This matches a single capital letter at the beginning of the string.
+# [a-z]*: This matches zero or more occurrences of any alphabetic character (both uppercase and lowercase) after the first capital letter.
+# $: The dollar sign denotes the end of the string.
+NAME_ERROR = "Improper name format"
 
-# This will allow us to throw a validation error when interacting with 
-# our models.
-from django.core.exceptions import ValidationError
-# This will allow us to search through our string to match our regex function
-import re
+# also used to validate the ?type= filter (pokemon_app/filters.py), kept in this order for error messages
+allowed_types = ('rock', "normal", 'bug', 'ghost', 'steel', 'fire', 'water', 'grass', 'electric', 'psychic', 'ice', 'dragon', 'dark', 'fairy', 'unknown', 'shadow')
+# a frozenset answers `in` with one hash lookup instead of walking the list
+ALLOWED_TYPES = frozenset(allowed_types)
+TYPE_CHOICES = ', '.join(allowed_types)
 
 def validate_name(name):
-    error_message = "Improper name format"
-    # Message we want to give the user when passing incorrect input
-    regex = r'^[A-Z][a-z]*$'
-    # ^: The caret symbol denotes the start of the string.
-    # [A-Z]: This matches a single capital letter at the beginning of the string.
-    # [a-z]*: This matches zero or more occurrences of any alphabetic character (both uppercase and lowercase) after the first capital letter.
-    # $: The dollar sign denotes the end of the string.
-    good_name = re.match(regex, name)
-    # returns a boolean value [True || False]
-    if good_name:
+    # returns a match object or None
+    if NAME_PATTERN.match(name):
         return name
     else:
-        raise ValidationError(error_message, params={ 'name' : name })
-    
+        # Message we want to give the user when passing incorrect input
+        raise ValidationError(NAME_ERROR, params={ 'name' : name })
+
+def type_error(value):
+    return f"Invalid type: {value}. Please choose from {TYPE_CHOICES}."
+
 def validate_type(value):
-    allowed_types = ['rock', "normal", 'bug', 'ghost', 'steel', 'fire', 'water', 'grass', 'electric', 'psychic', 'ice', 'dragon', 'dark', 'fairy', 'unknown', 'shadow']
-    
-    if value.lower() not in allowed_types:
-        raise ValidationError(f"Invalid type: {value}. Please choose from {', '.join(allowed_types)}.")
+    if value.lower() not in ALLOWED_TYPES:
+        raise ValidationError(type_error(value))
+
+def as_text(value):
+    # what a serializer CharField turns `value` into, None for values it rejects on its own
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return None
+    return str(value).strip()
+
+def validate_many(rows):
+    """
+    Check the `name` and `type` of a whole batch of Pokemon (dicts of request
+    data) at once. Every distinct name/type is checked one time and the result
+    is one dict of errors per row, {} for rows that are fine, the same shape a
+    ListSerializer reports errors in.
+    """
+    rows = [row if isinstance(row, dict) else {} for row in rows]
+    names = [value.strip() if type(value) == str else as_text(value) for value in (row.get("name") for row in rows)]
+    types = [value.strip() if type(value) == str else as_text(value) for value in (row.get("type") for row in rows)]
+    match = NAME_PATTERN.match
+    bad_names = {name for name in set(names) if name and not match(name)}
+    bad_types = {value for value in set(types) if value and value.lower() not in ALLOWED_TYPES}
+    errors = [{} for _ in rows]
+    # only the (few) rows holding a bad value are visited again
+    if bad_names:
+        for i, name in enumerate(names):
+            if name in bad_names:
+                errors[i]["name"] = [NAME_ERROR]
+    if bad_types:
+        for i, value in enumerate(types):
+            if value in bad_types:
+                errors[i]["type"] = [type_error(value)]
+    return errors
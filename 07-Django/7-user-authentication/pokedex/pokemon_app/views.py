@@ -1,7 +1,18 @@
 #pokemon_app/views.py
 from django.shortcuts import get_object_or_404
+from django.http import Http404
+from django.db import transaction
+from django.db.models import Count, Max, F
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from .models import Pokemon #imports the Pokemon model
-from .serializers import PokemonSerializer #imports the PokemonSerializer
+from .serializers import PokemonSerializer, PokemonValuesSerializer, link_moves #imports the PokemonSerializer
+from .filters import filter_pokemon
+from pokedex_proj.pagination import PokemonPagination
+from pokedex_proj.streaming import is_asgi, stream_queryset, wants_ndjson
+from pokedex_proj.search import search_response
+from pokedex_proj import cache
+from pokedex_proj.etags import make_etag
 from django.http import JsonResponse # Our responses will now be returned in JSON so we should utilize a JsonResponse
 # Import both APIView and Response from DRF
 from rest_framework.views import APIView
@@ -13,12 +24,48 @@ from rest_framework.status import HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST, HTT
 #     pokemon = PokemonSerializer(Pokemon.objects.order_by('name'), many=True) # Utilize the serializer to serialize all of our Pokemon pulled from the Database
 #     return JsonResponse({"pokemon": pokemon.data}) # JSON could only be interpreted in dictionary format so we need to ensure our response is a dictionary itself.
 
+# ETags are computed with a single aggregate query over the `updated_at` stamps and cached next
+# to the payload. When the client's If-None-Match still matches we answer 304 without touching the serializer
+def pokemon_etag(queryset):
+    stamps = queryset.aggregate(
+        count=Count("id", distinct=True), last_id=Max("id"), updated=Max("updated_at"), moves=Max("moves__updated_at")
+    )
+    if not stamps["count"]:
+        return None
+    return make_etag("pokemon", stamps["count"], stamps["last_id"], stamps["updated"], stamps["moves"])
+
+def all_pokemon_etag(request):
+    return cache.cached_list("pokemon", request, lambda: pokemon_etag(Pokemon.objects.all()), part="etag")
+
+def a_pokemon_etag(request, id):
+    pk = id if type(id) == int else cache.lookup_name("pokemon", id)
+    if pk is None:
+        # a name we haven't resolved to an id yet
+        return pokemon_etag(Pokemon.objects.filter(name__iexact = id))
+    return cache.cached_detail("pokemon", pk, lambda: pokemon_etag(Pokemon.objects.filter(id = pk)), part="etag")
+
 class All_pokemon(APIView):
     # Just like we said before we only want this information available for GET requests therefore we have to place this logic under a GET method. DRF will recognize the `get` method and trigger that method every time a GET request is sent
+    @method_decorator(condition(etag_func=all_pokemon_etag))
     def get(self, request):
-        pokemon = PokemonSerializer(Pokemon.objects.order_by('name'), many=True)
+        # The serialized list is cached until a Pokemon (or one of its moves) changes
+        pokemon = cache.cached_list("pokemon", request, lambda: self.serialize_list(request))
         # Under response we don't necessarily need to send information in JSON format instead DRF will format our response and make it acceptable for Front-End frameworks
-        return Response(pokemon.data)
+        return Response(pokemon)
+
+    def serialize_list(self, request):
+        # ?type=, ?captured=, ?level_min=, ?level_max=, ?move= and ?ordering= (see filters.py)
+        queryset, ordering = filter_pokemon(Pokemon.objects.all(), request.query_params)
+        # plain values() rows plus one query for every Pokemon's moves, no model instances or
+        # per-field DRF calls (same output as PokemonSerializer, see pokedex_proj/values.py)
+        queryset = PokemonValuesSerializer.values(queryset.order_by(*ordering))
+        # ?cursor= / ?page_size= switch the response to one keyset page with next/previous links
+        paginator = PokemonPagination()
+        paginator.ordering = ordering
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(PokemonValuesSerializer(page).data).data
+        return PokemonValuesSerializer(queryset).data
     
     def post(self, request):
         # We could create a pokemon by specifying each individual field but that's obviously not optimal
@@ -31,6 +78,49 @@ class All_pokemon(APIView):
         else:
             return Response(new_pokemon.errors, status=HTTP_400_BAD_REQUEST)
     
+class Pokemon_bulk(APIView):
+    # Ingest endpoint: POST a list of new Pokemon or PATCH a list of {"id": ..., <changes>}.
+    # The whole list is validated first and then written in one transaction with
+    # bulk_create/bulk_update (see PokemonListSerializer). If any item is invalid nothing
+    # is written and the response holds one error dict per item ({} for the valid ones)
+    def post(self, request):
+        if type(request.data) != list:
+            return Response({"non_field_errors": ["Expected a list of pokemon"]}, status=HTTP_400_BAD_REQUEST)
+        new_pokemon = PokemonSerializer(data=request.data, many=True)
+        if new_pokemon.is_valid():
+            created = new_pokemon.save()
+            return Response({"created": [pokemon.id for pokemon in created]}, status=HTTP_201_CREATED)
+        return Response(new_pokemon.errors, status=HTTP_400_BAD_REQUEST)
+
+    def patch(self, request):
+        if type(request.data) != list:
+            return Response({"non_field_errors": ["Expected a list of pokemon"]}, status=HTTP_400_BAD_REQUEST)
+        ids = [item.get("id") if type(item) == dict else None for item in request.data]
+        # one query for every pokemon we are about to update
+        found = Pokemon.objects.in_bulk([id for id in ids if type(id) == int])
+        errors = [{} if id in found else {"id": ["No pokemon matches this id"]} for id in ids]
+        if any(errors):
+            return Response(errors, status=HTTP_400_BAD_REQUEST)
+        pokemon = PokemonSerializer([found[id] for id in ids], data=request.data, many=True, partial=True)
+        if pokemon.is_valid():
+            pokemon.save()
+            return Response({"updated": ids})
+        return Response(pokemon.errors, status=HTTP_400_BAD_REQUEST)
+
+class Pokemon_export(APIView):
+    # Full-table dump for clients that really need everything. Rows are streamed
+    # straight from a server-side cursor so the response never sits in memory
+    # (add ?ndjson=1 to get one Pokemon per line instead of a JSON array)
+    def get(self, request):
+        queryset = PokemonSerializer.setup_eager_loading(Pokemon.objects.order_by('name', 'id'))
+        return stream_queryset(queryset, PokemonSerializer, ndjson=wants_ndjson(request), asynchronous=is_asgi(request))
+
+class Pokemon_search(APIView):
+    # GET /api/v1/pokemon/search/?q=pika -> Pokemon whose name or description match, best match first.
+    # Words are matched as prefixes and misspelled names still match (see pokedex_proj/search.py)
+    def get(self, request):
+        return search_response(request, Pokemon.objects.all(), PokemonSerializer, ["name", "description"], view=self)
+
 class A_pokemon(APIView):
 
     def get_a_pokemon(self, id):
@@ -38,41 +128,72 @@ class A_pokemon(APIView):
         if type(id) == int:
             pokemon = get_object_or_404(Pokemon, id = id)
         else:
-            pokemon = get_object_or_404(Pokemon, name = id.title())
+            # iexact compiles to UPPER(name) = UPPER('...') which is answered by the pokemon_name_upper_idx index
+            pokemon = get_object_or_404(Pokemon, name__iexact = id)
         return pokemon
     
+    def get_cached_pokemon(self, pk):
+        # serialized payloads are cached by id and dropped whenever that Pokemon changes
+        return cache.cached_detail("pokemon", pk, lambda: PokemonSerializer(get_object_or_404(Pokemon, id = pk)).data)
+
     #  Specify the method to trigger this behavior
+    @method_decorator(condition(etag_func=a_pokemon_etag))
     def get(self, request, id): # <-- Notice id is now a parameter and its value is being pulled straight from our URL
-        # Lets initialize pokemon as None and give it a
-        # corresponding query set depending on the ids type
-        pokemon = self.get_a_pokemon(id)
-        return Response(PokemonSerializer(pokemon).data) #<=== Finally lets use the PokemonSerializer to return our Pokemon in the correct Format for Front End frameworks
+        if type(id) == int:
+            return Response(self.get_cached_pokemon(id))
+        # names are remembered as name -> id, double check the cached pokemon still has that name
+        pk = cache.lookup_name("pokemon", id)
+        if pk is not None:
+            try:
+                pokemon = self.get_cached_pokemon(pk)
+                if pokemon["name"].lower() == id.lower():
+                    return Response(pokemon)
+            except Http404:
+                pass
+        # first lookup of this name (or the pokemon it pointed to was renamed/deleted)
+        pk = self.get_a_pokemon(id).pk
+        cache.remember_name("pokemon", id, pk)
+        return Response(self.get_cached_pokemon(pk)) #<=== Finally lets use the PokemonSerializer to return our Pokemon in the correct Format for Front End frameworks
 
     def put(self, request, id):  # <-- This should be a direct reflection from the get method
         # we still want to grab a pokemon either by ID or by name so lets grab that behavior from the get method as well
         pokemon = self.get_a_pokemon(id)
         # Now we have to check the body of our request and check if
         # the following keys are in our request ['level_up', 'captured', 'moves', description]
-        if 'level_up' in request.data and request.data['level_up']:
-            pokemon.level_up()
+        # Every requested change is collected first so we can validate and save them all at once
+        changes = {}
+        level_up = bool(request.data.get("level_up"))
+        if level_up:
+            changes["level"] = pokemon.level + 1
         if 'captured' in request.data and type(request.data['captured']) == bool:
-            pokemon.change_caught_status(request.data.get("captured"))
+            changes["captured"] = request.data.get("captured")
         if "moves" in request.data:
-            pokemon.moves.add(request.data.get("moves"))
+            changes["moves"] = request.data.get("moves")
         if "description" in request.data and request.data.get("description"):
-            pokemon.description = request.data.get("description")
+            changes["description"] = request.data.get("description")
         if "type" in request.data and request.data.get("type"):
-            pokemon.type = request.data.get("type")
-        # Add pokemon to our PokemonSerializer to validate data
-        pokemon = PokemonSerializer(pokemon, data = vars(pokemon))
-        if pokemon.is_valid():
-            # save all changes
-            pokemon.save()
-            # We've made our necessary changes to the pokemon instance so we can return the appropriate response status of 204 which we will grab from DRF
-            return Response(status=HTTP_204_NO_CONTENT)
-        else:
-            print(pokemon.errors)
-            return Response(pokemon.errors, status=HTTP_400_BAD_REQUEST)
+            changes["type"] = request.data.get("type")
+        # Add pokemon to our PokemonSerializer to validate ONLY the fields that are changing
+        serializer = PokemonSerializer(pokemon, data = changes, partial = True)
+        if not serializer.is_valid():
+            print(serializer.errors)
+            return Response(serializer.errors, status=HTTP_400_BAD_REQUEST)
+        updates = dict(serializer.validated_data)
+        move_ids = updates.pop("move_ids", [])
+        with transaction.atomic():
+            if move_ids:
+                # insert the move links first so the save() below (and its cache invalidation) covers them
+                link_moves([pokemon], [move_ids])
+            if updates or move_ids:
+                for field, value in updates.items():
+                    setattr(pokemon, field, value)
+                if level_up:
+                    # let the database add the level so concurrent level-ups don't overwrite each other
+                    pokemon.level = F("level") + 1
+                # ONE `UPDATE ... SET` with just the changed columns
+                pokemon.save(update_fields=[*updates, "updated_at"])
+        # We've made our necessary changes to the pokemon instance so we can return the appropriate response status of 204 which we will grab from DRF
+        return Response(status=HTTP_204_NO_CONTENT)
 
     def delete(self, request, id):
         # get a pokemon from our database
@@ -0,0 +1,69 @@
+# tests/stub_upstream.py
+# A tiny local HTTP server standing in for third-party APIs (NounAPI, ...) so the
+# proxy views can be tested end to end without the network or real API keys.
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubUpstream:
+    """
+    with StubUpstream({"/icon/fire": (200, {"icon": {...}})}) as upstream:
+        ... point the view at upstream.url ...
+
+    `routes` maps a path to (status, json body) or (status, json body, delay).
+    A list of those is answered in order, the last one repeating, which lets
+    tests script "fail twice, then recover". Every request is recorded in
+    `calls` as (path, headers, client port) and answered after `delay` seconds
+    (the route's own delay wins).
+    """
+
+    def __init__(self, routes, delay=0):
+        self.routes = routes
+        self.delay = delay
+        self.calls = []
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so clients can keep their connection alive between calls
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                stub.calls.append((path, dict(self.headers), self.client_address[1]))
+                status, body, delay = stub.answer(path)
+                time.sleep(delay)
+                content = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                except ConnectionError:
+                    # the client timed out and hung up while we were "slow"
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def answer(self, path):
+        route = self.routes.get(path, (404, {"error": "Not found"}))
+        if isinstance(route, list):
+            route = route.pop(0) if len(route) > 1 else route[0]
+        status, body, *delay = route
+        return status, body, delay[0] if delay else self.delay
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
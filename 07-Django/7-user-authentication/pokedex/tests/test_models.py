@@ -1,6 +1,8 @@
 from django.test import TestCase
 from django.core.exceptions import ValidationError
 from pokemon_app.models import Pokemon, Move # import pokemon model
+from pokemon_app.validators import type_error, validate_many
+from pokedex_proj.search import InProcessIndex
 
 # Create your tests here.
 class pokemon_test(TestCase):
@@ -32,6 +34,23 @@ class pokemon_test(TestCase):
             # we can ensure the correct message is inside our ValidationError
             self.assertTrue('Improper name format' in e.message_dict['name'])
 
+    def test_05_concurrent_level_ups_are_not_lost(self):
+        Pokemon.objects.create(name="Pikachu", level=12)
+        # two requests loaded the same pokemon before either of them saved
+        first, second = Pokemon.objects.get(name="Pikachu"), Pokemon.objects.get(name="Pikachu")
+        first.level_up()
+        second.level_up()
+        with self.subTest():
+            self.assertEquals(second.level, 14)
+        self.assertEquals(Pokemon.objects.get(name="Pikachu").level, 14)
+
+    def test_06_validate_many_matches_the_single_validators(self):
+        rows = [{"name": "Pikachu", "type": "Electric"}, {"name": "ch4r1z4 rd", "type": "plasma"}, {"name": "Pikachu"}, "not a pokemon"]
+        errors = validate_many(rows)
+        self.assertEquals(errors[0], {})
+        self.assertEquals(errors[1], {"name": ["Improper name format"], "type": [type_error("plasma")]})
+        self.assertEquals(errors[2:], [{}, {}])
+
 # Create your tests here.
 class move_test(TestCase):
     def test_03_create_move_instance(self):
@@ -50,4 +69,37 @@ class move_test(TestCase):
             self.fail()
         except ValidationError as e:
             # print(e.message_dict)
-            self.assertTrue("Improper Format" in e.message_dict["name"])
\ No newline at end of file
+            self.assertTrue("Improper Format" in e.message_dict["name"])
+
+
+# the search used when the database isn't Postgres (SQLite in local test runs)
+class search_test(TestCase):
+    def setUp(self):
+        for name, description in [("Mew", "A rare pokemon"), ("Aipom", "Likes to copy mewtwo"), ("Charizard", "Breathes fire")]:
+            Pokemon.objects.create(name=name, description=description)
+        self.index = InProcessIndex(Pokemon.objects.all(), ["name", "description"])
+
+    def names(self, *words):
+        return [Pokemon.objects.get(id=id).name for id in self.index.search(list(words))]
+
+    def test_07_exact_words_rank_before_prefixes(self):
+        # "Aipom" comes first by name, but "mew" is only a prefix of its "mewtwo"
+        self.assertEquals(self.names("mew"), ["Mew", "Aipom"])
+
+    def test_08_prefixes_match(self):
+        with self.subTest():
+            self.assertEquals(self.names("char"), ["Charizard"])
+        self.assertEquals(self.names("breat", "fi"), ["Charizard"])
+
+    def test_09_typos_match(self):
+        with self.subTest():
+            self.assertEquals(self.names("charizrd"), ["Charizard"])
+        # "rar" is a prefix of "rare", "mewtow" a typo of "mewtwo"
+        with self.subTest():
+            self.assertEquals(self.names("mewtow"), ["Aipom"])
+        self.assertEquals(self.names("pokemon", "rar"), ["Mew"])
+
+    def test_10_every_word_has_to_match(self):
+        with self.subTest():
+            self.assertEquals(self.names("mew", "rare"), ["Mew"])
+        self.assertEquals(self.names("mew", "squirtle"), [])
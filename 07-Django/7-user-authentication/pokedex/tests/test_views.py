@@ -8,9 +8,49 @@ from django.urls import reverse
 
 # we can import all the expected answers from our answer.py file
 from tests.answers import all_pokemon, a_pokemon, all_moves, a_move
+import base64
 import json
 from unittest.mock import patch
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
+from pokemon_app.models import Pokemon
+from move_app.models import Move
+from pokedex_proj.cache import pokedex_cache
+from pokedex_proj.search import has_trigram, trigram_matches
+from pokedex_proj.pagination import PokemonPagination
+from pokedex_proj.benchmarks import full_scans, unbounded_seek
+from pokemon_app.filters import ORDERINGS, filter_pokemon
+from pokemon_app.serializers import PokemonSerializer, PokemonValuesSerializer
+from move_app.serializers import MoveSerializer, MoveValuesSerializer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.parsers import JSONParser
+from rest_framework.exceptions import APIException, ErrorDetail, ParseError
+from pokedex_proj.renderers import FastJSONParser, FastJSONRenderer
+from pokedex_proj.compression import CODECS, brotli, choose_encoding, zstandard
+from unittest import skipUnless
+import gzip
+from django.utils.translation import gettext_lazy
+import datetime
+import decimal
+import io
+import uuid
+from pokemon_app.management.commands.bench_pokemon_filters import CASES, cursor_page
+from django.http import QueryDict
+from trainer_app.authentication import token_cache
+from trainer_app.models import Trainer
+from rest_framework.authtoken.models import Token
+from trainer_app import hashers
+from trainer_app.hashers import PBKDF2PasswordHasher
+from threading import Semaphore
+import threading
+from tests.stub_upstream import StubUpstream
+from api_app.cache import UpstreamCache
+from api_app.client import get_client
+from api_app.views import icon_cache, noun_project
+from api_app.upstream import Upstream, UpstreamUnavailable
+import time
+import asyncio
 
 
 class Test_views(TestCase):
@@ -22,6 +62,8 @@ class Test_views(TestCase):
     # test by prepending it with self
     def setUp(self):
         client = Client()
+        # responses are cached across requests, start every test with an empty cache
+        pokedex_cache().clear()
 
     def test_001_get_all_pokemon(self):
         # client sends a get request to a url path by url name
@@ -87,22 +129,805 @@ class Test_views(TestCase):
         response = self.client.delete(reverse('a_pokemon', args=['geodude']))
         self.assertEquals(response.status_code, 204)
 
+    def test_006_get_all_moves(self):
+        response = self.client.get(reverse("all_moves"))
+        self.assertEquals(json.loads(response.content), all_moves)
+
+    def test_007_all_pokemon_query_count_is_constant(self):
+        # 1 ETag aggregate + 1 query for the pokemon + 1 query for all of their moves
+        with self.assertNumQueries(3):
+            self.client.get(reverse("all_pokemon"))
+        # adding more rows (and more move links) should NOT add more queries
+        psychic = Move.objects.get(id=1)
+        for name in ["Bulbasaur", "Squirtle", "Onix", "Zubat"]:
+            Pokemon.objects.create(name=name).moves.add(psychic)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("all_pokemon"))
+        self.assertEquals(len(response.data), 8)
+
+    def test_008_all_moves_query_count_is_constant(self):
+        with self.assertNumQueries(3):
+            self.client.get(reverse("all_moves"))
+        for name in ["Tackle", "Surf", "Ember"]:
+            Move.objects.create(name=name).pokemon.add(*Pokemon.objects.all())
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("all_moves"))
+        self.assertEquals(len(response.data), 4)
+
+    def test_009_paginate_pokemon_with_cursor(self):
+        # fixtures are Blastoise, Charizard, Eevee, Pikachu in name order
+        response = self.client.get(reverse("all_pokemon"), {"page_size": 3})
+        with self.subTest():
+            self.assertEquals([p["name"] for p in response.data["results"]], ["Blastoise", "Charizard", "Eevee"])
+            self.assertIsNone(response.data["previous"])
+        response = self.client.get(response.data["next"])
+        with self.subTest():
+            self.assertEquals([p["name"] for p in response.data["results"]], ["Pikachu"])
+            self.assertIsNone(response.data["next"])
+        response = self.client.get(response.data["previous"])
+        self.assertEquals([p["name"] for p in response.data["results"]], ["Blastoise", "Charizard", "Eevee"])
+
+    def test_010_paginate_pokemon_with_duplicate_names(self):
+        # (name, id) keeps rows with the same name from being skipped or repeated
+        Pokemon.objects.create(name="Eevee")
+        names, url, params = [], reverse("all_pokemon"), {"page_size": 2}
+        while url:
+            response = self.client.get(url, params)
+            names += [p["name"] for p in response.data["results"]]
+            url, params = response.data["next"], None
+        self.assertEquals(names, ["Blastoise", "Charizard", "Eevee", "Eevee", "Pikachu"])
+
+    def test_011_paginate_moves_and_reject_bad_cursor(self):
+        Move.objects.create(name="Tackle")
+        response = self.client.get(reverse("all_moves"), {"page_size": 1})
+        with self.subTest():
+            self.assertEquals(response.data["results"][0]["name"], "Psychich")
+        response = self.client.get(response.data["next"])
+        with self.subTest():
+            self.assertEquals(response.data["results"][0]["name"], "Tackle")
+            self.assertIsNone(response.data["next"])
+        response = self.client.get(reverse("all_moves"), {"cursor": "not-a-cursor"})
+        self.assertEquals(response.status_code, 404)
+
+    def test_012_stream_pokemon_export(self):
+        response = self.client.get(reverse("pokemon_export"))
+        with self.subTest():
+            self.assertTrue(response.streaming)
+        # the streamed array is the same body the list endpoint returns
+        self.assertEquals(json.loads(b"".join(response.streaming_content)), all_pokemon)
+
+    def test_013_stream_moves_export_as_ndjson(self):
+        response = self.client.get(reverse("move_export"), {"ndjson": 1})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        with self.subTest():
+            self.assertEquals(response["Content-Type"], "application/x-ndjson")
+        self.assertEquals([json.loads(line) for line in lines], all_moves)
+
+    def test_014_cached_reads_skip_the_database(self):
+        # the first lookup by name resolves it to an id, the second one caches its ETag too
+        for _ in range(2):
+            self.client.get(reverse("all_pokemon"))
+            self.client.get(reverse("a_pokemon", args=["pikachu"]))
+            self.client.get(reverse("a_move", args=["psychich"]))
+        with self.assertNumQueries(0):
+            self.assertEquals(self.client.get(reverse("all_pokemon")).data, all_pokemon)
+            self.assertEquals(self.client.get(reverse("a_pokemon", args=["pikachu"])).data, a_pokemon)
+            self.assertEquals(self.client.get(reverse("a_move", args=["psychich"])).data, a_move)
+
+    def test_015_writes_invalidate_cached_reads(self):
+        self.client.get(reverse("all_pokemon"))
+        self.client.get(reverse("a_pokemon", args=["eevee"]))
+        self.client.get(reverse("a_move", args=["psychich"]))
+        self.client.put(reverse("a_pokemon", args=["eevee"]), data={"level_up": True}, content_type="application/json")
+        with self.subTest():
+            self.assertEquals(self.client.get(reverse("a_pokemon", args=["eevee"])).data["level"], 26)
+            self.assertEquals(self.client.get(reverse("all_pokemon")).data[2]["level"], 26)
+        # changing the m2m link from the move's side still clears the pokemon's payload
+        Move.objects.get(id=1).pokemon.remove(Pokemon.objects.get(name="Eevee"))
+        with self.subTest():
+            self.assertEquals(self.client.get(reverse("a_pokemon", args=[4])).data["moves"], [])
+            self.assertEquals(self.client.get(reverse("a_move", args=["psychich"])).data["pokemon"], ["Blastoise"])
+        self.client.delete(reverse("a_pokemon", args=["eevee"]))
+        with self.subTest():
+            self.assertEquals(self.client.get(reverse("a_pokemon", args=["eevee"])).status_code, 404)
+        self.assertEquals(len(self.client.get(reverse("all_pokemon")).data), 3)
+
+    def test_016_renamed_pokemon_is_not_served_under_its_old_name(self):
+        self.client.get(reverse("a_pokemon", args=["pikachu"]))
+        pikachu = Pokemon.objects.get(name="Pikachu")
+        pikachu.name = "Raichu"
+        pikachu.save()
+        with self.subTest():
+            self.assertEquals(self.client.get(reverse("a_pokemon", args=["pikachu"])).status_code, 404)
+        self.assertEquals(self.client.get(reverse("a_pokemon", args=["raichu"])).data["id"], 1)
+
+    def test_017_if_none_match_returns_304(self):
+        for url in [reverse("all_pokemon"), reverse("a_pokemon", args=["pikachu"]), reverse("all_moves"), reverse("a_move", args=["psychich"])]:
+            etag = self.client.get(url)["ETag"]
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            with self.subTest(url=url):
+                self.assertEquals(response.status_code, 304)
+                self.assertEquals(response.content, b"")
+
+    def test_018_etag_changes_after_a_write(self):
+        pokemon_etag = self.client.get(reverse("a_pokemon", args=["eevee"]))["ETag"]
+        move_etag = self.client.get(reverse("a_move", args=["psychich"]))["ETag"]
+        list_etag = self.client.get(reverse("all_pokemon"))["ETag"]
+        # renaming the move changes every payload that lists it
+        psychic = Move.objects.get(id=1)
+        psychic.name = "Psychic"
+        psychic.save()
+        with self.subTest():
+            response = self.client.get(reverse("a_pokemon", args=["eevee"]), HTTP_IF_NONE_MATCH=pokemon_etag)
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals(response.data["moves"], ["Psychic"])
+        with self.subTest():
+            self.assertEquals(self.client.get(reverse("all_pokemon"), HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+        # the eevee <-> psychic link going away changes the move's ETag as well
+        Pokemon.objects.get(name="Eevee").moves.clear()
+        response = self.client.get(reverse("a_move", args=["psychic"]), HTTP_IF_NONE_MATCH=move_etag)
+        self.assertEquals(response.data["pokemon"], ["Blastoise"])
+
+    def test_019_bulk_create_pokemon(self):
+        new_pokemon = [
+            {"name": "Bulbasaur", "type": "grass", "moves": [1]},
+            {"name": "Squirtle", "level": 7, "type": "water"},
+            {"name": "Onix", "type": "rock", "captured": True, "moves": [1]},
+        ]
+        # move id check, 1 INSERT for the pokemon, 1 INSERT for every move link, 1 ETag stamp UPDATE
+        # and the transaction's SAVEPOINT/RELEASE, no matter how many pokemon are sent
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse("pokemon_bulk"), data=new_pokemon, content_type="application/json")
+        with self.subTest():
+            self.assertEquals(response.status_code, 201)
+            self.assertEquals(len(response.data["created"]), 3)
+        onix = self.client.get(reverse("a_pokemon", args=["onix"])).data
+        with self.subTest():
+            self.assertEquals(onix["moves"], ["Psychich"])
+        self.assertEquals(
+            self.client.get(reverse("a_move", args=["psychich"])).data["pokemon"],
+            ["Blastoise", "Eevee", "Bulbasaur", "Onix"],
+        )
+
+    def test_020_bulk_create_reports_errors_per_item(self):
+        response = self.client.post(reverse("pokemon_bulk"), data=[
+            {"name": "Bulbasaur"},
+            {"name": "squirtle 2"},
+            {"name": "Onix", "moves": [99]},
+        ], content_type="application/json")
+        with self.subTest():
+            self.assertEquals(response.status_code, 400)
+            self.assertEquals(response.data[0], {})
+            self.assertIn("name", response.data[1])
+        self.assertFalse(Pokemon.objects.filter(name="Bulbasaur").exists())
+
+    def test_021_bulk_update_pokemon(self):
+        self.client.get(reverse("all_pokemon"))
+        response = self.client.patch(reverse("pokemon_bulk"), data=[
+            {"id": 1, "level": 40, "moves": [1]},
+            {"id": 2, "captured": False, "description": "Definitely not a dragon"},
+        ], content_type="application/json")
+        with self.subTest():
+            self.assertEquals(response.status_code, 200)
+        pikachu = self.client.get(reverse("a_pokemon", args=[1])).data
+        with self.subTest():
+            self.assertEquals((pikachu["level"], pikachu["moves"]), (40, ["Psychich"]))
+        # the cached list was invalidated
+        charizard = self.client.get(reverse("all_pokemon")).data[1]
+        self.assertEquals((charizard["captured"], charizard["level"]), (False, 25))
+
+    def test_022_bulk_update_unknown_id(self):
+        response = self.client.patch(reverse("pokemon_bulk"), data=[{"id": 1, "level": 3}, {"id": 99}], content_type="application/json")
+        with self.subTest():
+            self.assertEquals(response.status_code, 400)
+        self.assertEquals(response.data, [{}, {"id": ["No pokemon matches this id"]}])
+
+    def test_023_put_issues_a_single_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(reverse("a_pokemon", args=["pikachu"]), data={
+                "level_up": True,
+                "captured": False,
+                "moves": 1,
+                "description": "Only the best electric type pokemon",
+            }, content_type="application/json")
+        updates = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        with self.subTest():
+            self.assertEquals(response.status_code, 204)
+            self.assertEquals(len(updates), 1)
+            # only the columns that changed are written
+            self.assertNotIn('"name"', updates[0])
+        pikachu = self.client.get(reverse("a_pokemon", args=["pikachu"])).data
+        self.assertEquals(
+            (pikachu["level"], pikachu["captured"], pikachu["moves"], pikachu["description"]),
+            (13, False, ["Psychich"], "Only the best electric type pokemon"),
+        )
+
+    def test_024_put_with_invalid_change_writes_nothing(self):
+        response = self.client.put(reverse("a_pokemon", args=["pikachu"]), data={"level_up": True, "type": "plastic"}, content_type="application/json")
+        with self.subTest():
+            self.assertEquals(response.status_code, 400)
+        self.assertEquals(Pokemon.objects.get(id=1).level, 12)
+
+    def test_025_name_lookups_are_case_insensitive(self):
+        with self.subTest():
+            self.assertEquals(self.client.get(reverse("a_pokemon", args=["PIKACHU"])).data, a_pokemon)
+        self.assertEquals(self.client.get(reverse("a_move", args=["pSyChIcH"])).data, a_move)
+
+    def test_026_search_pokemon_by_prefix(self):
+        response = self.client.get(reverse("pokemon_search"), {"q": "pika"})
+        with self.subTest():
+            self.assertEquals(response.status_code, 200)
+        self.assertEquals((response.data["count"], response.data["results"]), (1, [a_pokemon]))
+
+    def test_027_search_matches_descriptions(self):
+        response = self.client.get(reverse("pokemon_search"), {"q": "turtle"})
+        self.assertEquals([pokemon["name"] for pokemon in response.data["results"]], ["Blastoise"])
+
+    def test_028_search_tolerates_typos(self):
+        if connection.vendor == "postgresql" and not has_trigram(connection):
+            self.skipTest("pg_trgm is not installed")
+        response = self.client.get(reverse("pokemon_search"), {"q": "charizrd"})
+        with self.subTest():
+            self.assertEquals([pokemon["name"] for pokemon in response.data["results"]], ["Charizard"])
+        response = self.client.get(reverse("move_search"), {"q": "psychic"})
+        self.assertEquals(response.data["results"], [a_move])
+
+    def test_029_search_requires_a_query(self):
+        self.assertEquals(self.client.get(reverse("pokemon_search")).status_code, 400)
+
+    def test_030_filter_pokemon_list(self):
+        names = lambda params: [pokemon["name"] for pokemon in self.client.get(reverse("all_pokemon"), params).data]
+        with self.subTest():
+            self.assertEquals(names({"type": "normal", "level_min": 20}), ["Charizard", "Eevee"])
+        with self.subTest():
+            self.assertEquals(names({"captured": "false", "ordering": "-level"}), ["Blastoise", "Eevee"])
+        with self.subTest():
+            self.assertEquals(names({"move": "psychich"}), ["Blastoise", "Eevee"])
+        self.assertEquals(names({"move": 1, "level_max": 30}), ["Eevee"])
+
+    def test_031_invalid_filters_return_400(self):
+        response = self.client.get(reverse("all_pokemon"), {"type": "plastic", "level_min": 0, "ordering": "description"})
+        with self.subTest():
+            self.assertEquals(response.status_code, 400)
+        self.assertEquals(set(response.data), {"type", "level_min", "ordering"})
+
+    def test_032_descending_keyset_pages(self):
+        seen = []
+        url = reverse("all_pokemon") + "?ordering=-level&page_size=1"
+        while url:
+            page = self.client.get(url).data
+            seen += [pokemon["name"] for pokemon in page["results"]]
+            url = page["next"]
+        self.assertEquals(seen, ["Blastoise", "Eevee", "Charizard", "Pikachu"])
+
+    def test_033_filters_are_index_backed(self):
+        # every case of `bench_pokemon_filters` has to be answerable without reading the whole table
+        if connection.vendor == "postgresql":
+            # the fixtures are tiny, make the planner prefer an index whenever one can be used
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        for case in CASES:
+            queryset, ordering = filter_pokemon(Pokemon.objects.all(), QueryDict(case))
+            with self.subTest(case=case):
+                self.assertEquals(full_scans(queryset.order_by(*ordering)[:21].explain(), "pokemon_app_pokemon"), [])
+        # and later pages of every ordering start right at their cursor
+        for ordering in ORDERINGS.values():
+            with self.subTest(ordering=ordering):
+                self.assertEquals(unbounded_seek(cursor_page(ordering).explain(), ordering[0].lstrip("-")), [])
+
+    def test_034_bulk_create_validates_names_and_types_per_item(self):
+        response = self.client.post(reverse("pokemon_bulk"), data=[
+            {"name": "Bulbasaur", "type": "grass"},
+            {"name": "bulbasaur", "type": "plasma", "level": 0},
+            {"name": "Onix", "type": "Rock"},
+            {"name": "", "type": "plasma"},
+        ], content_type="application/json")
+        with self.subTest():
+            self.assertEquals(response.status_code, 400)
+        with self.subTest():
+            self.assertEquals((response.data[0], response.data[2]), ({}, {}))
+        with self.subTest():
+            # the batch check is merged with the errors every field reports on its own
+            self.assertEquals(sorted(response.data[1]), ["level", "name", "type"])
+            self.assertEquals(response.data[1]["name"], ["Improper name format"])
+        # a blank name is only reported once, by the field itself
+        self.assertEquals(response.data[3]["name"], ["This field may not be blank."])
+
+    def test_035_values_serializers_match_the_model_serializers(self):
+        # the list endpoints build their rows from values(), the bytes have to stay the same
+        renderer = JSONRenderer()
+        # related names are listed by id whatever order they were linked in
+        Pokemon.objects.get(name="Pikachu").moves.add(Move.objects.create(name="Tackle"), Move.objects.get(id=1))
+        for ordering in ORDERINGS.values():
+            queryset = Pokemon.objects.order_by(*ordering)
+            expected = PokemonSerializer(PokemonSerializer.setup_eager_loading(queryset), many=True).data
+            with self.subTest(ordering=ordering):
+                self.assertEquals(renderer.render(PokemonValuesSerializer(PokemonValuesSerializer.values(queryset)).data), renderer.render(expected))
+        queryset = Move.objects.order_by("id")
+        expected = MoveSerializer(MoveSerializer.setup_eager_loading(queryset), many=True).data
+        with self.subTest():
+            self.assertEquals(renderer.render(MoveValuesSerializer(MoveValuesSerializer.values(queryset)).data), renderer.render(expected))
+        # a page (a list of rows) instead of a whole queryset
+        page = list(PokemonValuesSerializer.values(Pokemon.objects.order_by("-name", "-id"))[:1])
+        self.assertEquals(PokemonValuesSerializer(page).data[0]["moves"], ["Psychich", "Tackle"])
+
+    def test_036_search_skips_rows_deleted_after_ranking(self):
+        pikachu = Pokemon.objects.get(name="Pikachu")
+        with patch("pokedex_proj.search.search_ids", return_value=[pikachu.id, 999999]):
+            response = self.client.get(reverse("pokemon_search"), {"q": "pika"})
+        with self.subTest():
+            self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.data["results"], [a_pokemon])
+
+    def test_037_cursors_only_work_with_their_ordering(self):
+        url = self.client.get(reverse("all_pokemon"), {"ordering": "name", "page_size": 1}).data["next"]
+        with self.subTest():
+            self.assertEquals(self.client.get(url.replace("ordering=name", "ordering=level")).status_code, 404)
+        # the right ordering but a value that doesn't fit the column
+        payload = json.dumps({"p": ["not a level", 1], "o": ["level", "id"], "r": False})
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        response = self.client.get(reverse("all_pokemon"), {"ordering": "level", "cursor": cursor})
+        self.assertEquals(response.status_code, 404)
+
+    def test_038_bulk_update_rejects_bad_batches(self):
+        response = self.client.patch(reverse("pokemon_bulk"), data=[{"id": 1, "level": 3}, {"id": 1, "level": 4}], content_type="application/json")
+        with self.subTest():
+            self.assertEquals((response.status_code, response.data), (400, [{}, {"id": ["This pokemon appears more than once in the batch."]}]))
+        with self.subTest():
+            self.assertEquals(Pokemon.objects.get(id=1).level, 12)
+        response = self.client.patch(reverse("pokemon_bulk"), data={"id": 1, "level": 3}, content_type="application/json")
+        self.assertEquals((response.status_code, response.data), (400, {"non_field_errors": ["Expected a list of pokemon"]}))
+
+    def test_039_cursor_pages_seek_in_the_index(self):
+        paginator = PokemonPagination()
+        page = Pokemon.objects.order_by(*paginator.ordering).filter(paginator.seek(Pokemon, ["Charizard", 2], False))
+        with self.subTest():
+            self.assertEquals(list(page.values_list("name", flat=True)), ["Eevee", "Pikachu"])
+        if connection.vendor != "postgresql":
+            return
+        # a later page starts right at the cursor in the (name, id) index, nothing before it is read
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = page[:21].explain()
+        with self.subTest():
+            self.assertIn("Index Cond: (ROW((name)::text, id) > ROW('Charizard'::text, 2))", plan)
+        self.assertNotIn("Filter:", plan)
+    def test_040_typo_search_filters_with_the_trigram_operator(self):
+        # `name % q` is what the gin_trgm_ops index answers, similarity() is only used to rank
+        if connection.vendor != "postgresql":
+            self.skipTest("Postgres only")
+        sql = str(trigram_matches(Pokemon.objects.all(), "charizrd").query)
+        where, order_by = sql.split(" ORDER BY ")
+        with self.subTest():
+            self.assertIn('"pokemon_app_pokemon"."name" % charizrd', where)
+        self.assertNotIn("SIMILARITY", where)
+
+    async def test_041_exports_stream_asynchronously_under_asgi(self):
+        # a sync iterator would be read into a list by the ASGI handler before anything is sent
+        response = await self.async_client.get(reverse("pokemon_export"))
+        with self.subTest():
+            self.assertTrue(response.is_async)
+        self.assertEquals(json.loads(b"".join([chunk async for chunk in response.streaming_content])), all_pokemon)
+        response = await self.async_client.get(reverse("move_export"), {"ndjson": 1})
+        lines = b"".join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEquals([json.loads(line) for line in lines], all_moves)
+
+    def test_042_unknown_move_is_a_404(self):
+        response = self.client.get(reverse("a_move", args=["splash"]))
+        self.assertEquals(response.status_code, 404)
+
+    def test_043_types_are_stored_lowercase_and_filtered_in_any_case(self):
+        self.client.post(reverse("all_pokemon"), data={"name": "Vulpix", "type": "Fire"}, content_type="application/json")
+        self.client.post(reverse("pokemon_bulk"), data=[{"name": "Ponyta", "type": "FIRE"}], content_type="application/json")
+        Pokemon.objects.create(name="Growlithe", type="fIrE")
+        with self.subTest():
+            self.assertEquals(set(Pokemon.objects.filter(name__in=["Vulpix", "Ponyta", "Growlithe"]).values_list("type", flat=True)), {"fire"})
+        names = [pokemon["name"] for pokemon in self.client.get(reverse("all_pokemon"), {"type": "Fire"}).data]
+        self.assertEquals(names, ["Growlithe", "Ponyta", "Vulpix"])
+
+
+class JSONRendererTest(TestCase):
+    # values whose JSON spelling could differ between orjson and DRF's json based renderer
+    data = {
+        "date_encountered": datetime.date(2008, 1, 1),
+        "date_captured": datetime.datetime(2023, 8, 22, 15, 5, 52, 618249, tzinfo=datetime.timezone.utc),
+        "no_microseconds": datetime.datetime(2023, 8, 22, 15, 5, 52, tzinfo=datetime.timezone.utc),
+        "other_timezone": datetime.datetime(2023, 8, 22, 15, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=-5))),
+        "naive": datetime.datetime(2023, 8, 22, 15, 5),
+        "time": datetime.time(15, 5, 52, 1),
+        "duration": datetime.timedelta(hours=1),
+        "decimal": decimal.Decimal("1.50"),
+        "uuid": uuid.UUID(int=1),
+        "lazy": gettext_lazy("Improper name format"),
+        "error": ErrorDetail("Invalid type", code="invalid"),
+        "unicode": "Pokémon \u2028 \u2029",
+        "huge": 2 ** 70,
+        1: [True, None, ("a", "b")],
+    }
+
+    def test_001_renders_the_same_bytes_as_drf(self):
+        with self.subTest():
+            self.assertEquals(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        small = {key: value for key, value in self.data.items() if key != "huge"}
+        with self.subTest():
+            # without the huge integer orjson encodes the whole thing itself
+            expected = JSONRenderer().render(small)
+            with patch("pokedex_proj.renderers.renderers.JSONRenderer.render") as drf_render:
+                self.assertEquals(FastJSONRenderer().render(small), expected)
+            drf_render.assert_not_called()
+        # pretty printing is left to DRF
+        self.assertEquals(
+            FastJSONRenderer().render(small, "application/json; indent=4"), JSONRenderer().render(small, "application/json; indent=4")
+        )
+
+    def test_002_renders_without_orjson(self):
+        with patch("pokedex_proj.renderers.orjson", None):
+            self.assertEquals(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_003_parses_like_drf(self):
+        for body in [b'{"name": "Pikachu", "level": 12, "moves": [1, 2]}', '["Pokémon"]'.encode(), b"[%d]" % 2 ** 70]:
+            with self.subTest(body=body):
+                self.assertEquals(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        for body in [b'{"name": ', b"[NaN]"]:
+            with self.subTest(body=body):
+                with self.assertRaisesMessage(ParseError, "JSON parse error"):
+                    FastJSONParser().parse(io.BytesIO(body))
+
+    def test_004_api_responses_are_unchanged(self):
+        response = self.client.get(reverse("a_pokemon", args=[Pokemon.objects.create(name="Pikachu").id]))
+        with self.subTest():
+            self.assertEquals(response.content, JSONRenderer().render(response.data))
+        response = self.client.post(reverse("all_pokemon"), data='{"name": "Eevee", "level": 5}', content_type="application/json")
+        self.assertEquals((response.status_code, response.data["level"]), (201, 5))
+
+
+class CompressionTest(TestCase):
+    fixtures = ["pokemon_data.json", "moves_data.json"]
+
+    def setUp(self):
+        pokedex_cache().clear()
+        # the fixture lists are small, compress anything over 300 bytes (a single pokemon is less)
+        settings = self.settings(RESPONSE_COMPRESSION={"MIN_SIZE": 300})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def decompress(self, body, encoding):
+        if encoding == "gzip":
+            return gzip.decompress(body)
+        if encoding == "br":
+            return brotli.decompress(body)
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+
+    def test_001_negotiates_the_encoding(self):
+        cases = {
+            "gzip, deflate, br, zstd": "zstd",
+            "gzip, br": "br",
+            "gzip;q=1, br;q=0.5": "gzip",
+            "*": "zstd",
+            "br;q=0, *": "zstd",
+            "identity": None,
+            "": None,
+        }
+        for header, encoding in cases.items():
+            with self.subTest(header=header):
+                self.assertEquals(choose_encoding(header, ["zstd", "br", "gzip"]), encoding)
+
+    @skipUnless(brotli and zstandard, "needs `pip install brotli zstandard`")
+    def test_002_compressed_lists_decompress_to_the_same_body(self):
+        plain = self.client.get(reverse("all_pokemon"))
+        for encoding in ["gzip", "br", "zstd"]:
+            response = self.client.get(reverse("all_pokemon"), HTTP_ACCEPT_ENCODING=encoding)
+            with self.subTest(encoding=encoding):
+                self.assertEquals(response["Content-Encoding"], encoding)
+                self.assertIn("Accept-Encoding", response["Vary"])
+                self.assertEquals(self.decompress(response.content, encoding), plain.content)
+        # the ETag of a compressed body is weak, If-None-Match still matches it
+        with self.subTest():
+            self.assertEquals(response["ETag"], "W/" + plain["ETag"])
+        response = self.client.get(reverse("all_pokemon"), HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEquals(response.status_code, 304)
+
+    def test_003_small_responses_are_not_compressed(self):
+        response = self.client.get(reverse("a_pokemon", args=["pikachu"]), HTTP_ACCEPT_ENCODING="gzip")
+        with self.subTest():
+            self.assertFalse(response.has_header("Content-Encoding"))
+        with self.settings(RESPONSE_COMPRESSION={"MIN_SIZE": 10_000}):
+            response = Client().get(reverse("all_pokemon"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    @skipUnless(brotli, "needs `pip install brotli`")
+    def test_004_streamed_exports_are_compressed(self):
+        plain = b"".join(self.client.get(reverse("pokemon_export")).streaming_content)
+        with self.settings(RESPONSE_COMPRESSION={"STREAM_BLOCK": 64}):
+            response = Client().get(reverse("pokemon_export"), HTTP_ACCEPT_ENCODING="br")
+            chunks = list(response.streaming_content)
+        with self.subTest():
+            self.assertEquals(response["Content-Encoding"], "br")
+            # sent in several blocks, every block can be decoded as soon as it arrives
+            self.assertGreater(len(chunks), 2)
+        self.assertEquals(self.decompress(b"".join(chunks), "br"), plain)
+
+    def test_005_encodings_without_their_library_are_not_offered(self):
+        with patch.dict(CODECS, clear=True, gzip=CODECS["gzip"]):
+            response = Client().get(reverse("all_pokemon"), HTTP_ACCEPT_ENCODING="zstd, br, gzip")
+        self.assertEquals(response["Content-Encoding"], "gzip")
+
 
 class NounProjectTest(TestCase):
     def setUp(self):
         self.client = APIClient()
+        # icons are cached per `types`, start every test without any
+        pokedex_cache().clear()
+        noun_project.reset()
 
-    @patch("requests.get")
-    def test_pokeball_img_api_view(self, mock_get):
+    def test_pokeball_img_api_view(self):
         types = "nomal"
         preview_url = "https://static.thenounproject.com/png/688525-200.png"
-        mock_response = type(
-            "MockResponse",
-            (),
-            {"json": lambda self: {"icon": {"preview_url": preview_url}}},
-        )
-        mock_get.return_value = mock_response()
-        response = self.client.get(reverse("noun_project", args=[types]))
+        # a local server answers in place of api.thenounproject.com
+        with StubUpstream({f"/icon/{types}": (200, {"icon": {"preview_url": preview_url}})}) as upstream:
+            with self.settings(NOUN_PROJECT_URL=upstream.url):
+                response = self.client.get(reverse("noun_project", args=[types]))
         with self.subTest():
             self.assertEqual(response.status_code, 200)
+        with self.subTest():
+            # requests are still signed with our OAuth1 keys
+            self.assertTrue(upstream.calls[0][1]["Authorization"].startswith("OAuth "))
         self.assertEquals(json.loads(response.content), preview_url)
+
+    async def test_upstream_connections_are_reused(self):
+        icon = {"icon": {"preview_url": "https://static.thenounproject.com/png/1-200.png"}}
+        with StubUpstream({"/icon/fire": (200, icon), "/icon/water": (200, icon)}) as upstream:
+            with self.settings(NOUN_PROJECT_URL=upstream.url):
+                await self.async_client.get(reverse("noun_project", args=["fire"]))
+                await self.async_client.get(reverse("noun_project", args=["water"]))
+        # both calls went over the same kept-alive connection (same client port)
+        self.assertEquals(len({port for _, _, port in upstream.calls}), 1)
+
+    def test_upstream_client_is_closed_with_its_loop(self):
+        # what happens to every request's loop under WSGI
+        async def use_client():
+            return get_client()
+
+        client = asyncio.run(use_client())
+        self.assertTrue(client.is_closed)
+
+    def test_icons_are_cached_per_type(self):
+        icon = {"icon": {"preview_url": "https://static.thenounproject.com/png/1-200.png"}}
+        with StubUpstream({"/icon/fire": (200, icon)}) as upstream:
+            with self.settings(NOUN_PROJECT_URL=upstream.url):
+                responses = [self.client.get(reverse("noun_project", args=["fire"])) for _ in range(3)]
+        with self.subTest():
+            self.assertEquals([json.loads(response.content) for response in responses], [icon["icon"]["preview_url"]] * 3)
+        self.assertEquals(len(upstream.calls), 1)
+
+    def test_missing_icons_are_cached_too(self):
+        with StubUpstream({}) as upstream:
+            with self.settings(NOUN_PROJECT_URL=upstream.url):
+                responses = [self.client.get(reverse("noun_project", args=["plastic"])) for _ in range(3)]
+        with self.subTest():
+            self.assertEquals([response.status_code for response in responses], [404] * 3)
+        self.assertEquals(len(upstream.calls), 1)
+
+    async def test_concurrent_misses_share_one_upstream_call(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 200, "https://static.thenounproject.com/png/1-200.png"
+
+        results = await asyncio.gather(*[icon_cache.get("fire", fetch) for _ in range(10)])
+        with self.subTest():
+            self.assertEquals(len(set(results)), 1)
+        self.assertEquals(len(calls), 1)
+
+    async def test_stale_icons_are_served_while_refreshing(self):
+        # ttl=0: every entry is stale as soon as it is stored
+        cache = UpstreamCache("test:icon", ttl=0, stale_ttl=60, negative_ttl=0)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return 200, f"icon-{len(calls)}.png"
+
+        await cache.get("fire", fetch)
+        with self.subTest():
+            # stale answer right away, the refresh runs in the background
+            self.assertEquals(await cache.get("fire", fetch), (200, "icon-1.png"))
+        await asyncio.gather(*map(asyncio.wrap_future, list(cache.pending.values())))
+        self.assertEquals(await cache.get("fire", fetch), (200, "icon-2.png"))
+        await asyncio.gather(*map(asyncio.wrap_future, list(cache.pending.values())))
+
+    def test_stale_icons_are_refreshed_after_the_request_ends(self):
+        # self.client runs the view the way WSGI does, on a loop that is closed with the request
+        old, new = ({"icon": {"preview_url": f"https://static.thenounproject.com/png/{i}-200.png"}} for i in [1, 2])
+        with StubUpstream({"/icon/fire": [(200, old), (200, new)]}) as upstream, patch.object(icon_cache, "ttl", 0):
+            with self.settings(NOUN_PROJECT_URL=upstream.url):
+                self.client.get(reverse("noun_project", args=["fire"]))
+                stale = self.client.get(reverse("noun_project", args=["fire"]))
+                for future in list(icon_cache.pending.values()):
+                    future.result(timeout=5)
+                refreshed = self.client.get(reverse("noun_project", args=["fire"]))
+                for future in list(icon_cache.pending.values()):
+                    future.result(timeout=5)
+        with self.subTest():
+            self.assertEquals(json.loads(stale.content), old["icon"]["preview_url"])
+        self.assertEquals(json.loads(refreshed.content), new["icon"]["preview_url"])
+
+    def test_slow_upstream_answers_503(self):
+        with StubUpstream({}, delay=1) as upstream, patch.object(noun_project, "timeout", 0.1), patch.object(noun_project, "retries", 0):
+            with self.settings(NOUN_PROJECT_URL=upstream.url):
+                response = self.client.get(reverse("noun_project", args=["fire"]))
+        with self.subTest():
+            self.assertEquals(response.status_code, 503)
+        self.client.force_authenticate(Trainer.objects.create_user(email="oak@pallet.com", username="oak@pallet.com", is_staff=True))
+        metrics = self.client.get(reverse("upstream_metrics")).data["noun_project"]
+        self.assertEquals((metrics["timeouts"], metrics["failures"]), (1, 1))
+
+    def test_upstream_metrics_are_for_staff_only(self):
+        with self.subTest():
+            self.assertEquals(self.client.get(reverse("upstream_metrics")).status_code, 401)
+        self.client.force_authenticate(Trainer.objects.create_user(email="ash@pallet.com", username="ash@pallet.com"))
+        self.assertEquals(self.client.get(reverse("upstream_metrics")).status_code, 403)
+
+
+class UpstreamTest(TestCase):
+    # Upstream against a local server that can be slow or fail on purpose
+    def upstream(self, **options):
+        return Upstream("test", **{"TIMEOUT": 0.2, "RETRIES": 0, "BACKOFF": 0.01, "FAILURE_THRESHOLD": 2, "RESET_TIMEOUT": 60, **options})
+
+    async def test_001_timeouts_fail_fast(self):
+        upstream = self.upstream()
+        with StubUpstream({}, delay=1) as server:
+            start = time.perf_counter()
+            with self.assertRaises(UpstreamUnavailable):
+                await upstream.get_json(f"{server.url}/slow")
+        with self.subTest():
+            self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertEquals(upstream.counters["timeouts"], 1)
+
+    async def test_002_errors_are_retried(self):
+        upstream = self.upstream(RETRIES=2)
+        with StubUpstream({"/cats": [(500, {}), (503, {}), (200, {"url": "cat.jpg"})]}) as server:
+            result = await upstream.get_json(f"{server.url}/cats")
+        with self.subTest():
+            self.assertEquals(result, (200, {"url": "cat.jpg"}))
+        self.assertEquals((upstream.counters["retries"], upstream.counters["failures"]), (2, 0))
+
+    async def test_003_retries_are_limited_by_the_budget(self):
+        # one saved retry and no new ones earned
+        upstream = self.upstream(RETRIES=2, RETRY_BURST=1, RETRY_BUDGET=0, FAILURE_THRESHOLD=10)
+        with StubUpstream({"/cats": (500, {})}) as server:
+            for _ in range(2):
+                with self.assertRaises(UpstreamUnavailable):
+                    await upstream.get_json(f"{server.url}/cats")
+        with self.subTest():
+            self.assertEquals(len(server.calls), 3)
+        self.assertEquals((upstream.counters["retries"], upstream.counters["retries_denied"]), (1, 2))
+
+    async def test_004_open_circuit_fails_fast_with_the_last_good_answer(self):
+        upstream = self.upstream()
+        with StubUpstream({"/cats": [(200, {"url": "cat.jpg"}), (500, {})]}) as server:
+            results = [await upstream.get_json(f"{server.url}/cats") for _ in range(5)]
+        with self.subTest():
+            self.assertEquals(results, [(200, {"url": "cat.jpg"})] * 5)
+        with self.subTest():
+            # 1 success + 2 failures opened the circuit, the last 2 calls never left the process
+            self.assertEquals(len(server.calls), 3)
+        self.assertEquals((upstream.state, upstream.counters["short_circuited"]), ("open", 2))
+
+    async def test_005_circuit_closes_after_a_good_trial_call(self):
+        upstream = self.upstream(RESET_TIMEOUT=0)
+        with StubUpstream({"/cats": [(500, {}), (500, {}), (200, {"url": "cat.jpg"})]}) as server:
+            for _ in range(2):
+                with self.assertRaises(UpstreamUnavailable):
+                    await upstream.get_json(f"{server.url}/cats")
+            with self.subTest():
+                self.assertEquals(upstream.state, "open")
+            result = await upstream.get_json(f"{server.url}/cats")
+        with self.subTest():
+            self.assertEquals(result, (200, {"url": "cat.jpg"}))
+        self.assertEquals(upstream.state, "closed")
+
+    async def test_006_only_the_trial_call_ends_the_trial(self):
+        upstream = self.upstream(RESET_TIMEOUT=0, TIMEOUT=1)
+        with StubUpstream({"/before": (500, {}, 0.1), "/trial": (200, {}, 0.5)}) as server:
+            # a call that was let through while the circuit was still closed
+            before = asyncio.create_task(upstream.get_json(f"{server.url}/before"))
+            await asyncio.sleep(0.05)
+            upstream.state, upstream.opened_at = "open", time.monotonic()
+            trial = asyncio.create_task(upstream.get_json(f"{server.url}/trial"))
+            await asyncio.sleep(0.05)
+            with self.assertRaises(UpstreamUnavailable):
+                await before
+            # the trial is still running, no second one may start
+            with self.assertRaises(UpstreamUnavailable):
+                await upstream.get_json(f"{server.url}/trial")
+            await trial
+        self.assertEquals([path for path, _, _ in server.calls], ["/before", "/trial"])
+
+
+class TrainerAuthTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        token_cache.clear()
+        response = self.client.post(reverse("signup"), {"email": "ash@pallet.com", "password": "pikachu123"}, format="json")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.json()['token']}")
+
+    def test_001_cached_token_skips_the_database(self):
+        self.client.get(reverse("info"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("info"))
+        self.assertEquals(response.data, {"email": "ash@pallet.com"})
+
+    def test_002_log_out_invalidates_the_cached_token(self):
+        self.client.get(reverse("info"))
+        with self.subTest():
+            self.assertEquals(self.client.post(reverse("logout")).status_code, 204)
+        self.assertEquals(self.client.get(reverse("info")).status_code, 401)
+
+    def test_003_password_change_invalidates_the_cached_trainer(self):
+        self.client.get(reverse("info"))
+        trainer = Trainer.objects.get(email="ash@pallet.com")
+        trainer.set_password("charmander123")
+        trainer.is_active = False
+        trainer.save()
+        self.assertEquals(self.client.get(reverse("info")).status_code, 401)
+
+    def test_004_log_in_upgrades_old_password_hashes(self):
+        trainer = Trainer.objects.get(email="ash@pallet.com")
+        # a hash made with a much lower cost than the configured one
+        trainer.password = PBKDF2PasswordHasher().encode("pikachu123", "oldsalt", iterations=1000)
+        trainer.save()
+        response = self.client.post(reverse("login"), {"email": "ash@pallet.com", "password": "pikachu123"}, format="json")
+        with self.subTest():
+            self.assertEquals(response.status_code, 200)
+        upgraded = Trainer.objects.get(email="ash@pallet.com").password
+        self.assertEquals(int(upgraded.split("$")[1]), PBKDF2PasswordHasher.iterations)
+
+    def test_005_log_in_answers_503_when_the_hashing_pool_is_full(self):
+        with patch.object(hashers, "slots", Semaphore(0)), patch.object(hashers, "QUEUE_TIMEOUT", 0):
+            response = self.client.post(reverse("login"), {"email": "ash@pallet.com", "password": "pikachu123"}, format="json")
+        self.assertEquals(response.status_code, 503)
+
+    def test_006_sign_up_answers_503_when_the_hashing_pool_is_full(self):
+        with patch.object(hashers, "slots", Semaphore(0)), patch.object(hashers, "QUEUE_TIMEOUT", 0):
+            response = self.client.post(reverse("signup"), {"email": "misty@cerulean.com", "password": "togepi123"}, format="json")
+        with self.subTest():
+            self.assertEquals(response.status_code, 503)
+        self.assertFalse(Trainer.objects.filter(email="misty@cerulean.com").exists())
+
+    def test_007_the_model_raises_a_plain_exception_when_the_pool_is_full(self):
+        # the admin and createsuperuser call set_password/check_password outside of DRF
+        trainer = Trainer.objects.get(email="ash@pallet.com")
+        with patch.object(hashers, "slots", Semaphore(0)), patch.object(hashers, "QUEUE_TIMEOUT", 0):
+            with self.assertRaises(hashers.HashingBusy) as raised:
+                trainer.check_password("pikachu123")
+        self.assertNotIsInstance(raised.exception, APIException)
+
+    def test_008_deleted_tokens_stop_working(self):
+        self.client.get(reverse("info"))
+        # e.g. deleted in the admin, without going through Log_out
+        Token.objects.all().delete()
+        self.assertEquals(self.client.get(reverse("info")).status_code, 401)
+
+    async def test_009_log_in_frees_the_event_loop_while_hashing(self):
+        hashing, done = threading.Event(), threading.Event()
+
+        def verify_password(raw_password, encoded):
+            hashing.set()
+            # False (a 404) if the loop were stuck waiting on this hash and never got to done.set()
+            return done.wait(timeout=5), False
+
+        with patch.object(hashers.hashers, "verify_password", verify_password):
+            login = asyncio.ensure_future(self.async_client.post(reverse("login"), {"email": "ash@pallet.com", "password": "pikachu123"}, content_type="application/json"))
+            await asyncio.to_thread(hashing.wait, 5)
+            done.set()
+            response = await login
+        self.assertEquals(response.status_code, 200)
+
+    def test_010_log_in_rejects_wrong_passwords_and_unknown_emails(self):
+        for email, password in [("ash@pallet.com", "raichu123"), ("gary@pallet.com", "pikachu123")]:
+            with self.subTest(email=email):
+                response = self.client.post(reverse("login"), {"email": email, "password": password}, format="json")
+                self.assertEquals(response.status_code, 404)
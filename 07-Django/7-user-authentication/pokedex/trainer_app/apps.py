@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TrainerAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trainer_app'
+
+    def ready(self):
+        # registers the token cache invalidation receivers
+        from . import signals
@@ -0,0 +1,74 @@
+# trainer_app/authentication.py
+import copy
+import time
+from collections import OrderedDict
+from threading import Lock
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """
+    In-process token key -> (trainer, token) cache. Entries expire after `ttl`
+    seconds and the least recently used entry is dropped once `max_entries` is
+    reached. Every worker process has its own cache, so a change made by one
+    worker reaches the others at most `ttl` seconds later; Log_out and trainer
+    saves (password changes) invalidate the local entries right away.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            user, token, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        # every request gets its own copy so one request changing request.user can't leak into another
+        return copy.copy(user), token
+
+    def set(self, key, user, token):
+        with self.lock:
+            self.entries[key] = (user, token, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def forget(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def forget_user(self, user_id):
+        with self.lock:
+            for key in [key for key, (user, _, _) in self.entries.items() if user.pk == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# settings.TOKEN_CACHE = {"TTL": seconds, "MAX_ENTRIES": n}
+TOKEN_CACHE = getattr(settings, "TOKEN_CACHE", {})
+token_cache = TokenCache(TOKEN_CACHE.get("MAX_ENTRIES", 10_000), TOKEN_CACHE.get("TTL", 60))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    # Same "Authorization: Token <key>" header as DRF's TokenAuthentication, but a token
+    # we've seen recently is answered from `token_cache` instead of a Token + Trainer query
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        # invalid / inactive tokens raise AuthenticationFailed here and are never cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token)
+        return user, token
@@ -0,0 +1,92 @@
+# trainer_app/hashers.py
+# Password hashing for trainers. settings.PASSWORD_HASHING picks the algorithm and
+# its cost, and every hash/check runs on a small bounded thread pool (hashlib,
+# argon2-cffi and bcrypt all release the GIL while hashing). This caps how many
+# hashes run at once, so a burst of logins can't have every request worker burning
+# CPU on hashes at the same time. The async versions (amake_password/averify_password,
+# used by the async Sign_up/Log_in views) don't hold a worker at all while they wait:
+# under ASGI the event loop keeps serving other requests. The sync ones, used by
+# Trainer.set_password/check_password (admin, createsuperuser), block their thread.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+from django.conf import settings
+from django.contrib.auth import hashers
+
+PASSWORD_HASHING = getattr(settings, "PASSWORD_HASHING", {})
+
+
+def cost(name, default):
+    # unset (None) keeps Django's default cost for that algorithm
+    value = PASSWORD_HASHING.get(name)
+    return default if value is None else int(value)
+
+
+# Same algorithm names as Django's hashers so existing hashes keep working. When the
+# cost below changes, `must_update` flags the old hashes and Trainer.check_password
+# re-hashes them on the trainer's next successful login
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = cost("PBKDF2_ITERATIONS", hashers.PBKDF2PasswordHasher.iterations)
+
+
+# needs `pip install argon2-cffi`
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = cost("ARGON2_TIME_COST", hashers.Argon2PasswordHasher.time_cost)
+    memory_cost = cost("ARGON2_MEMORY_COST", hashers.Argon2PasswordHasher.memory_cost)
+
+
+# needs `pip install bcrypt`
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    rounds = cost("BCRYPT_ROUNDS", hashers.BCryptSHA256PasswordHasher.rounds)
+
+
+class HashingBusy(Exception):
+    # raised from Trainer.set_password/check_password, which the admin and
+    # `manage.py createsuperuser` call too. The API views answer it with a 503
+    pass
+
+
+WORKERS = PASSWORD_HASHING.get("WORKERS", 4)
+# how many more hashes may wait for a free worker before we start answering 503
+QUEUE = PASSWORD_HASHING.get("QUEUE", 16)
+QUEUE_TIMEOUT = PASSWORD_HASHING.get("QUEUE_TIMEOUT", 5)
+
+pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="password-hashing")
+slots = BoundedSemaphore(WORKERS + QUEUE)
+
+
+def run(function, *args):
+    if not slots.acquire(timeout=QUEUE_TIMEOUT):
+        raise HashingBusy()
+    try:
+        return pool.submit(function, *args).result()
+    finally:
+        slots.release()
+
+
+async def arun(function, *args):
+    # wait for a slot off the event loop, only when none is free right away
+    if not slots.acquire(blocking=False) and not await asyncio.to_thread(slots.acquire, timeout=QUEUE_TIMEOUT):
+        raise HashingBusy()
+    future = pool.submit(function, *args)
+    # freed when the hash is over, even if the request awaiting it is cancelled first
+    future.add_done_callback(lambda future: slots.release())
+    return await asyncio.wrap_future(future)
+
+
+def make_password(raw_password):
+    return run(hashers.make_password, raw_password)
+
+
+async def amake_password(raw_password):
+    return await arun(hashers.make_password, raw_password)
+
+
+def verify_password(raw_password, encoded):
+    # (is_correct, must_update), must_update is True when `encoded` was made with
+    # another algorithm or cost than the one currently configured
+    return run(hashers.verify_password, raw_password, encoded)
+
+
+async def averify_password(raw_password, encoded):
+    return await arun(hashers.verify_password, raw_password, encoded)
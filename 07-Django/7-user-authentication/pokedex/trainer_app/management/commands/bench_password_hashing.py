@@ -0,0 +1,51 @@
+# python manage.py bench_password_hashing --logins 20 --concurrency 8
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from pokedex_proj.benchmarks import report, time_calls
+from trainer_app import hashers
+from trainer_app.models import Trainer
+
+PASSWORD = "pikachu123"
+
+
+class Command(BaseCommand):
+    help = "Report logins/sec for every password hasher in PASSWORD_HASHERS (skipping the ones whose library isn't installed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=20)
+        parser.add_argument("--concurrency", type=int, default=hashers.WORKERS * 2)
+
+    def handle(self, *args, **options):
+        for hasher in settings.PASSWORD_HASHERS:
+            # the hasher under test hashes new passwords, the rest stay available for upgrades
+            with override_settings(PASSWORD_HASHERS=[hasher, *[h for h in settings.PASSWORD_HASHERS if h != hasher]]):
+                try:
+                    with transaction.atomic():
+                        self.run_hasher(hasher.rsplit(".", 1)[-1], options)
+                        transaction.set_rollback(True)
+                except ValueError as e:
+                    # Django raises ValueError when argon2-cffi / bcrypt are missing
+                    self.stdout.write(f"{hasher}: skipped ({e})")
+
+    def run_hasher(self, name, options):
+        email = "bench@example.com"
+        Trainer.objects.create_user(username=email, email=email, password=PASSWORD)
+        # a full log in: SELECT the trainer + verify its hash on the pool
+        stats = time_calls(lambda: authenticate(username=email, password=PASSWORD), options["logins"])
+        report(self.stdout, f"{name} log in", stats)
+        encoded = Trainer.objects.get(email=email).password
+        # many requests verifying at once, as many as the pool lets through in parallel
+        total = options["logins"] * options["concurrency"]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as requests:
+            list(requests.map(lambda _: hashers.verify_password(PASSWORD, encoded), range(total)))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{'':<45} {1000 / stats['median_ms']:8.1f} logins/sec on one request worker, "
+            f"{total / elapsed:8.1f} logins/sec with {options['concurrency']} concurrent requests ({hashers.WORKERS} hashing workers)"
+        )
@@ -0,0 +1,46 @@
+# python manage.py bench_token_auth --requests 2000
+import random
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from pokedex_proj.benchmarks import report, time_calls
+from trainer_app.authentication import CachedTokenAuthentication, token_cache
+from trainer_app.models import Trainer
+from trainer_app.views import Info
+
+
+class Command(BaseCommand):
+    help = "Send authenticated GET /api/v1/users/info/ requests with DRF's TokenAuthentication and CachedTokenAuthentication, report queries per request and latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trainers", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # plain inserts, the password hash doesn't matter for token auth
+            trainers = Trainer.objects.bulk_create(
+                Trainer(username=f"bench{i}@example.com", email=f"bench{i}@example.com") for i in range(options["trainers"])
+            )
+            keys = [Token.objects.create(user=trainer).key for trainer in trainers]
+            factory = RequestFactory()
+            requests = [
+                factory.get("/api/v1/users/info/", HTTP_AUTHORIZATION=f"Token {random.choice(keys)}")
+                for _ in range(options["requests"])
+            ]
+            for authentication in [TokenAuthentication, CachedTokenAuthentication]:
+                token_cache.clear()
+                self.run_requests(authentication, requests)
+            token_cache.clear()
+            transaction.set_rollback(True)
+
+    def run_requests(self, authentication, requests):
+        view = Info.as_view(authentication_classes=[authentication])
+        pending = iter(requests)
+        with CaptureQueriesContext(connection) as queries:
+            stats = time_calls(lambda: view(next(pending)), len(requests))
+        report(self.stdout, authentication.__name__, stats)
+        self.stdout.write(f"{'':<45} {len(queries) / len(requests):.3f} queries per request")
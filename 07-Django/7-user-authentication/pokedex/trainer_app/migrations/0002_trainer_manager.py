@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-18 16:58
+
+import trainer_app.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainer_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='trainer',
+            managers=[
+                ('objects', trainer_app.models.TrainerManager()),
+            ],
+        ),
+    ]
@@ -1,5 +1,19 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+from . import hashers
+
+
+class TrainerManager(UserManager):
+    # Django's UserManager hashes with make_password() directly, going around
+    # Trainer.set_password (and so the hashing pool). Sign up and createsuperuser use this
+    def _create_user(self, username, email, password, **extra_fields):
+        if not username:
+            raise ValueError("The given username must be set")
+        user = self.model(username=self.model.normalize_username(username), email=self.normalize_email(email), **extra_fields)
+        user.set_password(password)
+        user.save(using=self._db)
+        return user
+
 
 # Inheriting from 'AbstractUser' lets us use all the fields of the default User,
 # and overwrite the fields we need to change
@@ -14,4 +28,30 @@ class Trainer(AbstractUser):
     # notice the absence of a "Password field", that is built in.
     # django uses the 'username' to identify users by default, but many modern applications use 'email' instead
     USERNAME_FIELD = 'email'
-    REQUIRED_FIELDS = [] # Email & Password are required by default.
\ No newline at end of file
+    REQUIRED_FIELDS = [] # Email & Password are required by default.
+
+    objects = TrainerManager()
+
+    # create_user, authenticate() and the admin all hash through these two methods,
+    # we only move the hashing itself onto the bounded pool in hashers.py
+    def set_password(self, raw_password):
+        self.password = hashers.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        is_correct, must_update = hashers.verify_password(raw_password, self.password)
+        if is_correct and must_update:
+            # hashed with an older algorithm/cost: upgrade it now that we know the raw password
+            self.set_password(raw_password)
+            # a re-hash isn't a password change
+            self._password = None
+            self.save(update_fields=["password"])
+        return is_correct
+
+    # same as check_password, for the async Log_in view: awaits the pool instead of blocking
+    async def acheck_password(self, raw_password):
+        is_correct, must_update = await hashers.averify_password(raw_password, self.password)
+        if is_correct and must_update:
+            self.password = await hashers.amake_password(raw_password)
+            await self.asave(update_fields=["password"])
+        return is_correct
@@ -0,0 +1,24 @@
+# trainer_app/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import token_cache
+from .models import Trainer
+
+
+@receiver(post_save, sender=Trainer)
+def trainer_saved(sender, instance, **kwargs):
+    # password changes (set_password + save) and deactivations must not keep
+    # authenticating with the trainer we cached before the change
+    token_cache.forget_user(instance.pk)
+
+
+@receiver(post_delete, sender=Trainer)
+def trainer_deleted(sender, instance, **kwargs):
+    token_cache.forget_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # tokens deleted anywhere else than Log_out (the admin, a shell, ...) stop working right away too
+    token_cache.forget(instance.key)
@@ -1,50 +1,102 @@
 #trainer_app.views
-from django.shortcuts import render
-from django.contrib.auth import authenticate
+import json
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from . import hashers
+from .hashers import HashingBusy
 from .models import Trainer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.status import (
     HTTP_201_CREATED,
+    HTTP_400_BAD_REQUEST,
     HTTP_404_NOT_FOUND,
     HTTP_204_NO_CONTENT,
+    HTTP_503_SERVICE_UNAVAILABLE,
 )
 from rest_framework.authtoken.models import Token
-from rest_framework.authentication import TokenAuthentication
+from .authentication import CachedTokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+def hashing_busy():
+    # every password hashing worker is busy and the queue is full (trainer_app/hashers.py)
+    return JsonResponse("Too many sign ups / log ins at once, try again shortly.", status=HTTP_503_SERVICE_UNAVAILABLE, safe=False)
 
-class Sign_up(APIView):
-    def post(self, request):
-        request.data["username"] = request.data["email"]
-        trainer = Trainer.objects.create_user(**request.data)
-        token = Token.objects.create(user=trainer)
-        return Response(
+
+def credentials(request):
+    # the JSON body DRF's request.data used to parse for us, or None when it isn't an object
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+# Sign up and log in are async: the password hash runs on the pool in hashers.py and,
+# under ASGI, the worker serves other requests while we await it instead of blocking.
+# DRF's APIView can't run async methods so (like Noun_Project) we use Django's View and
+# JsonResponse. They take no session cookie, so like DRF's APIView they're csrf exempt
+@method_decorator(csrf_exempt, name="dispatch")
+class Sign_up(View):
+    async def post(self, request):
+        data = credentials(request)
+        if not data or not data.get("email") or not data.get("password"):
+            return JsonResponse("An email and a password are required", status=HTTP_400_BAD_REQUEST, safe=False)
+        password = data.pop("password")
+        data["username"] = data["email"]
+        # what Trainer.objects.create_user does, with the hash awaited instead of run in this thread
+        trainer = Trainer(**data)
+        trainer.username = Trainer.normalize_username(trainer.username)
+        trainer.email = Trainer.objects.normalize_email(trainer.email)
+        try:
+            trainer.password = await hashers.amake_password(password)
+        except HashingBusy:
+            return hashing_busy()
+        await trainer.asave()
+        token = await Token.objects.acreate(user=trainer)
+        return JsonResponse(
             {"trainer": trainer.email, "token": token.key}, status=HTTP_201_CREATED
         )
-    
-class Log_in(APIView):
-    def post(self, request):
-        email = request.data.get("email")
-        password = request.data.get("password")
-        trainer = authenticate(username=email, password=password)
+
+@method_decorator(csrf_exempt, name="dispatch")
+class Log_in(View):
+    async def post(self, request):
+        data = credentials(request)
+        if data is None:
+            return JsonResponse("An email and a password are required", status=HTTP_400_BAD_REQUEST, safe=False)
+        email = data.get("email")
+        password = data.get("password")
+        # what authenticate() does through the ModelBackend
+        trainer = await Trainer.objects.filter(email=email).afirst() if email else None
+        try:
+            if trainer is None:
+                # hash anyway, so unknown emails take as long to answer as wrong passwords
+                await hashers.amake_password(password)
+            elif not (await trainer.acheck_password(password) and trainer.is_active):
+                trainer = None
+        except HashingBusy:
+            return hashing_busy()
         if trainer:
-            token, created = Token.objects.get_or_create(user=trainer)
-            return Response({"token": token.key, "trainer": trainer.email})
+            token, created = await Token.objects.aget_or_create(user=trainer)
+            return JsonResponse({"token": token.key, "trainer": trainer.email})
         else:
-            return Response("No trainer matching credentials", status=HTTP_404_NOT_FOUND)
+            return JsonResponse("No trainer matching credentials", status=HTTP_404_NOT_FOUND, safe=False)
 
 class Info(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         return Response({"email": request.user.email})  
 
 class Log_out(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        request.user.auth_token.delete()
+        # request.auth is the Token we authenticated with, no need to query it again through request.user
+        # (the token_deleted signal receiver drops it from the token cache)
+        request.auth.delete()
         return Response(status=HTTP_204_NO_CONTENT)      
@@ -125,3 +125,40 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Third-party APIs behind api_project's views, tests point these at a local stub server
+CAT_API_URL = env.get("CAT_API_URL", "https://api.thecatapi.com")
+EBIRD_API_URL = env.get("EBIRD_API_URL", "https://api.ebird.org")
+
+# `python manage.py ingest_ebird` fetches these regions every INTERVAL seconds and
+# keeps KEEP_DAYS days of observations for Random_birds to serve
+EBIRD_INGEST = {
+    "REGIONS": ["US-TX-453"],
+    "INTERVAL": 60 * 15,
+    "KEEP_DAYS": 30,
+}
+
+# Timeouts (seconds), retries and circuit breaker of each API (api_project/upstream.py)
+UPSTREAMS = {
+    "cat_api": {
+        "TIMEOUT": 3,
+        "RETRIES": 2,
+        "FAILURE_THRESHOLD": 5,
+        "RESET_TIMEOUT": 30,
+    },
+    "ebird": {
+        "TIMEOUT": 5,
+        "RETRIES": 2,
+        "FAILURE_THRESHOLD": 5,
+        "RESET_TIMEOUT": 30,
+    },
+}
+
+# Pooled async HTTP client used for upstream calls (api_project/client.py). Timeouts in seconds
+UPSTREAM_HTTP = {
+    "CONNECT_TIMEOUT": 2,
+    "TIMEOUT": 5,
+    "MAX_CONNECTIONS": 100,
+    "MAX_KEEPALIVE": 20,
+    "KEEPALIVE_EXPIRY": 30,
+}
@@ -18,8 +18,11 @@ from django.contrib import admin
 from django.urls import path
 from api_project.views import Random_cats
 from api_project.views import Random_birds
+from api_project.views import Upstream_metrics
 
 urlpatterns = [
     path('',Random_cats.as_view(),name='Random_cats'),
-    path('', Random_birds.as_view(), name='Random_birds')
+    # both views used to share '' so Random_birds could never be reached
+    path('birds/', Random_birds.as_view(), name='Random_birds'),
+    path('metrics/', Upstream_metrics.as_view(), name='Upstream_metrics')
 ]
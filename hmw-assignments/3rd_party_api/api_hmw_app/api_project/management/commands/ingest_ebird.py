@@ -0,0 +1,88 @@
+# python manage.py ingest_ebird                      (every EBIRD_INGEST["INTERVAL"] seconds)
+# python manage.py ingest_ebird --once --regions US-TX-453 US-CA
+import asyncio
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from api_hmw_app.settings import env
+from api_project.client import get_client
+from api_project.models import Observation
+from api_project.serializers import ObservationSerializer
+from api_project.upstream import UpstreamUnavailable
+from api_project.views import ebird
+
+UPDATE_FIELDS = [
+    "region", "common_name", "scientific_name", "location_id", "location_name", "observed_at",
+    "how_many", "lat", "lng", "valid", "reviewed", "location_private",
+]
+
+
+class Command(BaseCommand):
+    help = "Fetch recent eBird observations for several regions at once and store them in the Observation table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--regions", nargs="+", default=settings.EBIRD_INGEST["REGIONS"])
+        parser.add_argument("--interval", type=int, default=settings.EBIRD_INGEST["INTERVAL"])
+        parser.add_argument("--keep-days", type=int, default=settings.EBIRD_INGEST["KEEP_DAYS"])
+        parser.add_argument("--once", action="store_true", help="ingest one time and exit instead of looping")
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            results = asyncio.run(self.fetch_all(options["regions"]))
+            for region, observations in results.items():
+                if observations is None:
+                    self.stderr.write(f"{region}: eBird unavailable, keeping the rows we have")
+                    continue
+                try:
+                    stored = self.store(region, observations, options["keep_days"])
+                except Exception as e:
+                    # one region failing mustn't stop the others (or the loop)
+                    self.stderr.write(f"{region}: storing failed ({e!r}), keeping the rows we have")
+                    continue
+                self.stdout.write(f"{region}: {stored} observations")
+            self.stdout.write(f"ingested {len(results)} regions in {time.perf_counter() - start:.2f}s")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
+
+    async def fetch_all(self, regions):
+        # every region at once, over the pooled client (its limits cap the connections).
+        # Each pass runs on a new loop (asyncio.run) with a client of its own, closed here
+        try:
+            answers = await asyncio.gather(*[self.fetch(region) for region in regions])
+        finally:
+            await get_client().aclose()
+        return dict(zip(regions, answers))
+
+    async def fetch(self, region):
+        headers = {"X-eBirdApiToken": env.get("BIRD_API_KEY") or ""}
+        try:
+            status, observations = await ebird.get_json(f"{settings.EBIRD_API_URL}/v2/data/obs/{region}/recent", headers=headers)
+        except UpstreamUnavailable:
+            return None
+        return observations if status == 200 else None
+
+    def store(self, region, observations, keep_days):
+        # returns how many observations were stored, malformed ones are skipped
+        rows = []
+        for item in observations:
+            try:
+                rows.append(ObservationSerializer.from_ebird(region, item))
+            except (KeyError, TypeError, serializers.ValidationError) as e:
+                self.stderr.write(f"{region}: skipping malformed observation ({e!r}): {item!r}"[:500])
+        with transaction.atomic():
+            # one INSERT ... ON CONFLICT (sub_id, species_code) DO UPDATE per batch
+            Observation.objects.bulk_create(
+                rows,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=["sub_id", "species_code"],
+                update_fields=UPDATE_FIELDS,
+            )
+            Observation.objects.filter(region=region, observed_at__lt=timezone.now() - timedelta(days=keep_days)).delete()
+        return len(rows)
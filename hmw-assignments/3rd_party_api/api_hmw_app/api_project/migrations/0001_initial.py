@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Observation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=20)),
+                ('species_code', models.CharField(max_length=20)),
+                ('common_name', models.CharField(max_length=200)),
+                ('scientific_name', models.CharField(max_length=200)),
+                ('location_id', models.CharField(max_length=20)),
+                ('location_name', models.CharField(max_length=255)),
+                ('observed_at', models.DateTimeField()),
+                ('how_many', models.IntegerField(null=True)),
+                ('lat', models.FloatField()),
+                ('lng', models.FloatField()),
+                ('valid', models.BooleanField(default=True)),
+                ('reviewed', models.BooleanField(default=False)),
+                ('location_private', models.BooleanField(default=False)),
+                ('sub_id', models.CharField(max_length=20)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['region', '-observed_at'], name='observation_region_recent_idx'), models.Index(fields=['species_code', '-observed_at'], name='observation_species_recent_idx'), models.Index(fields=['-observed_at', 'id'], name='observation_recent_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='observation',
+            constraint=models.UniqueConstraint(fields=('sub_id', 'species_code'), name='observation_sub_species_uniq'),
+        ),
+    ]
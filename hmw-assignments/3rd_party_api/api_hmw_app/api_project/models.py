@@ -1,3 +1,39 @@
 from django.db import models
 
 # Create your models here.
+
+# One bird sighting from eBird's /v2/data/obs/{region}/recent, stored by
+# `python manage.py ingest_ebird` so Random_birds doesn't have to call eBird
+class Observation(models.Model):
+    # the region code we asked eBird for (US-TX-453, ...)
+    region = models.CharField(max_length=20)
+    species_code = models.CharField(max_length=20)
+    common_name = models.CharField(max_length=200)
+    scientific_name = models.CharField(max_length=200)
+    location_id = models.CharField(max_length=20)
+    location_name = models.CharField(max_length=255)
+    # eBird sends the local time at the location without a time zone, we store it as is (as UTC)
+    observed_at = models.DateTimeField()
+    how_many = models.IntegerField(null=True)
+    lat = models.FloatField()
+    lng = models.FloatField()
+    valid = models.BooleanField(default=True)
+    reviewed = models.BooleanField(default=False)
+    location_private = models.BooleanField(default=False)
+    # the checklist the sighting was submitted on
+    sub_id = models.CharField(max_length=20)
+
+    class Meta:
+        constraints = [
+            # a species appears once per checklist, re-ingesting updates the row instead of duplicating it
+            models.UniqueConstraint(fields=["sub_id", "species_code"], name="observation_sub_species_uniq"),
+        ]
+        indexes = [
+            # Random_birds lists the newest sightings of a region (?region=) or species (?species=)
+            models.Index(fields=["region", "-observed_at"], name="observation_region_recent_idx"),
+            models.Index(fields=["species_code", "-observed_at"], name="observation_species_recent_idx"),
+            models.Index(fields=["-observed_at", "id"], name="observation_recent_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.common_name} at {self.location_name} ({self.observed_at:%Y-%m-%d %H:%M})"
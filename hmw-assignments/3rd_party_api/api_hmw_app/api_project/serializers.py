@@ -0,0 +1,45 @@
+from rest_framework import serializers
+from .models import Observation
+
+
+# Same keys (and date format) eBird uses, so the items look like the ones
+# Random_birds used to pass straight through
+class ObservationSerializer(serializers.ModelSerializer):
+    speciesCode = serializers.CharField(source="species_code")
+    comName = serializers.CharField(source="common_name")
+    sciName = serializers.CharField(source="scientific_name")
+    locId = serializers.CharField(source="location_id")
+    locName = serializers.CharField(source="location_name")
+    obsDt = serializers.DateTimeField(source="observed_at", format="%Y-%m-%d %H:%M")
+    howMany = serializers.IntegerField(source="how_many")
+    obsValid = serializers.BooleanField(source="valid")
+    obsReviewed = serializers.BooleanField(source="reviewed")
+    locationPrivate = serializers.BooleanField(source="location_private")
+    subId = serializers.CharField(source="sub_id")
+
+    class Meta:
+        model = Observation
+        fields = [
+            "region", "speciesCode", "comName", "sciName", "locId", "locName", "obsDt", "howMany",
+            "lat", "lng", "obsValid", "obsReviewed", "locationPrivate", "subId",
+        ]
+
+    @staticmethod
+    def from_ebird(region, item):
+        # one item of eBird's JSON -> an unsaved Observation
+        return Observation(
+            region=region,
+            species_code=item["speciesCode"],
+            common_name=item["comName"],
+            scientific_name=item["sciName"],
+            location_id=item["locId"],
+            location_name=item["locName"],
+            observed_at=serializers.DateTimeField(input_formats=["%Y-%m-%d %H:%M", "%Y-%m-%d"]).to_internal_value(item["obsDt"]),
+            how_many=item.get("howMany"),
+            lat=item["lat"],
+            lng=item["lng"],
+            valid=item.get("obsValid", True),
+            reviewed=item.get("obsReviewed", False),
+            location_private=item.get("locationPrivate", False),
+            sub_id=item["subId"],
+        )
@@ -1,3 +1,216 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from unittest.mock import patch
+from .client import get_client
+from .views import cat_api, ebird
+from .models import Observation
+from django.core.management import call_command
+from io import StringIO
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+
+# A tiny local HTTP server standing in for thecatapi / eBird so the views can be
+# tested end to end without the network or real API keys
+class StubUpstream:
+    """
+    with StubUpstream({"/v1/images/search": (200, [{"url": ...}])}) as upstream:
+        ... point the view at upstream.url ...
+
+    `routes` maps a path to (status, json body) or (status, json body, delay).
+    A list of those is answered in order, the last one repeating, which lets
+    tests script "fail twice, then recover". Every request is recorded in
+    `calls` as (path, headers, client port) and answered after `delay` seconds
+    (the route's own delay wins).
+    """
+
+    def __init__(self, routes, delay=0):
+        self.routes = routes
+        self.delay = delay
+        self.calls = []
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so clients can keep their connection alive between calls
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                stub.calls.append((path, dict(self.headers), self.client_address[1]))
+                status, body, delay = stub.answer(path)
+                time.sleep(delay)
+                content = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                except ConnectionError:
+                    # the client timed out and hung up while we were "slow"
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def answer(self, path):
+        route = self.routes.get(path, (404, {"error": "Not found"}))
+        if isinstance(route, list):
+            route = route.pop(0) if len(route) > 1 else route[0]
+        status, body, *delay = route
+        return status, body, delay[0] if delay else self.delay
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Random_cats_test(TestCase):
+    def setUp(self):
+        cat_api.reset()
+
+    def test_random_cat_returns_the_image_url(self):
+        cats = [{"id": "abc", "url": "https://cdn2.thecatapi.com/images/abc.jpg"}]
+        with StubUpstream({"/v1/images/search": (200, cats)}) as upstream:
+            with self.settings(CAT_API_URL=upstream.url):
+                response = self.client.get(reverse("Random_cats"))
+        self.assertEqual(response.json(), "https://cdn2.thecatapi.com/images/abc.jpg")
+
+    async def test_upstream_connections_are_reused(self):
+        cats = [{"id": "abc", "url": "https://cdn2.thecatapi.com/images/abc.jpg"}]
+        with StubUpstream({"/v1/images/search": (200, cats)}) as upstream:
+            with self.settings(CAT_API_URL=upstream.url):
+                await self.async_client.get(reverse("Random_cats"))
+                await self.async_client.get(reverse("Random_cats"))
+        # the second call went over the first call's kept-alive connection
+        self.assertEqual(len({port for _, _, port in upstream.calls}), 1)
+
+    def test_upstream_client_is_closed_with_its_loop(self):
+        # what happens to every request's loop under WSGI
+        async def use_client():
+            return get_client()
+
+        client = asyncio.run(use_client())
+        self.assertTrue(client.is_closed)
+
+    def test_open_circuit_serves_the_last_cat(self):
+        cats = [{"id": "abc", "url": "https://cdn2.thecatapi.com/images/abc.jpg"}]
+        # one good answer, then the API breaks
+        with StubUpstream({"/v1/images/search": [(200, cats), (500, {})]}) as upstream, patch.object(cat_api, "retries", 0):
+            with self.settings(CAT_API_URL=upstream.url):
+                responses = [self.client.get(reverse("Random_cats")) for _ in range(10)]
+        with self.subTest():
+            self.assertEqual({response.json() for response in responses}, {"https://cdn2.thecatapi.com/images/abc.jpg"})
+        with self.subTest():
+            # 5 failures in a row opened the circuit, the other calls never reached the API
+            self.assertEqual(len(upstream.calls), 6)
+        self.client.force_login(User.objects.create_user("admin", is_staff=True))
+        self.assertEqual(self.client.get(reverse("Upstream_metrics")).json()["cat_api"]["state"], "open")
+
+    def test_metrics_are_for_staff_only(self):
+        with self.subTest():
+            self.assertEqual(self.client.get(reverse("Upstream_metrics")).status_code, 403)
+        self.client.force_login(User.objects.create_user("visitor"))
+        self.assertEqual(self.client.get(reverse("Upstream_metrics")).status_code, 403)
+
+
+def ebird_observation(sub_id, species_code="norcar", observed="2024-11-20 08:15", **fields):
+    return {
+        "speciesCode": species_code, "comName": "Northern Cardinal", "sciName": "Cardinalis cardinalis",
+        "locId": "L123", "locName": "Brackenridge Park", "obsDt": observed, "howMany": 2,
+        "lat": 30.27, "lng": -97.74, "obsValid": True, "obsReviewed": False, "locationPrivate": False,
+        "subId": sub_id, **fields,
+    }
+
+
+class Random_birds_test(TestCase):
+    def setUp(self):
+        ebird.reset()
+
+    def ingest(self, routes, *regions, **kwargs):
+        with StubUpstream(routes, **kwargs) as upstream:
+            with self.settings(EBIRD_API_URL=upstream.url):
+                call_command("ingest_ebird", "--once", "--keep-days", "100000", "--regions", *regions, stdout=StringIO(), stderr=StringIO())
+        return upstream
+
+    def test_ingest_stores_every_region(self):
+        upstream = self.ingest(
+            {
+                "/v2/data/obs/US-TX-453/recent": (200, [ebird_observation("S1"), ebird_observation("S2", "blujay")]),
+                "/v2/data/obs/US-CA/recent": (200, [ebird_observation("S3")]),
+            },
+            "US-TX-453", "US-CA",
+        )
+        with self.subTest():
+            self.assertIn("X-eBirdApiToken", upstream.calls[0][1])
+        self.assertEqual(
+            sorted(Observation.objects.values_list("region", "sub_id", "species_code")),
+            [("US-CA", "S3", "norcar"), ("US-TX-453", "S1", "norcar"), ("US-TX-453", "S2", "blujay")],
+        )
+
+    def test_ingest_updates_instead_of_duplicating(self):
+        self.ingest({"/v2/data/obs/US-TX-453/recent": (200, [ebird_observation("S1")])}, "US-TX-453")
+        self.ingest({"/v2/data/obs/US-TX-453/recent": (200, [ebird_observation("S1", howMany=5)])}, "US-TX-453")
+        self.assertEqual(list(Observation.objects.values_list("how_many", flat=True)), [5])
+
+    def test_slow_ebird_keeps_the_stored_rows(self):
+        self.ingest({"/v2/data/obs/US-TX-453/recent": (200, [ebird_observation("S1")])}, "US-TX-453")
+        with patch.object(ebird, "timeout", 0.1), patch.object(ebird, "retries", 0):
+            self.ingest({}, "US-TX-453", delay=1)
+        with self.subTest():
+            self.assertEqual(ebird.counters["timeouts"], 1)
+        self.assertEqual(Observation.objects.count(), 1)
+
+    def test_malformed_observations_are_skipped(self):
+        broken = ebird_observation("S2")
+        del broken["speciesCode"]
+        self.ingest({"/v2/data/obs/US-TX-453/recent": (200, [ebird_observation("S1"), broken, ebird_observation("S3", observed="yesterday")])}, "US-TX-453")
+        self.assertEqual(list(Observation.objects.values_list("sub_id", flat=True)), ["S1"])
+
+    def test_a_region_that_fails_to_store_does_not_stop_the_others(self):
+        self.ingest(
+            {
+                "/v2/data/obs/US-TX-453/recent": (200, [ebird_observation("S1", howMany="a lot")]),
+                "/v2/data/obs/US-CA/recent": (200, [ebird_observation("S2")]),
+            },
+            "US-TX-453", "US-CA",
+        )
+        self.assertEqual(list(Observation.objects.values_list("region", flat=True)), ["US-CA"])
+
+    def test_random_birds_serves_stored_observations(self):
+        self.ingest(
+            {
+                "/v2/data/obs/US-TX-453/recent": (200, [
+                    ebird_observation("S1", observed="2024-11-18 07:00"),
+                    ebird_observation("S2", observed="2024-11-20 08:15"),
+                    ebird_observation("S3", "blujay", observed="2024-11-19 09:30"),
+                ]),
+                "/v2/data/obs/US-CA/recent": (200, [ebird_observation("S4", observed="2024-11-21 10:00")]),
+            },
+            "US-TX-453", "US-CA",
+        )
+        # no eBird server at all while serving
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("Random_birds"), {"region": "US-TX-453", "species": "norcar", "page_size": 1})
+        body = response.json()
+        with self.subTest():
+            self.assertEqual((body["count"], body["results"][0]["subId"], body["results"][0]["obsDt"]), (2, "S2", "2024-11-20 08:15"))
+        with self.subTest():
+            self.assertIsNotNone(body["next"])
+        since = self.client.get(reverse("Random_birds"), {"since": "2024-11-20"}).json()
+        with self.subTest():
+            self.assertEqual([item["subId"] for item in since["results"]], ["S4", "S2"])
+        self.assertEqual(self.client.get(reverse("Random_birds"), {"since": "yesterday"}).status_code, 400)
@@ -0,0 +1,199 @@
+# api_project/upstream.py
+# Every call to a third-party API goes through an `Upstream`, which adds
+#   - a timeout per upstream
+#   - retries with jittered exponential backoff, limited by a retry budget so a
+#     struggling API doesn't get hit with 1 + RETRIES times the usual traffic
+#   - a circuit breaker: after FAILURE_THRESHOLD failures in a row calls fail
+#     right away for RESET_TIMEOUT seconds, then a single trial call decides
+#     whether to close it again
+#   - the last good answer per URL, served while the upstream is failing
+#   - counters, see `metrics()` and GET /metrics/
+import asyncio
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+import httpx
+from django.conf import settings
+from .client import get_client
+
+DEFAULTS = {
+    "TIMEOUT": 5,
+    "RETRIES": 2,
+    "BACKOFF": 0.1,
+    # every call earns RETRY_BUDGET retries (0.2 = 1 retry per 5 calls), up to
+    # RETRY_BURST saved retries for a short burst of errors
+    "RETRY_BUDGET": 0.2,
+    "RETRY_BURST": 10,
+    "FAILURE_THRESHOLD": 5,
+    "RESET_TIMEOUT": 30,
+    # how many URLs we remember the last good answer of
+    "LAST_GOOD_ENTRIES": 1000,
+}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# every Upstream by name, for the metrics view
+UPSTREAMS = {}
+
+
+class UpstreamUnavailable(Exception):
+    pass
+
+
+class RetryableResponse(Exception):
+    # 5xx / 429 answers count as failures and may be retried
+    def __init__(self, response):
+        super().__init__(f"{response.status_code} from {response.url}")
+        self.response = response
+
+
+class Upstream:
+    def __init__(self, name, **options):
+        config = {**DEFAULTS, **getattr(settings, "UPSTREAMS", {}).get(name, {}), **options}
+        self.name = name
+        self.timeout = config["TIMEOUT"]
+        self.retries = config["RETRIES"]
+        self.backoff = config["BACKOFF"]
+        self.retry_budget = config["RETRY_BUDGET"]
+        self.retry_burst = config["RETRY_BURST"]
+        self.failure_threshold = config["FAILURE_THRESHOLD"]
+        self.reset_timeout = config["RESET_TIMEOUT"]
+        self.last_good_entries = config["LAST_GOOD_ENTRIES"]
+        # The circuit, the retry budget and the counters are shared by every thread calling
+        # this upstream (request threads, the cache's background loop), changes to them
+        # hold this lock. It is never held across an await
+        self.lock = threading.Lock()
+        self.reset()
+        UPSTREAMS[name] = self
+
+    def reset(self):
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+            self.retry_tokens = self.retry_burst
+            self.last_good = OrderedDict()
+            self.counters = Counter()
+
+    async def get_json(self, url, **kwargs):
+        """
+        GET `url` and return `(status, json)`. Client errors (4xx) are returned
+        as they are. When the upstream times out, keeps failing or the circuit
+        is open, the last good answer for `url` is returned instead, or
+        UpstreamUnavailable is raised if we never had one.
+        """
+        with self.lock:
+            self.counters["calls"] += 1
+            self.retry_tokens = min(self.retry_burst, self.retry_tokens + self.retry_budget)
+        key = (url, repr(sorted(kwargs.get("params", {}).items())))
+        try:
+            response = await self.call(url, **kwargs)
+        except (httpx.HTTPError, RetryableResponse, UpstreamUnavailable) as e:
+            with self.lock:
+                fallback = key in self.last_good
+                if fallback:
+                    self.counters["fallbacks"] += 1
+                    data = self.last_good[key]
+            if fallback:
+                return 200, data
+            raise UpstreamUnavailable(f"{self.name}: {e}") from e
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if response.status_code == 200:
+            with self.lock:
+                self.last_good[key] = data
+                self.last_good.move_to_end(key)
+                while len(self.last_good) > self.last_good_entries:
+                    self.last_good.popitem(last=False)
+        return response.status_code, data
+
+    async def call(self, url, **kwargs):
+        trial = self.before_call()
+        try:
+            return await self.call_with_retries(url, **kwargs)
+        finally:
+            # only the trial call itself ends the trial, also when the request handling
+            # it is cancelled mid-call. Calls that were let through before the circuit
+            # went half open must not let a second trial start
+            if trial:
+                with self.lock:
+                    self.trial_running = False
+
+    async def call_with_retries(self, url, **kwargs):
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = await get_client().get(url, timeout=self.timeout, **kwargs)
+                if response.status_code >= 500 or response.status_code == 429:
+                    raise RetryableResponse(response)
+            except (httpx.HTTPError, RetryableResponse) as e:
+                with self.lock:
+                    self.counters["timeouts" if isinstance(e, httpx.TimeoutException) else "errors"] += 1
+                if attempt < self.retries and self.take_retry():
+                    attempt += 1
+                    # "full jitter": a random wait between 0 and the exponential backoff
+                    await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                    continue
+                self.record_failure()
+                raise
+            finally:
+                with self.lock:
+                    self.counters["upstream_requests"] += 1
+                    self.counters["upstream_ms"] += round((time.perf_counter() - start) * 1000)
+            self.record_success()
+            return response
+
+    def take_retry(self):
+        with self.lock:
+            if self.retry_tokens < 1:
+                self.counters["retries_denied"] += 1
+                return False
+            self.retry_tokens -= 1
+            self.counters["retries"] += 1
+            return True
+
+    def before_call(self):
+        # returns whether this call is the trial call of a half open circuit
+        with self.lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.counters["short_circuited"] += 1
+                    raise UpstreamUnavailable("circuit open")
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                # only one trial call at a time while we find out if the upstream is back
+                if self.trial_running:
+                    self.counters["short_circuited"] += 1
+                    raise UpstreamUnavailable("circuit half open")
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.counters["successes"] += 1
+            self.failures = 0
+            self.state = CLOSED
+
+    def record_failure(self):
+        with self.lock:
+            self.counters["failures"] += 1
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.counters["circuit_opened"] += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def metrics(self):
+        with self.lock:
+            return {"state": self.state, "consecutive_failures": self.failures, **self.counters}
+
+
+def metrics():
+    return {name: upstream.metrics() for name, upstream in UPSTREAMS.items()}
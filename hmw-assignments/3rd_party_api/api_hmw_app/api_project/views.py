@@ -1,37 +1,78 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import serializers
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
-import requests
+from rest_framework.status import HTTP_400_BAD_REQUEST
 from api_hmw_app.settings import env
+from .models import Observation
+from .serializers import ObservationSerializer
+from .upstream import Upstream, UpstreamUnavailable, metrics
 import json
 
+# Timeouts, retries and circuit breakers for each API (settings.UPSTREAMS).
+# eBird is only called by the ingest_ebird command
+cat_api = Upstream("cat_api")
+ebird = Upstream("ebird")
 
-class Random_cats(APIView):
+
+# This view is async so a worker isn't stuck waiting on the cat API
+# (serve it with an ASGI server: `uvicorn api_hmw_app.asgi:application`).
+# DRF's APIView can't run async methods, so it uses Django's View + JsonResponse
+class Random_cats(View):
     
-    def get(self, request):
-        response = requests.get(f"https://api.thecatapi.com/v1/images/search?api_key=({env.get('CAT_API_KEY')}")
-        
-        response_json = response.json()
+    async def get(self, request):
+        try:
+            status, response_json = await cat_api.get_json(
+                f"{settings.CAT_API_URL}/v1/images/search", params={"api_key": env.get("CAT_API_KEY") or ""}
+            )
+        except UpstreamUnavailable:
+            return JsonResponse("The cat API is unavailable", status=503, safe=False)
+        if status != 200:
+            return JsonResponse(response_json, status=status, safe=False)
         
         print(response_json)
-        return Response(response_json[0]['url'])
+        return JsonResponse(response_json[0]['url'], safe=False)
     
 
 # curl --location 'https://api.ebird.org/v2/data/obs/KZ/recent' \
 # --header 'X-eBirdApiToken: {{x-ebirdapitoken}}'
 
+class ObservationPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+# Serves the sightings `python manage.py ingest_ebird` stored, newest first, so this
+# request never waits on eBird. Filters: ?region=US-TX-453 ?species=norcar ?since=2024-11-01
 class Random_birds(APIView):
 
     def get(self, request):
-        headers = {
-            'X-eBirdApiToken': env.get("BIRD_API_KEY")
-        }
+        observations = Observation.objects.order_by("-observed_at", "id")
+        if request.query_params.get("region"):
+            observations = observations.filter(region=request.query_params["region"])
+        if request.query_params.get("species"):
+            observations = observations.filter(species_code=request.query_params["species"])
+        if request.query_params.get("since"):
+            try:
+                since = serializers.DateField().to_internal_value(request.query_params["since"])
+            except serializers.ValidationError as e:
+                return Response({"since": e.detail}, status=HTTP_400_BAD_REQUEST)
+            observations = observations.filter(observed_at__date__gte=since)
+
+        paginator = ObservationPagination()
+        page = paginator.paginate_queryset(observations, request, view=self)
+        return paginator.get_paginated_response(ObservationSerializer(page, many=True).data)
 
-        endpoint = f"https://api.ebird.org/v2/data/obs/US-TX-453/recent"
-        response = requests.get(endpoint, headers=headers)
 
-        response = response.json()
+class Upstream_metrics(APIView):
+    # Circuit state and call/retry/failure counters for the cat API and eBird
+    # (staff only: it shows which APIs we depend on and how they are doing)
+    permission_classes = [IsAdminUser]
 
-        print(response)
-        return Response(response)
-    
\ No newline at end of file
+    def get(self, request):
+        return Response(metrics())
@@ -0,0 +1,50 @@
+# myapi/benchmarks.py
+# Small helpers for the management commands that EXPLAIN and time queries. They seed
+# their rows inside a transaction that is rolled back at the end, so they can be run
+# against a development database without leaving anything behind.
+import time
+from django.db import connection
+
+
+def time_calls(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "median_ms": timings[len(timings) // 2],
+        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "calls": repeat,
+    }
+
+
+def report(stdout, label, stats):
+    stdout.write(f"{label:<55} median {stats['median_ms']:8.3f} ms   p99 {stats['p99_ms']:8.3f} ms   ({stats['calls']} calls)")
+
+
+def analyze(*tables):
+    # fresh planner statistics so EXPLAIN picks the plan production would
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(f"ANALYZE {table}")
+
+
+def explain(sql):
+    # the plan of a query as captured by CaptureQueriesContext (parameters already in it)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(f"EXPLAIN {sql}")
+            return "\n".join(row[0] for row in cursor.fetchall())
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return "\n".join(row[-1] for row in cursor.fetchall())
+
+
+def full_scans(plan, table):
+    # EXPLAIN lines that read every row of `table` ("Seq Scan on ..." on Postgres,
+    # a bare "SCAN table" without "USING INDEX" on SQLite)
+    return [
+        line.strip() for line in plan.splitlines()
+        if f"Seq Scan on {table}" in line or (line.strip().endswith(f"SCAN {table}"))
+    ]
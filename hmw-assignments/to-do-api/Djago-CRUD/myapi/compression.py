@@ -0,0 +1,193 @@
+# myapi/compression.py
+# Compresses API responses with the best encoding the client lists in Accept-Encoding:
+# zstd, br (brotli) or gzip. Sizes and levels are set in settings.RESPONSE_COMPRESSION,
+# `python manage.py bench_compression` shows what each level costs and saves for the lists tree.
+# zstd and br need `pip install zstandard` / `pip install brotli`, without them those
+# encodings are simply never picked.
+import zlib
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULTS = {
+    # smaller responses are sent as they are, compressing them costs more than it saves
+    "MIN_SIZE": 1024,
+    # when the client accepts several encodings equally, the first one of these wins
+    "ENCODINGS": ["zstd", "br", "gzip"],
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 4,
+    "ZSTD_LEVEL": 3,
+    # streamed responses are compressed and flushed to the client in blocks of at least this many bytes
+    "STREAM_BLOCK": 16 * 1024,
+    "CONTENT_TYPES": ["application/json", "application/x-ndjson", "text/"],
+}
+
+
+# Every encoding is used through the same 3 calls: compress(data) buffers and returns
+# whatever output is ready, flush() returns everything compressed so far (so a streamed
+# block can be sent right away) and finish() ends the stream
+class GzipStream:
+    def __init__(self, level):
+        # wbits=31 writes the gzip header/trailer around the deflate data
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self, level):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class ZstdStream:
+    def __init__(self, level):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+# Content-Encoding -> (stream class, the setting holding its level), for the installed libraries
+CODECS = {
+    "gzip": (GzipStream, "GZIP_LEVEL"),
+    **({"br": (BrotliStream, "BROTLI_QUALITY")} if brotli else {}),
+    **({"zstd": (ZstdStream, "ZSTD_LEVEL")} if zstandard else {}),
+}
+
+
+def compress(data, encoding, level):
+    stream = CODECS[encoding][0](level)
+    return stream.compress(data) + stream.finish()
+
+
+def accepted_encodings(header):
+    # "gzip, br;q=0.8, *;q=0" -> {"gzip": 1.0, "br": 0.8, "*": 0.0}
+    accepted = {}
+    for part in header.split(","):
+        name, *params = [value.strip() for value in part.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    return accepted
+
+
+def choose_encoding(header, encodings):
+    # the encoding with the highest q the client gave it, None when it accepts none of ours
+    accepted = accepted_encodings(header)
+    best, best_quality = None, 0.0
+    for name in encodings:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compress_blocks(chunks, stream, block_size):
+    block, size = [], 0
+    for chunk in chunks:
+        block.append(chunk)
+        size += len(chunk)
+        if size >= block_size:
+            yield stream.compress(b"".join(block)) + stream.flush()
+            block, size = [], 0
+    yield stream.compress(b"".join(block)) + stream.finish()
+
+
+async def acompress_blocks(chunks, stream, block_size):
+    block, size = [], 0
+    async for chunk in chunks:
+        block.append(chunk)
+        size += len(chunk)
+        if size >= block_size:
+            yield stream.compress(b"".join(block)) + stream.flush()
+            block, size = [], 0
+    yield stream.compress(b"".join(block)) + stream.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Django's GZipMiddleware with zstd and brotli added, a minimum size, per
+    encoding levels and streamed responses compressed in blocks (instead of
+    one flush per row) so they compress nearly as well as a whole body.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        config = {**DEFAULTS, **getattr(settings, "RESPONSE_COMPRESSION", {})}
+        self.min_size = config["MIN_SIZE"]
+        self.encodings = [name for name in config["ENCODINGS"] if name in CODECS]
+        self.levels = {name: config[CODECS[name][1]] for name in self.encodings}
+        self.stream_block = config["STREAM_BLOCK"]
+        self.content_types = tuple(config["CONTENT_TYPES"])
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or not response.get("Content-Type", "").startswith(self.content_types):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        # caches must keep one copy per Accept-Encoding
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""), self.encodings)
+        if encoding is None:
+            return response
+        stream_class, level = CODECS[encoding][0], self.levels[encoding]
+
+        if response.streaming:
+            blocks = acompress_blocks if response.is_async else compress_blocks
+            response.streaming_content = blocks(response.streaming_content, stream_class(level), self.stream_block)
+            # we won't know the compressed size until it's all sent
+            del response.headers["Content-Length"]
+        else:
+            compressed = compress(response.content, encoding, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # the compressed body isn't byte for byte the one the ETag was made for, so it becomes
+        # a weak ETag (If-None-Match still matches it, see django.views.decorators.http.condition)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # runs last on the way out so it compresses the final body (myapi/compression.py)
+    'myapi.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -73,6 +75,30 @@ TEMPLATES = [
 WSGI_APPLICATION = 'myapi.wsgi.application'
 
 
+# JSON bodies are encoded/decoded with orjson when it's installed (myapi/renderers.py)
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'myapi.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'myapi.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+
+# Accept-Encoding negotiated response compression (myapi/compression.py), levels per encoding
+RESPONSE_COMPRESSION = {
+    "MIN_SIZE": 1024,
+    "ENCODINGS": ["zstd", "br", "gzip"],
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 4,
+    "ZSTD_LEVEL": 3,
+}
+
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
@@ -0,0 +1,233 @@
+# myapp/batch.py
+# POST /api/batch/ runs many Task/SubTask writes in one request and one transaction:
+#
+#   {"operations": [
+#       {"op": "create",   "type": "task",    "data": {"task_name": "Milk", "parent_list_id": 1}},
+#       {"op": "update",   "type": "subtask", "id": 4, "data": {"sub_task_name": "Oat"}},
+#       {"op": "complete", "type": "task",    "id": 5},                  # "completed": false to undo
+#       {"op": "move",     "type": "task",    "id": 6, "list": 2},       # a subtask moves with "task": <id>
+#       {"op": "delete",   "type": "subtask", "id": 7},
+#   ]}
+#
+# Either every operation is applied or none is. The answer has one result per operation,
+# in the same order: {"status": 201/200/204, "id": ..., "data": {...}} when the batch went
+# through, otherwise the failing ones get {"status": 400/404, "errors": {...}} and the
+# others {"status": 424} (not applied because another operation failed).
+#
+# However many operations there are, the writes are one bulk_create, one bulk_update and
+# one DELETE per model. Those don't send signals, so the counters (myapp/counters.py)
+# and the sync change log (myapp/changes.py) are updated here instead.
+from django.db import connection, transaction
+from . import changes, counters
+from .models import List, SubTask, Task
+from .serializers import SubTaskSerializer, SubTaskWriteSerializer, TaskSyncSerializer, TaskWriteSerializer
+
+MAX_OPERATIONS = 1000
+OPS = ["create", "update", "complete", "move", "delete"]
+TYPES = {
+    "task": {
+        "model": Task, "parent": List, "parent_field": "parent_list_id", "move_to": "list",
+        "write": TaskWriteSerializer, "read": TaskSyncSerializer,
+    },
+    "subtask": {
+        "model": SubTask, "parent": Task, "parent_field": "parent_task_id", "move_to": "task",
+        "write": SubTaskWriteSerializer, "read": SubTaskSerializer,
+    },
+}
+# rows per DELETE, below SQLite's limit on query parameters
+DELETE_CHUNK = 500
+
+
+class OperationError(Exception):
+    def __init__(self, errors, status=400):
+        super().__init__(errors)
+        self.result = {"status": status, "errors": errors}
+
+
+def parse(operation):
+    # one operation from the request -> {"op", "type", "id", "data"}, `data` validated.
+    # complete and move are updates of one field
+    if not isinstance(operation, dict):
+        raise OperationError({"non_field_errors": ["Expected an object."]})
+    op, kind = operation.get("op"), operation.get("type")
+    errors = {}
+    if op not in OPS:
+        errors["op"] = [f"Expected one of: {', '.join(OPS)}."]
+    if kind not in TYPES:
+        errors["type"] = [f"Expected one of: {', '.join(TYPES)}."]
+    if errors:
+        raise OperationError(errors)
+
+    id = operation.get("id")
+    if op != "create" and (type(id) != int or id < 1):
+        raise OperationError({"id": ["A valid integer is required."]})
+    if op == "delete":
+        return {"op": op, "type": kind, "id": id, "data": {}}
+
+    if op == "complete":
+        data = {"completed": operation.get("completed", True)}
+    elif op == "move":
+        data = {TYPES[kind]["parent_field"]: operation.get(TYPES[kind]["move_to"])}
+    else:
+        data = operation.get("data", {})
+    serializer = TYPES[kind]["write"](data=data, partial=op != "create")
+    if not serializer.is_valid():
+        raise OperationError(serializer.errors)
+    if op == "create":
+        return {"op": "create", "type": kind, "id": None, "data": serializer.validated_data}
+    return {"op": "update", "type": kind, "id": id, "data": serializer.validated_data}
+
+
+def check(operations, results):
+    """
+    Lock the rows the operations touch and check they exist, aren't touched twice and
+    that new parents exist. Failures go into `results`, returns {type: {id: row}}
+    """
+    ids = {kind: set() for kind in TYPES}
+    for index, operation in enumerate(operations):
+        if operation and operation["id"] is not None:
+            if operation["id"] in ids[operation["type"]]:
+                results[index] = OperationError({"id": [f"This {operation['type']} appears more than once in the batch."]}).result
+            ids[operation["type"]].add(operation["id"])
+    # locked in id order, so two batches touching the same rows can't deadlock
+    rows = {
+        kind: {row.id: row for row in TYPES[kind]["model"].objects.select_for_update().filter(id__in=ids[kind]).order_by("id")}
+        if ids[kind] else {}
+        for kind in TYPES
+    }
+
+    parents = {kind: set() for kind in TYPES}
+    for operation in operations:
+        if operation and TYPES[operation["type"]]["parent_field"] in operation["data"]:
+            parents[operation["type"]].add(operation["data"][TYPES[operation["type"]]["parent_field"]])
+    existing = {
+        kind: set(TYPES[kind]["parent"].objects.filter(id__in=parents[kind]).values_list("id", flat=True)) if parents[kind] else set()
+        for kind in TYPES
+    }
+    deleted_tasks = {operation["id"] for operation in operations if operation and operation["op"] == "delete" and operation["type"] == "task"}
+
+    for index, operation in enumerate(operations):
+        if not operation or results[index]:
+            continue
+        kind, parent_field = operation["type"], TYPES[operation["type"]]["parent_field"]
+        row = rows[kind].get(operation["id"])
+        if operation["op"] != "create" and row is None:
+            results[index] = OperationError({"id": [f"No {kind} with id {operation['id']}."]}, status=404).result
+            continue
+        parent_id = operation["data"].get(parent_field, getattr(row, parent_field, None))
+        # a subtask's task now and after the operation, a move changes it
+        tasks = {parent_id, getattr(row, parent_field, None)} & deleted_tasks if kind == "subtask" else set()
+        if parent_field in operation["data"] and parent_id not in existing[kind]:
+            results[index] = OperationError({parent_field: [f"No {TYPES[kind]['parent'].__name__.lower()} with id {parent_id}."]}).result
+        elif operation["op"] != "delete" and tasks:
+            # The subtasks of deleted tasks are deleted with them, as they are before the batch:
+            # one moved out of (or into) one of them would be gone while its result says 200
+            results[index] = OperationError({parent_field: [f"Task {min(tasks)} is deleted in this batch."]}).result
+    return rows
+
+
+def delete_rows(model, ids):
+    # DELETE ... WHERE id IN (...) without Django's delete collector, which would load
+    # every row and send a post_delete signal for each of them
+    table, pk = connection.ops.quote_name(model._meta.db_table), connection.ops.quote_name(model._meta.pk.column)
+    ids = sorted(ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), DELETE_CHUNK):
+            chunk = ids[start:start + DELETE_CHUNK]
+            cursor.execute(f"DELETE FROM {table} WHERE {pk} IN ({', '.join(['%s'] * len(chunk))})", chunk)
+
+
+def apply(operations, rows, results):
+    # parent model -> {parent id: [items, completed]} to add to its counters
+    counts = {List: {}, Task: {}}
+
+    def count(kind, parent_id, items, completed):
+        change = counts[TYPES[kind]["parent"]].setdefault(parent_id, [0, 0])
+        change[0] += items
+        change[1] += int(completed)
+
+    created = {kind: [] for kind in TYPES}
+    updated = {kind: [] for kind in TYPES}
+    fields = {kind: set() for kind in TYPES}
+    deleted = {kind: [] for kind in TYPES}
+    for index, operation in enumerate(operations):
+        kind, data = operation["type"], operation["data"]
+        parent_field = TYPES[kind]["parent_field"]
+        if operation["op"] == "create":
+            row = TYPES[kind]["model"](**data)
+            created[kind].append((index, row))
+            count(kind, getattr(row, parent_field), 1, row.completed)
+        elif operation["op"] == "update":
+            row = rows[kind][operation["id"]]
+            count(kind, getattr(row, parent_field), -1, -row.completed)
+            for field, value in data.items():
+                setattr(row, field, value)
+            count(kind, getattr(row, parent_field), 1, row.completed)
+            updated[kind].append((index, row))
+            fields[kind].update(data)
+        else:
+            deleted[kind].append((index, rows[kind][operation["id"]]))
+
+    # Subtasks of deleted tasks go too. Like the signals do for cascades, nobody counts them:
+    # their task's counters are deleted along with it
+    deleted_tasks = {row.id for _, row in deleted["task"]}
+    cascaded = list(SubTask.objects.filter(parent_task_id__in=deleted_tasks).values_list("id", flat=True)) if deleted_tasks else []
+    for kind in TYPES:
+        for _, row in deleted[kind]:
+            if kind == "task" or row.parent_task_id not in deleted_tasks:
+                count(kind, getattr(row, TYPES[kind]["parent_field"]), -1, -row.completed)
+
+    for kind in TYPES:
+        model = TYPES[kind]["model"]
+        if created[kind]:
+            model.objects.bulk_create([row for _, row in created[kind]])
+        if updated[kind] and fields[kind]:
+            model.objects.bulk_update([row for _, row in updated[kind]], sorted(fields[kind]))
+    subtask_ids = {row.id for _, row in deleted["subtask"]} | set(cascaded)
+    if subtask_ids:
+        delete_rows(SubTask, subtask_ids)
+    if deleted_tasks:
+        delete_rows(Task, deleted_tasks)
+
+    for parent_model, changes_by_parent in counts.items():
+        counters.add_many(parent_model, {parent_id: tuple(change) for parent_id, change in changes_by_parent.items()})
+    for kind in TYPES:
+        model, saved = TYPES[kind]["model"], created[kind] + updated[kind]
+        if saved:
+            changes.record(model, [row.id for _, row in saved])
+        removed = subtask_ids if kind == "subtask" else deleted_tasks
+        if removed:
+            changes.record(model, sorted(removed), deleted=True)
+
+    for kind in TYPES:
+        for status, done in [(201, created[kind]), (200, updated[kind])]:
+            for index, row in done:
+                results[index] = {"status": status, "id": row.id, "data": TYPES[kind]["read"](row).data}
+        for index, row in deleted[kind]:
+            results[index] = {"status": 204, "id": row.id}
+
+
+def run(operations):
+    """
+    Apply the batch, returns (HTTP status, response body). 200 when every operation
+    was applied, 400 when nothing was
+    """
+    if not isinstance(operations, list) or not operations:
+        return 400, {"operations": ["Expected a non-empty list of operations."]}
+    if len(operations) > MAX_OPERATIONS:
+        return 400, {"operations": [f"At most {MAX_OPERATIONS} operations per batch."]}
+
+    parsed, results = [], [None] * len(operations)
+    for index, operation in enumerate(operations):
+        try:
+            parsed.append(parse(operation))
+        except OperationError as e:
+            parsed.append(None)
+            results[index] = e.result
+
+    with transaction.atomic():
+        rows = check(parsed, results)
+        if any(results):
+            return 400, {"results": [result or {"status": 424} for result in results]}
+        apply(parsed, rows, results)
+    return 200, {"results": results}
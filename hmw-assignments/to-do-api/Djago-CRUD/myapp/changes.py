@@ -0,0 +1,103 @@
+# myapp/changes.py
+# The change log offline clients sync from (GET /api/sync/?since=<seq>). Every
+# save/delete of a List, Task or SubTask adds a Change row (see myapp/signals.py),
+# its seq only ever grows, so a client remembers the last seq it got and asks
+# for what came after it. QuerySet.update(), bulk_create() and bulk_update()
+# don't send signals, code using them has to call record() itself.
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+from .models import Change, List, SubTask, SyncState, Task
+
+DEFAULTS = {
+    "PAGE_SIZE": 500,
+    "MAX_PAGE_SIZE": 5000,
+    # tombstones older than this are removed by `python manage.py compact_changes`,
+    # a client that hasn't synced for that long downloads everything again
+    "TOMBSTONE_DAYS": 30,
+}
+
+KINDS = {List: "lists", Task: "tasks", SubTask: "subtasks"}
+MODELS = {kind: model for model, kind in KINDS.items()}
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, "SYNC", {})}
+
+
+def lock():
+    # A seq is handed out when its Change row is INSERTed, but transactions don't commit
+    # in that order: seq 9 could be visible before seq 8, and a client that already got
+    # 9 would never see 8. So writers lock the SyncState row before adding to the log and
+    # keep the lock until they commit, seqs then become visible strictly in order.
+    # (SQLite has no row locks, it only lets one transaction write at a time anyway)
+    SyncState.objects.select_for_update().get_or_create(id=1)
+
+
+def record(model, ids, deleted=False):
+    # log a save (or a delete when deleted=True) of the `model` rows with these ids
+    with transaction.atomic(savepoint=False):
+        lock()
+        Change.objects.bulk_create(Change(kind=KINDS[model], object_id=id, deleted=deleted) for id in ids)
+
+
+def since(seq, limit, resync=False):
+    """
+    The changes after `seq`, at most `limit` log entries of them, as a dict:
+      saved / deleted   {kind: [ids]}, only the latest entry of each row counts
+      seq               what the client passes as `since` next time
+      more              whether there are more entries after this page
+      reset             the client was too far behind (its tombstones were compacted away),
+                        this page starts over from 0 and it has to drop what it has
+      resync            this page is part of such a start over that isn't finished, the client
+                        passes it back as `resync` so the next pages don't start over again.
+                        (Tombstones compacted meanwhile don't matter then: the client only
+                        holds what this pass sent it, and a compacted row never shows up in it)
+    """
+    entries = list(Change.objects.filter(seq__gt=seq).order_by("seq").values_list("seq", "kind", "object_id", "deleted")[:limit])
+    # Read AFTER the entries: if compact() removed tombstones before that query we see
+    # its new compacted_through here, if it did after, the tombstones are in `entries`
+    compacted_through = SyncState.objects.filter(id=1).values_list("compacted_through", flat=True).first() or 0
+    reset = not resync and 0 < seq < compacted_through
+    if reset:
+        seq = 0
+        entries = list(Change.objects.order_by("seq").values_list("seq", "kind", "object_id", "deleted")[:limit])
+
+    latest = {}
+    for _, kind, object_id, deleted in entries:
+        latest[kind, object_id] = deleted
+    saved, removed = {kind: [] for kind in MODELS}, {kind: [] for kind in MODELS}
+    for (kind, object_id), deleted in latest.items():
+        (removed if deleted else saved)[kind].append(object_id)
+    return {
+        "saved": saved,
+        "deleted": removed,
+        "seq": entries[-1][0] if entries else seq,
+        "more": len(entries) == limit,
+        "reset": reset,
+        "resync": (reset or resync) and len(entries) == limit,
+    }
+
+
+def compact(tombstone_days=None):
+    """
+    Shrink the log, returns (replaced entries removed, tombstones removed):
+      - entries a newer entry for the same row replaced, nobody needs them anymore
+      - tombstones older than `tombstone_days`. Clients whose `since` is older than
+        the newest one removed are sent everything again (see since())
+    """
+    tombstone_days = config()["TOMBSTONE_DAYS"] if tombstone_days is None else tombstone_days
+    newer = Change.objects.filter(kind=OuterRef("kind"), object_id=OuterRef("object_id"), seq__gt=OuterRef("seq"))
+    replaced, _ = Change.objects.filter(Exists(newer)).delete()
+
+    tombstones = Change.objects.filter(deleted=True, changed_at__lt=timezone.now() - timedelta(days=tombstone_days))
+    with transaction.atomic():
+        newest = tombstones.aggregate(seq=Max("seq"))["seq"]
+        if newest is None:
+            return replaced, 0
+        removed, _ = tombstones.filter(seq__lte=newest).delete()
+        lock()
+        SyncState.objects.filter(id=1, compacted_through__lt=newest).update(compacted_through=newest)
+    return replaced, removed
@@ -0,0 +1,64 @@
+# myapp/counters.py
+# The denormalized "x of y done" counters: List.task_count/completed_count and
+# Task.subtask_count/completed_subtask_count. Changes are applied as
+# `UPDATE ... SET count = count + n` so concurrent writers don't overwrite each other.
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from .models import List, Task
+
+# parent model -> (its total counter, its completed counter, the children's reverse name)
+COUNTERS = {
+    List: ("task_count", "completed_count", "tasks"),
+    Task: ("subtask_count", "completed_subtask_count", "subtasks"),
+}
+
+
+def add(parent_model, parent_id, items=0, completed=0):
+    if parent_id is None or not (items or completed):
+        return
+    total, done, _ = COUNTERS[parent_model]
+    parent_model.objects.filter(id=parent_id).update(**{total: F(total) + items, done: F(done) + completed})
+
+
+def add_many(parent_model, changes):
+    # {parent_id: (items, completed)} -> one UPDATE per distinct change
+    by_change = {}
+    for parent_id, change in changes.items():
+        if parent_id is not None and any(change):
+            by_change.setdefault(change, []).append(parent_id)
+    total, done, _ = COUNTERS[parent_model]
+    for (items, completed), ids in by_change.items():
+        parent_model.objects.filter(id__in=ids).update(**{total: F(total) + items, done: F(done) + completed})
+
+
+def drifted(parent_model, queryset=None):
+    # parents whose counters don't match their children, with the actual counts
+    total, done, children = COUNTERS[parent_model]
+    queryset = parent_model.objects.all() if queryset is None else queryset
+    return (
+        queryset.annotate(actual=Count(children), actual_done=Count(children, filter=Q(**{f"{children}__completed": True})))
+        .exclude(**{total: F("actual"), done: F("actual_done")})
+        .order_by("id")
+    )
+
+
+def recount(parent_model, ids):
+    # one UPDATE setting the counters of `ids` from COUNT subqueries, evaluated while the
+    # UPDATE runs so a write racing with it can't leave stale numbers behind
+    total, done, children = COUNTERS[parent_model]
+    child_model = parent_model._meta.get_field(children).related_model
+    parent = parent_model._meta.get_field(children).field.name
+
+    def count(**filters):
+        rows = child_model.objects.filter(**{parent: OuterRef("pk")}, **filters).order_by().values(parent)
+        return Coalesce(Subquery(rows.annotate(n=Count("id")).values("n"), output_field=IntegerField()), 0)
+
+    return parent_model.objects.filter(id__in=ids).update(**{total: count(), done: count(completed=True)})
+
+
+def reconcile(parent_model, queryset=None):
+    # recount the parents whose counters drifted, returns how many were repaired
+    ids = list(drifted(parent_model, queryset).values_list("id", flat=True))
+    if ids:
+        recount(parent_model, ids)
+    return len(ids)
@@ -0,0 +1,62 @@
+# myapp/filters.py
+# Query parameters accepted by GET /api/tasks/, /api/tasks/summary/ and /api/subtasks/.
+# Each one is answered by an index in Task.Meta.indexes / SubTask.Meta.indexes, see
+# `python manage.py explain_queries`:
+#
+#   ?list=3 (tasks) / ?task=3 (subtasks)    task_list_completed_idx / subtask_task_completed_idx
+#   ?list=3&completed=false                 the same (parent, completed, id) index
+#   ?completed=false                        task_open_idx / subtask_open_idx, partial: incomplete rows only
+#   ?after=<id>&limit=<n>                   the next n rows in id order, with any of the above
+#
+# Without any of them the views still return every row.
+from rest_framework import serializers
+from .models import SubTask, Task
+
+MAX_LIMIT = 1000
+# model -> (its parent's query parameter, the column it filters)
+PARENTS = {Task: ("list", "parent_list_id"), SubTask: ("task", "parent_task_id")}
+
+
+def parse_id(value):
+    return serializers.IntegerField(min_value=1).run_validation(value)
+
+
+def parse_after(value):
+    return serializers.IntegerField(min_value=0).run_validation(value)
+
+
+def parse_completed(value):
+    return serializers.BooleanField().to_internal_value(value)
+
+
+def parse_limit(value):
+    return serializers.IntegerField(min_value=1, max_value=MAX_LIMIT).run_validation(value)
+
+
+def filter_items(queryset, query_params):
+    """
+    Apply the filters in `query_params` to a Task or SubTask queryset, ordered by id.
+    Invalid values raise a ValidationError (400) listing every bad parameter.
+    """
+    parent, parent_field = PARENTS[queryset.model]
+    parsers = {parent: parse_id, "completed": parse_completed, "after": parse_after, "limit": parse_limit}
+    values, errors = {}, {}
+    for name, parse in parsers.items():
+        if name in query_params:
+            try:
+                values[name] = parse(query_params[name])
+            except serializers.ValidationError as e:
+                errors[name] = e.detail
+    if errors:
+        raise serializers.ValidationError(errors)
+
+    if parent in values:
+        queryset = queryset.filter(**{parent_field: values[parent]})
+    if "completed" in values:
+        queryset = queryset.filter(completed=values["completed"])
+    if "after" in values:
+        queryset = queryset.filter(id__gt=values["after"])
+    queryset = queryset.order_by("id")
+    if "limit" in values:
+        queryset = queryset[:values["limit"]]
+    return queryset
@@ -0,0 +1,54 @@
+# python manage.py bench_compression --lists 200 --tasks 20 --subtasks 5
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from myapi.compression import CODECS, compress
+from myapi.renderers import FastJSONRenderer
+from myapp.models import List, Task, SubTask
+from myapp.serializers import ListSerializer, TaskSerializer, SubTaskSerializer
+
+# levels worth comparing for each encoding, including the defaults (myapi/compression.py)
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 6, 9], "zstd": [1, 3, 9, 19]}
+
+
+class Command(BaseCommand):
+    help = "CPU time against bytes saved of every encoding/level for the list endpoints' bodies (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lists", type=int, default=200)
+        parser.add_argument("--tasks", type=int, default=20, help="tasks per list")
+        parser.add_argument("--subtasks", type=int, default=5, help="subtasks per task")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            lists = List.objects.bulk_create(List(list_name=f"List {i}") for i in range(options["lists"]))
+            tasks = Task.objects.bulk_create(
+                Task(task_name=f"Task {i}", completed=i % 3 == 0, parent_list=parent)
+                for parent in lists for i in range(options["tasks"])
+            )
+            SubTask.objects.bulk_create(
+                SubTask(sub_task_name=f"Sub task {i}", completed=i % 2 == 0, parent_task=parent)
+                for parent in tasks for i in range(options["subtasks"])
+            )
+            renderer = FastJSONRenderer()
+            bodies = [
+                ("GET /api/lists/", renderer.render(ListSerializer(List.objects.prefetch_related("tasks__subtasks"), many=True).data)),
+                ("GET /api/tasks/", renderer.render(TaskSerializer(Task.objects.prefetch_related("subtasks"), many=True).data)),
+                ("GET /api/subtasks/", renderer.render(SubTaskSerializer(SubTask.objects.all(), many=True).data)),
+            ]
+            transaction.set_rollback(True)
+
+        for label, body in bodies:
+            self.stdout.write(f"{label} ({len(body):,} bytes)")
+            for encoding in CODECS:
+                for level in LEVELS[encoding]:
+                    timings = []
+                    for _ in range(options["repeat"]):
+                        start = time.perf_counter()
+                        size = len(compress(body, encoding, level))
+                        timings.append((time.perf_counter() - start) * 1000)
+                    ms = sorted(timings)[len(timings) // 2]
+                    self.stdout.write(
+                        f"  {f'{encoding} {level}':<10} {size:>12,} bytes  {100 - size * 100 / len(body):5.1f}% saved  {ms:9.2f} ms  {len(body) / 1e6 / (ms / 1000):8.1f} MB/s"
+                    )
@@ -0,0 +1,55 @@
+# python manage.py bench_json_renderer --lists 200 --tasks 20 --subtasks 5
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from myapi.renderers import FastJSONRenderer, orjson
+from myapp.models import List, Task, SubTask
+from myapp.serializers import ListSerializer, TaskSerializer, SubTaskSerializer
+
+
+class Command(BaseCommand):
+    help = "Encode time and size of the list endpoints' payloads with DRF's JSONRenderer and with FastJSONRenderer (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lists", type=int, default=200)
+        parser.add_argument("--tasks", type=int, default=20, help="tasks per list")
+        parser.add_argument("--subtasks", type=int, default=5, help="subtasks per task")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write("orjson isn't installed, FastJSONRenderer is DRF's JSONRenderer here")
+        with transaction.atomic():
+            lists = List.objects.bulk_create(List(list_name=f"List {i}") for i in range(options["lists"]))
+            tasks = Task.objects.bulk_create(
+                Task(task_name=f"Task {i}", completed=i % 3 == 0, parent_list=parent)
+                for parent in lists for i in range(options["tasks"])
+            )
+            SubTask.objects.bulk_create(
+                SubTask(sub_task_name=f"Sub task {i}", completed=i % 2 == 0, parent_task=parent)
+                for parent in tasks for i in range(options["subtasks"])
+            )
+            # the payloads the views hand to Response
+            payloads = [
+                ("GET /api/lists/", ListSerializer(List.objects.prefetch_related("tasks__subtasks"), many=True).data),
+                ("GET /api/tasks/", TaskSerializer(Task.objects.prefetch_related("subtasks"), many=True).data),
+                ("GET /api/subtasks/", SubTaskSerializer(SubTask.objects.all(), many=True).data),
+            ]
+            transaction.set_rollback(True)
+
+        for label, data in payloads:
+            before, after = JSONRenderer().render(data), FastJSONRenderer().render(data)
+            if before != after:
+                raise CommandError(f"{label}: FastJSONRenderer's output differs from JSONRenderer's")
+            drf = self.median_ms(lambda: JSONRenderer().render(data), options["repeat"])
+            fast = self.median_ms(lambda: FastJSONRenderer().render(data), options["repeat"])
+            self.stdout.write(f"{label:<20} {len(after):>12,} bytes   JSONRenderer {drf:8.2f} ms   FastJSONRenderer {fast:8.2f} ms   ({drf / fast:.1f}x)")
+
+    def median_ms(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,18 @@
+# python manage.py compact_changes [--tombstone-days 30]
+# Run it from cron, e.g. once a night
+from django.core.management.base import BaseCommand
+from myapp import changes
+
+
+class Command(BaseCommand):
+    help = "Remove sync change log entries nobody needs anymore: replaced entries and old tombstones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tombstone-days", type=int, default=None,
+            help=f"remove tombstones older than this (default SYNC['TOMBSTONE_DAYS'], {changes.DEFAULTS['TOMBSTONE_DAYS']})",
+        )
+
+    def handle(self, *args, **options):
+        replaced, tombstones = changes.compact(options["tombstone_days"])
+        self.stdout.write(f"{replaced} replaced entries and {tombstones} tombstones removed")
@@ -0,0 +1,104 @@
+# python manage.py explain_queries --lists 10000 --tasks 100 --subtasks 1
+# Seeds a big to-do tree (1M tasks and 1M subtasks by default), calls every filtered
+# endpoint, EXPLAINs each query it ran and fails if one of them reads a whole table.
+# Everything is rolled back afterwards. The full dumps (no filter at all) are left out,
+# reading every row is what they're asked to do.
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from myapi.benchmarks import analyze, explain, full_scans, report, time_calls
+from myapp.models import Change, List, SubTask, Task
+
+# {list} / {task} / {seq} are filled in with a list, a task and a change log seq from the seeded data
+CASES = [
+    "/api/tasks/?list={list}",
+    "/api/tasks/?list={list}&completed=false",
+    "/api/tasks/?list={list}&completed=true",
+    "/api/tasks/?completed=false&limit=100",
+    "/api/tasks/?completed=false&after={task}&limit=100",
+    "/api/tasks/?after={task}&limit=100",
+    "/api/tasks/summary/?list={list}&completed=false",
+    "/api/subtasks/?task={task}",
+    "/api/subtasks/?task={task}&completed=false",
+    "/api/subtasks/?completed=false&limit=100",
+    "/api/sync/?since={seq}&limit=100",
+]
+TABLES = [model._meta.db_table for model in [List, Task, SubTask, Change]]
+BATCH = 10_000
+
+
+def endpoint_queries(url):
+    # the SELECTs the endpoint runs for `url`
+    request = RequestFactory().get(url)
+    match = resolve(request.path_info)
+    with CaptureQueriesContext(connection) as captured:
+        response = match.func(request, *match.args, **match.kwargs)
+        response.render()
+    if response.status_code != 200:
+        raise CommandError(f"{url} answered {response.status_code}: {response.content[:200]}")
+    return [query["sql"] for query in captured.captured_queries if query["sql"].startswith("SELECT")]
+
+
+def scans(url):
+    # [(query, its plan, the lines reading a whole table)] for every query of `url`
+    plans = []
+    for sql in endpoint_queries(url):
+        plan = explain(sql)
+        plans.append((sql, plan, [line for table in TABLES for line in full_scans(plan, table)]))
+    return plans
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN every query of the filtered to-do endpoints against a seeded tree, fails if one needs a full table scan (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lists", type=int, default=10_000)
+        parser.add_argument("--tasks", type=int, default=100, help="tasks per list")
+        parser.add_argument("--subtasks", type=int, default=1, help="subtasks per task")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--plans", action="store_true", help="print the plan of every query")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options)
+            last_task = Task.objects.order_by("-id").values_list("id", flat=True).first()
+            ids = {
+                "list": List.objects.order_by("-id").values_list("id", flat=True)[options["lists"] // 2],
+                "task": last_task - options["lists"] * options["tasks"] // 2,
+                "seq": Change.objects.order_by("-seq").values_list("seq", flat=True)[options["lists"]],
+            }
+            failures = [case for case in CASES if not self.run_case(case.format(**ids), options)]
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(f"Full table scans for: {', '.join(failures)}")
+
+    def seed(self, options):
+        lists, tasks, subtasks = options["lists"], options["tasks"], options["subtasks"]
+        self.stdout.write(f"Seeding {lists} lists, {lists * tasks} tasks and {lists * tasks * subtasks} subtasks...")
+        # bulk_create doesn't send signals, the counters and the change log aren't kept up to date.
+        # Most tasks are done, like in a to-do app that has been used for a while
+        list_ids = []
+        for start in range(0, lists, BATCH):
+            list_ids += [row.id for row in List.objects.bulk_create(List(list_name=f"List {i}") for i in range(start, min(start + BATCH, lists)))]
+        for start in range(0, len(list_ids), max(1, BATCH // tasks)):
+            new_tasks = Task.objects.bulk_create(
+                Task(task_name=f"Task {i}", completed=i % 5 != 0, parent_list_id=list_id)
+                for list_id in list_ids[start:start + max(1, BATCH // tasks)] for i in range(tasks)
+            )
+            SubTask.objects.bulk_create(
+                SubTask(sub_task_name=f"Sub task {i}", completed=(task.id + i) % 5 != 0, parent_task_id=task.id)
+                for task in new_tasks for i in range(subtasks)
+            )
+            Change.objects.bulk_create(Change(kind="tasks", object_id=task.id) for task in new_tasks)
+        analyze(*TABLES)
+
+    def run_case(self, url, options):
+        plans = scans(url)
+        failed = any(lines for _, _, lines in plans)
+        report(self.stdout, f"{url:<50} {'SEQ SCAN' if failed else 'index'}", time_calls(lambda: endpoint_queries(url), options["repeat"]))
+        for sql, plan, lines in plans:
+            if options["plans"] or lines:
+                self.stdout.write(f"{sql}\n{plan}\n")
+        return not failed
@@ -0,0 +1,23 @@
+# python manage.py reconcile_counters [--dry-run]
+from django.core.management.base import BaseCommand
+from myapp import counters
+from myapp.models import List, Task
+
+
+class Command(BaseCommand):
+    help = "Recount List.task_count/completed_count and Task.subtask_count/completed_subtask_count where they drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="only report the rows that drifted")
+
+    def handle(self, *args, **options):
+        for model in [List, Task]:
+            total, done, _ = counters.COUNTERS[model]
+            rows = list(counters.drifted(model).values("id", total, done, "actual", "actual_done"))
+            for row in rows:
+                self.stdout.write(
+                    f"{model.__name__} {row['id']}: {total} {row[total]} -> {row['actual']}, {done} {row[done]} -> {row['actual_done']}"
+                )
+            if rows and not options["dry_run"]:
+                counters.recount(model, [row["id"] for row in rows])
+            self.stdout.write(f"{model.__name__}: {len(rows)} {'drifted' if options['dry_run'] else 'repaired'}")
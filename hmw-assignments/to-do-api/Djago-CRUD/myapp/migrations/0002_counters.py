@@ -0,0 +1,50 @@
+# Generated by Django 5.0 on 2026-10-18 16:29
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    # fill the new counters from the rows that are already there, one UPDATE per table
+    List, Task, SubTask = apps.get_model('myapp', 'List'), apps.get_model('myapp', 'Task'), apps.get_model('myapp', 'SubTask')
+
+    def counts(model, parent, **filters):
+        rows = model.objects.filter(**{parent: OuterRef('pk')}, **filters).order_by().values(parent)
+        return Coalesce(Subquery(rows.annotate(n=Count('id')).values('n'), output_field=IntegerField()), 0)
+
+    List.objects.update(task_count=counts(Task, 'parent_list'), completed_count=counts(Task, 'parent_list', completed=True))
+    Task.objects.update(
+        subtask_count=counts(SubTask, 'parent_task'), completed_subtask_count=counts(SubTask, 'parent_task', completed=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='list',
+            name='completed_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='completed_subtask_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='subtask_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
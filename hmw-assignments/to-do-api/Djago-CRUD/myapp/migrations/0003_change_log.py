@@ -0,0 +1,43 @@
+# Generated by Django 5.0 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+
+def log_existing(apps, schema_editor):
+    # every row that's already there gets one entry, so a client syncing from 0 receives all of them
+    Change, SyncState = apps.get_model('myapp', 'Change'), apps.get_model('myapp', 'SyncState')
+    SyncState.objects.create(id=1)
+    for kind, model in [('lists', 'List'), ('tasks', 'Task'), ('subtasks', 'SubTask')]:
+        ids = apps.get_model('myapp', model).objects.order_by('id').values_list('id', flat=True)
+        Change.objects.bulk_create((Change(kind=kind, object_id=id) for id in ids.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('compacted_through', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('lists', 'List'), ('tasks', 'Task'), ('subtasks', 'SubTask')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'object_id', 'seq'], name='change_object_seq_idx')],
+            },
+        ),
+        migrations.RunPython(log_existing, migrations.RunPython.noop),
+    ]
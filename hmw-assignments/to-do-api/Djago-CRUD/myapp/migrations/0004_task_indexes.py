@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-18 16:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0003_change_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subtask',
+            index=models.Index(fields=['parent_task', 'completed', 'id'], name='subtask_task_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subtask',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['id'], name='subtask_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['parent_list', 'completed', 'id'], name='task_list_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['id'], name='task_open_idx'),
+        ),
+        # the old single column indexes go once the composite ones that replace them exist
+        migrations.AlterField(
+            model_name='subtask',
+            name='parent_task',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='subtasks', to='myapp.task'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='parent_list',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='myapp.list'),
+        ),
+    ]
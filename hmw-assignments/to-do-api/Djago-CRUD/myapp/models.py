@@ -1,29 +1,140 @@
-from django.db import models
+from django.db import models, transaction
 
 # Create your models here.
-class List(models.Model):
+class LoggedModel(models.Model):
+    # Every save/delete is also written to the sync change log (Change below, see
+    # myapp/changes.py), in the same transaction as the row itself
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # the row, its change log entry and its parent's counters are written together or not at all
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class List(LoggedModel):
     id = models.BigAutoField(primary_key=True)  # Using BigInt for ID
     list_name = models.CharField(max_length=255)
+    # "x of y tasks done" without loading the tasks. Kept up to date by myapp/signals.py,
+    # `python manage.py reconcile_counters` repairs them if they ever drift
+    task_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
 
     def __str__(self):
         return self.list_name
 
 
-class Task(models.Model):
+class TrackedModel(LoggedModel):
+    # Knows the parent and `completed` the row has in the database, so the counter
+    # signals know whether a save moved or toggled it (or what a delete takes away)
+    parent_field = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_counted()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.remember_counted()
+
+    def remember_counted(self):
+        # None when the row was loaded without those columns (.only()/.defer())
+        parent_id, completed = self.__dict__.get(f"{self.parent_field}_id"), self.__dict__.get("completed")
+        self._counted = (parent_id, completed) if parent_id is not None and completed is not None else None
+
+    def lock_counted(self):
+        # What the instance was loaded with may be out of date: another request may have
+        # toggled or moved the row since. Read the row again and lock it until we commit,
+        # so two saves of the same row count one after the other, from what's really there
+        self._counted = type(self)._base_manager.select_for_update().filter(pk=self.pk).values_list(
+            f"{self.parent_field}_id", "completed"
+        ).first()
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self.pk is not None:
+                self.lock_counted()
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self.lock_counted()
+            return super().delete(*args, **kwargs)
+
+
+class Task(TrackedModel):
     id = models.BigAutoField(primary_key=True)
     task_name = models.CharField(max_length=255)
     completed = models.BooleanField(default=False)
-    parent_list = models.ForeignKey(List, related_name='tasks', on_delete=models.CASCADE)
+    # no index of its own, task_list_completed_idx starts with it
+    parent_list = models.ForeignKey(List, related_name='tasks', on_delete=models.CASCADE, db_index=False)
+    subtask_count = models.IntegerField(default=0)
+    completed_subtask_count = models.IntegerField(default=0)
+
+    parent_field = "parent_list"
+
+    class Meta:
+        # behind the filters in myapp/filters.py, `python manage.py explain_queries` checks them
+        indexes = [
+            # a list's tasks (?list=3, the prefetches, cascades), its (in)complete ones
+            # (?list=3&completed=false), both already in id order
+            models.Index(fields=["parent_list", "completed", "id"], name="task_list_completed_idx"),
+            # ?completed=false over every list. Partial: only the incomplete tasks are in it,
+            # a small part of the table once most tasks are done
+            models.Index(fields=["id"], condition=models.Q(completed=False), name="task_open_idx"),
+        ]
 
     def __str__(self):
         return self.task_name
 
 
-class SubTask(models.Model):
+class SubTask(TrackedModel):
     id = models.BigAutoField(primary_key=True)
     sub_task_name = models.CharField(max_length=255)
     completed = models.BooleanField(default=False)
-    parent_task = models.ForeignKey(Task, related_name='subtasks', on_delete=models.CASCADE)
+    # no index of its own, subtask_task_completed_idx starts with it
+    parent_task = models.ForeignKey(Task, related_name='subtasks', on_delete=models.CASCADE, db_index=False)
+
+    parent_field = "parent_task"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["parent_task", "completed", "id"], name="subtask_task_completed_idx"),
+            models.Index(fields=["id"], condition=models.Q(completed=False), name="subtask_open_idx"),
+        ]
+
+    def __str__(self):
+        return self.sub_task_name
+
+
+# The sync change log behind GET /api/sync/?since=<seq>. One row per write to a List, Task
+# or SubTask; deletes (cascaded ones too) leave a tombstone row with deleted=True
+class Change(models.Model):
+    KINDS = [("lists", "List"), ("tasks", "Task"), ("subtasks", "SubTask")]
+
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # finding the entries a newer one replaced, see changes.compact()
+            models.Index(fields=["kind", "object_id", "seq"], name="change_object_seq_idx"),
+        ]
 
     def __str__(self):
-        return self.sub_task_name
\ No newline at end of file
+        return f"{self.seq} {'delete' if self.deleted else 'save'} {self.kind} {self.object_id}"
+
+
+class SyncState(models.Model):
+    # A single row (id=1). Writers lock it while they add to the change log, and
+    # compacted_through is the newest seq whose tombstones may have been removed
+    compacted_through = models.BigIntegerField(default=0)
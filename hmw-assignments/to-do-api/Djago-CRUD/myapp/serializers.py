@@ -1,3 +1,4 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import List, Task, SubTask
 
@@ -13,9 +14,66 @@ class TaskSerializer(serializers.ModelSerializer):
         model = Task
         fields = ['id', 'task_name', 'completed', 'parent_list_id', 'subtasks']
 
+    # All of the tasks' subtasks come from ONE extra query instead of one query per task
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.prefetch_related(Prefetch("subtasks", queryset=SubTask.objects.order_by("id")))
+
 class ListSerializer(serializers.ModelSerializer):
     tasks = TaskSerializer(many=True, read_only=True)  # Nested Task
 
     class Meta:
         model = List
         fields = ['id', 'list_name', 'tasks']
+
+    # The whole List -> Task -> SubTask tree in 3 queries (lists, their tasks, those tasks'
+    # subtasks) however many lists and tasks there are. Django puts the nesting back together
+    # in memory and the nested serializers read it from the prefetch cache
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.prefetch_related(
+            Prefetch("tasks", queryset=Task.objects.order_by("id")),
+            Prefetch("tasks__subtasks", queryset=SubTask.objects.order_by("id")),
+        )
+
+
+# "x of y done" straight from the stored counters, no tasks/subtasks are loaded
+class ListSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = List
+        fields = ['id', 'list_name', 'task_count', 'completed_count']
+
+class TaskSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = ['id', 'task_name', 'completed', 'parent_list_id', 'subtask_count', 'completed_subtask_count']
+
+
+# Flat rows for /api/sync/, a changed task doesn't send its list or subtasks again.
+# The counters are left out, they change through update() and aren't in the change log
+class ListSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = List
+        fields = ['id', 'list_name']
+
+class TaskSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = ['id', 'task_name', 'completed', 'parent_list_id']
+
+
+# What a batch operation may write (myapp/batch.py). The parent is a plain id, the batch
+# checks all of them with one query instead of one query per operation
+class TaskWriteSerializer(serializers.ModelSerializer):
+    parent_list_id = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = Task
+        fields = ['task_name', 'completed', 'parent_list_id']
+
+class SubTaskWriteSerializer(serializers.ModelSerializer):
+    parent_task_id = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = SubTask
+        fields = ['sub_task_name', 'completed', 'parent_task_id']
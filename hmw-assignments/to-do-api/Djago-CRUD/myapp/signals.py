@@ -0,0 +1,66 @@
+# myapp/signals.py
+# Keeps the List/Task counters (myapp/counters.py) in step with every Task/SubTask
+# save() and delete(), cascades included, and writes every List/Task/SubTask save and
+# delete to the sync change log (myapp/changes.py). QuerySet.update() and bulk_create()
+# don't send these signals, code using them has to call counters.add_many() and
+# changes.record() itself.
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from . import changes, counters
+from .models import List, Task, SubTask
+
+PARENTS = {Task: List, SubTask: Task}
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=SubTask)
+def item_saved(sender, instance, created, **kwargs):
+    parent_model = PARENTS[sender]
+    parent_id = getattr(instance, f"{instance.parent_field}_id")
+    previous = getattr(instance, "_counted", None)
+    if not created and previous is None:
+        # we don't know what this row looked like before, count its parent again
+        counters.reconcile(parent_model, parent_model.objects.filter(id=parent_id))
+    elif created:
+        counters.add(parent_model, parent_id, 1, int(instance.completed))
+    else:
+        old_parent_id, was_completed = previous
+        if old_parent_id != parent_id:
+            # moved to another list/task
+            counters.add(parent_model, old_parent_id, -1, -int(was_completed))
+            counters.add(parent_model, parent_id, 1, int(instance.completed))
+        else:
+            counters.add(parent_model, parent_id, 0, int(instance.completed) - int(was_completed))
+    instance.remember_counted()
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=SubTask)
+def item_deleted(sender, instance, origin=None, **kwargs):
+    # Also sent for every Task/SubTask a List/Task delete cascades to. Cascades only run
+    # from a parent to its children, so then the parent is being deleted too and there's
+    # no counter left to update
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin is not None and origin_model is not sender:
+        return
+    parent_model = PARENTS[sender]
+    # the row as it was in the database (see TrackedModel.lock_counted), not as the instance says
+    parent_id, completed = getattr(instance, "_counted", None) or (getattr(instance, f"{instance.parent_field}_id"), instance.completed)
+    counters.add(parent_model, parent_id, -1, -int(completed))
+
+
+@receiver(post_save, sender=List)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=SubTask)
+def log_saved(sender, instance, **kwargs):
+    changes.record(sender, [instance.id])
+
+
+# Cascades included: deleting a List leaves a tombstone for each of its tasks and subtasks,
+# so a client that only holds some of them still learns they're gone
+@receiver(post_delete, sender=List)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=SubTask)
+def log_deleted(sender, instance, **kwargs):
+    changes.record(sender, [instance.id], deleted=True)
@@ -1,3 +1,457 @@
+import datetime
+import gzip
+import io
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+from datetime import timedelta
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from myapi.compression import brotli, zstandard
+from myapi.renderers import FastJSONParser, FastJSONRenderer
+from . import counters
+from .management.commands.explain_queries import CASES, scans
+from .models import Change, List, Task, SubTask
+from .serializers import ListSerializer
 
 # Create your tests here.
+def make_tree(lists, tasks, subtasks):
+    # `lists` lists with `tasks` tasks each, every task with `subtasks` subtasks
+    new_lists = List.objects.bulk_create(List(list_name=f"List {i}") for i in range(lists))
+    new_tasks = Task.objects.bulk_create(
+        Task(task_name=f"Task {i}", completed=i % 2 == 0, parent_list=parent) for parent in new_lists for i in range(tasks)
+    )
+    SubTask.objects.bulk_create(
+        SubTask(sub_task_name=f"Sub task {i}", parent_task=parent) for parent in new_tasks for i in range(subtasks)
+    )
+    return new_lists
+
+
+class ListViewTest(TestCase):
+    def test_001_list_tree_query_count_is_constant(self):
+        make_tree(1, 1, 1)
+        # lists + their tasks + those tasks' subtasks
+        with self.assertNumQueries(3):
+            self.client.get(reverse("list_view"))
+        make_tree(20, 10, 5)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("list_view"))
+        self.assertEquals(len(response.data), 21)
+
+    def test_002_list_tree_matches_the_nested_serializers(self):
+        make_tree(3, 4, 2)
+        response = self.client.get(reverse("list_view"))
+        # the same tree serialized the slow way, one query per list and per task. Those queries
+        # have no ORDER BY, so their rows are put in id order like the view's are
+        expected = ListSerializer(List.objects.order_by("id"), many=True).data
+        for todo_list in expected:
+            todo_list["tasks"] = sorted(todo_list["tasks"], key=lambda task: task["id"])
+            for task in todo_list["tasks"]:
+                task["subtasks"] = sorted(task["subtasks"], key=lambda subtask: subtask["id"])
+        self.assertEquals(response.json(), expected)
+
+    def test_003_tasks_query_count_is_constant(self):
+        make_tree(5, 10, 3)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("task_view"))
+        self.assertEquals(len(response.data[0]["subtasks"]), 3)
+
+
+
+class JSONRendererTest(TestCase):
+    # values whose JSON spelling could differ between orjson and DRF's json based renderer
+    data = {
+        "changed_at": datetime.datetime(2024, 11, 20, 8, 15, 0, 618249, tzinfo=datetime.timezone.utc),
+        "no_microseconds": datetime.datetime(2024, 11, 20, 8, 15, tzinfo=datetime.timezone.utc),
+        "date": datetime.date(2024, 11, 20),
+        "unicode": "Café \u2028 \u2029",
+        "huge": 2 ** 70,
+        1: [True, None, ("a", "b")],
+    }
+
+    def test_001_renders_the_same_bytes_as_drf(self):
+        with self.subTest():
+            self.assertEquals(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        with self.subTest():
+            with patch("myapi.renderers.orjson", None):
+                self.assertEquals(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        for body in [b'{"list_name": "Groceries", "tasks": [1, 2]}', '["Café"]'.encode()]:
+            with self.subTest(body=body):
+                self.assertEquals(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+
+    def test_002_api_responses_are_unchanged(self):
+        make_tree(3, 4, 2)
+        for url in [reverse("list_view"), "/api/sync/?since=0"]:
+            response = self.client.get(url)
+            with self.subTest(url=url):
+                self.assertEquals(response.content, JSONRenderer().render(response.data))
+
+class CompressionTest(TestCase):
+    def decompress(self, body, encoding):
+        if encoding == "gzip":
+            return gzip.decompress(body)
+        if encoding == "br":
+            return brotli.decompress(body)
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+
+    @skipUnless(brotli and zstandard, "needs `pip install brotli zstandard`")
+    def test_001_compressed_lists_decompress_to_the_same_body(self):
+        make_tree(5, 10, 2)
+        plain = self.client.get(reverse("list_view"))
+        for encoding in ["gzip", "br", "zstd"]:
+            response = self.client.get(reverse("list_view"), HTTP_ACCEPT_ENCODING=encoding)
+            with self.subTest(encoding=encoding):
+                self.assertEquals(response["Content-Encoding"], encoding)
+                self.assertIn("Accept-Encoding", response["Vary"])
+                self.assertLess(len(response.content), len(plain.content))
+            self.assertEquals(self.decompress(response.content, encoding), plain.content)
+
+    def test_002_small_responses_are_not_compressed(self):
+        make_tree(1, 1, 0)
+        response = self.client.get(reverse("list_view"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+class CountersTest(TestCase):
+    def counts(self, item):
+        item.refresh_from_db()
+        if isinstance(item, List):
+            return item.task_count, item.completed_count
+        return item.subtask_count, item.completed_subtask_count
+
+    def test_001_counters_follow_creates_toggles_moves_and_deletes(self):
+        groceries, chores = List.objects.create(list_name="Groceries"), List.objects.create(list_name="Chores")
+        milk = Task.objects.create(task_name="Milk", parent_list=groceries)
+        eggs = Task.objects.create(task_name="Eggs", completed=True, parent_list=groceries)
+        with self.subTest():
+            self.assertEquals(self.counts(groceries), (2, 1))
+        milk.completed = True
+        milk.save()
+        # saving again without a change doesn't count it twice
+        milk.save()
+        with self.subTest():
+            self.assertEquals(self.counts(groceries), (2, 2))
+        eggs = Task.objects.get(id=eggs.id)
+        eggs.parent_list = chores
+        eggs.save()
+        with self.subTest():
+            self.assertEquals((self.counts(groceries), self.counts(chores)), ((1, 1), (1, 1)))
+        SubTask.objects.create(sub_task_name="2%", parent_task=milk)
+        SubTask.objects.create(sub_task_name="Oat", completed=True, parent_task=milk)
+        with self.subTest():
+            self.assertEquals(self.counts(milk), (2, 1))
+        milk.subtasks.filter(completed=True).delete()
+        with self.subTest():
+            self.assertEquals(self.counts(milk), (1, 0))
+        milk.delete()
+        self.assertEquals(self.counts(groceries), (0, 0))
+
+    def test_002_deleting_a_list_cascades_without_touching_counters(self):
+        groceries = List.objects.create(list_name="Groceries")
+        for name in ["Milk", "Eggs"]:
+            SubTask.objects.create(sub_task_name="Brand", parent_task=Task.objects.create(task_name=name, parent_list=groceries))
+        # 2 selects to collect the cascade + 1 delete per table + a change log lock and tombstone
+        # per deleted row (see SyncTest), no counter UPDATEs for rows going away
+        with self.assertNumQueries(15):
+            groceries.delete()
+        self.assertFalse(SubTask.objects.exists())
+
+    def test_003_summary_endpoints(self):
+        groceries = List.objects.create(list_name="Groceries")
+        milk = Task.objects.create(task_name="Milk", completed=True, parent_list=groceries)
+        Task.objects.create(task_name="Eggs", parent_list=List.objects.create(list_name="Chores"))
+        SubTask.objects.create(sub_task_name="Oat", parent_task=milk)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("list_summary"))
+        with self.subTest():
+            self.assertEquals(response.json()[0], {"id": groceries.id, "list_name": "Groceries", "task_count": 1, "completed_count": 1})
+        response = self.client.get(reverse("task_summary"), {"list": groceries.id})
+        with self.subTest():
+            self.assertEquals([(task["task_name"], task["subtask_count"]) for task in response.json()], [("Milk", 1)])
+        self.assertEquals(self.client.get(reverse("task_summary"), {"list": "abc"}).status_code, 400)
+
+    def test_004_stale_instances_count_what_is_in_the_database(self):
+        groceries = List.objects.create(list_name="Groceries")
+        milk = Task.objects.create(task_name="Milk", parent_list=groceries)
+        # two requests load the same task and both mark it complete
+        first, second = Task.objects.get(id=milk.id), Task.objects.get(id=milk.id)
+        for request in [first, second]:
+            request.completed = True
+            request.save()
+        with self.subTest():
+            self.assertEquals(self.counts(groceries), (1, 1))
+        # another writer undoes it, we refresh and undo it too
+        second.completed = False
+        second.save()
+        first.refresh_from_db()
+        first.save()
+        with self.subTest():
+            self.assertEquals(self.counts(groceries), (1, 0))
+        # deleting a copy loaded before the task was completed again
+        second.completed = True
+        second.save()
+        first.delete()
+        self.assertEquals(self.counts(groceries), (0, 0))
+
+    def test_005_reconcile_repairs_drift(self):
+        make_tree(3, 4, 2)
+        # bulk_create doesn't send signals, every counter is still 0
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        with self.subTest():
+            self.assertIn("List: 3 repaired", out.getvalue())
+            self.assertIn("Task: 12 repaired", out.getvalue())
+        self.assertEquals(self.counts(List.objects.first()), (4, 2))
+        out = StringIO()
+        call_command("reconcile_counters", "--dry-run", stdout=out)
+        self.assertIn("List: 0 drifted", out.getvalue())
+
+
+class SyncTest(TestCase):
+    def sync(self, since=0, **params):
+        response = self.client.get(reverse("sync"), {"since": since, **params})
+        self.assertEquals(response.status_code, 200)
+        return response.json()
+
+    def test_001_sync_sends_only_what_changed_since(self):
+        groceries = List.objects.create(list_name="Groceries")
+        milk = Task.objects.create(task_name="Milk", parent_list=groceries)
+        first = self.sync()
+        with self.subTest():
+            self.assertEquals(first["lists"], [{"id": groceries.id, "list_name": "Groceries"}])
+            self.assertEquals(first["tasks"], [{"id": milk.id, "task_name": "Milk", "completed": False, "parent_list_id": groceries.id}])
+        milk.completed = True
+        milk.save()
+        milk.task_name = "Oat milk"
+        milk.save()
+        # entries, compacted_through, then only the tasks that changed
+        with self.assertNumQueries(3):
+            second = self.sync(first["seq"])
+        with self.subTest():
+            self.assertEquals([(task["task_name"], task["completed"]) for task in second["tasks"]], [("Oat milk", True)])
+            self.assertEquals((second["lists"], second["subtasks"]), ([], []))
+        self.assertEquals(self.sync(second["seq"])["seq"], second["seq"])
+
+    def test_002_cascade_deletes_leave_tombstones(self):
+        groceries = List.objects.create(list_name="Groceries")
+        milk = Task.objects.create(task_name="Milk", parent_list=groceries)
+        oat = SubTask.objects.create(sub_task_name="Oat", parent_task=milk)
+        ids, seq = (groceries.id, milk.id, oat.id), self.sync()["seq"]
+        groceries.delete()
+        changes = self.sync(seq)
+        with self.subTest():
+            self.assertEquals(changes["deleted"], {"lists": [ids[0]], "tasks": [ids[1]], "subtasks": [ids[2]]})
+        # created and deleted in between: only the tombstone is sent
+        self.assertEquals(self.sync()["lists"], [])
+
+    def test_003_sync_pages_through_the_log(self):
+        make_tree(1, 5, 0)
+        # bulk_create doesn't send signals
+        self.assertEquals(self.sync()["tasks"], [])
+        for task in Task.objects.order_by("id"):
+            task.save()
+        seq, seen, pages = 0, [], 0
+        while True:
+            page = self.sync(seq, limit=2)
+            seen += [task["id"] for task in page["tasks"]]
+            seq, pages = page["seq"], pages + 1
+            if not page["more"]:
+                break
+        self.assertEquals((seen, pages), (list(Task.objects.order_by("id").values_list("id", flat=True)), 3))
+
+    def test_004_compaction(self):
+        groceries = List.objects.create(list_name="Groceries")
+        for name in ["Milk", "Eggs", "Bread"]:
+            Task.objects.create(task_name=name, parent_list=groceries).delete()
+        seq = self.sync()["seq"]
+        groceries.list_name = "Food"
+        groceries.save()
+        out = StringIO()
+        call_command("compact_changes", stdout=out)
+        with self.subTest():
+            # the first save of groceries and the 3 saves before the deletes, the tombstones are new
+            self.assertIn("4 replaced entries and 0 tombstones removed", out.getvalue())
+            self.assertEquals(self.sync(seq)["lists"][0]["list_name"], "Food")
+        Change.objects.filter(deleted=True).update(changed_at=timezone.now() - timedelta(days=31))
+        call_command("compact_changes", stdout=StringIO())
+        behind = self.sync(1)
+        with self.subTest():
+            # its tombstones are gone, so it gets everything again
+            self.assertTrue(behind["reset"])
+            self.assertEquals(behind["lists"][0]["list_name"], "Food")
+        self.assertFalse(self.sync(seq)["reset"])
+
+    def test_005_paging_through_a_reset(self):
+        lists = [List.objects.create(list_name=f"L{i}") for i in range(5)]
+        Task.objects.create(task_name="Milk", parent_list=lists[0]).delete()
+        List.objects.create(list_name="L5")
+        Change.objects.filter(deleted=True).update(changed_at=timezone.now() - timedelta(days=31))
+        call_command("compact_changes", stdout=StringIO())
+        # a client behind the compacted tombstone starts over, 2 entries at a time, until it's done
+        page, names, pages = self.sync(1, limit=2), [], 0
+        with self.subTest():
+            self.assertTrue(page["reset"])
+        while True:
+            names += [todo_list["list_name"] for todo_list in page["lists"]]
+            pages += 1
+            if not page["more"]:
+                break
+            page = self.sync(page["seq"], limit=2, resync=page["resync"])
+            with self.subTest():
+                self.assertFalse(page["reset"])
+        with self.subTest():
+            self.assertEquals((names, pages), ([f"L{i}" for i in range(6)], 4))
+        # once done it's caught up like everybody else
+        self.assertFalse(self.sync(page["seq"])["reset"])
+
+    def test_006_bad_parameters(self):
+        response = self.client.get(reverse("sync"), {"since": "-1", "limit": "many"})
+        self.assertEquals(response.status_code, 400)
+        self.assertEquals(set(response.json()), {"since", "limit"})
+
+
+class BatchTest(TestCase):
+    def batch(self, operations):
+        return self.client.post(reverse("batch"), {"operations": operations}, content_type="application/json")
+
+    def assertCountersMatch(self):
+        for model in [List, Task]:
+            self.assertFalse(counters.drifted(model).exists())
+
+    def test_001_every_operation_in_one_batch(self):
+        groceries, chores = List.objects.create(list_name="Groceries"), List.objects.create(list_name="Chores")
+        milk = Task.objects.create(task_name="Milk", parent_list=groceries)
+        eggs = Task.objects.create(task_name="Eggs", parent_list=groceries)
+        bread = Task.objects.create(task_name="Bread", parent_list=groceries)
+        oat = SubTask.objects.create(sub_task_name="Oat", parent_task=milk)
+        brand = SubTask.objects.create(sub_task_name="Brand", parent_task=milk)
+        free_range = SubTask.objects.create(sub_task_name="Free range", parent_task=bread)
+        seq = self.client.get(reverse("sync")).json()["seq"]
+        response = self.batch([
+            {"op": "create", "type": "task", "data": {"task_name": "Dishes", "parent_list_id": chores.id}},
+            {"op": "complete", "type": "task", "id": milk.id},
+            {"op": "move", "type": "task", "id": eggs.id, "list": chores.id},
+            {"op": "update", "type": "subtask", "id": oat.id, "data": {"sub_task_name": "Oat milk", "completed": True}},
+            {"op": "delete", "type": "subtask", "id": brand.id},
+            {"op": "delete", "type": "task", "id": bread.id},
+        ])
+        with self.subTest():
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals([result["status"] for result in response.json()["results"]], [201, 200, 200, 200, 204, 204])
+            self.assertEquals(response.json()["results"][2]["data"]["parent_list_id"], chores.id)
+        with self.subTest():
+            self.assertEquals(sorted(Task.objects.values_list("task_name", "completed")), [("Dishes", False), ("Eggs", False), ("Milk", True)])
+            self.assertEquals(list(SubTask.objects.values_list("sub_task_name", "completed")), [("Oat milk", True)])
+        with self.subTest():
+            self.assertCountersMatch()
+        changes = self.client.get(reverse("sync"), {"since": seq}).json()
+        with self.subTest():
+            self.assertEquals(changes["deleted"], {"lists": [], "tasks": [bread.id], "subtasks": [brand.id, free_range.id]})
+        self.assertEquals(len(changes["tasks"]), 3)
+
+    def test_002_query_count_does_not_grow_with_the_batch(self):
+        make_tree(2, 60, 1)
+        counters.reconcile(List)
+        counters.reconcile(Task)
+        tasks = list(Task.objects.order_by("id").values_list("id", flat=True))
+        target = List.objects.last().id
+
+        def operations(n):
+            return (
+                [{"op": "create", "type": "task", "data": {"task_name": "New", "parent_list_id": target}} for _ in range(n)]
+                + [{"op": "complete", "type": "task", "id": id, "completed": False} for id in tasks[:n]]
+                + [{"op": "move", "type": "task", "id": id, "list": target} for id in tasks[n:2 * n]]
+                + [{"op": "delete", "type": "task", "id": id} for id in tasks[2 * n:3 * n]]
+            )
+
+        # lock the tasks, check the list, find the cascaded subtasks, 1 INSERT + 1 UPDATE + 2 DELETEs,
+        # 1 counter UPDATE per distinct change, a change log lock + INSERT per model and kind of change
+        with self.assertNumQueries(17):
+            self.assertEquals(self.batch(operations(2)).status_code, 200)
+        tasks = tasks[6:]
+        with self.assertNumQueries(17):
+            self.assertEquals(self.batch(operations(15)).status_code, 200)
+        self.assertCountersMatch()
+
+    def test_003_nothing_is_applied_when_one_operation_fails(self):
+        groceries = List.objects.create(list_name="Groceries")
+        milk = Task.objects.create(task_name="Milk", parent_list=groceries)
+        response = self.batch([
+            {"op": "complete", "type": "task", "id": milk.id},
+            {"op": "delete", "type": "task", "id": milk.id + 100},
+            {"op": "create", "type": "task", "data": {"parent_list_id": groceries.id}},
+            {"op": "move", "type": "task", "id": milk.id, "list": groceries.id + 100},
+            {"op": "archive", "type": "list"},
+        ])
+        with self.subTest():
+            self.assertEquals(response.status_code, 400)
+            self.assertEquals([result["status"] for result in response.json()["results"]], [424, 404, 400, 400, 400])
+            self.assertEquals(set(response.json()["results"][4]["errors"]), {"op", "type"})
+        with self.subTest():
+            self.assertFalse(Task.objects.get(id=milk.id).completed)
+        self.assertEquals(self.batch([]).status_code, 400)
+
+    def test_004_conflicting_operations(self):
+        groceries = List.objects.create(list_name="Groceries")
+        milk = Task.objects.create(task_name="Milk", parent_list=groceries)
+        oat = SubTask.objects.create(sub_task_name="Oat", parent_task=milk)
+        response = self.batch([
+            {"op": "delete", "type": "task", "id": milk.id},
+            {"op": "complete", "type": "subtask", "id": oat.id},
+            {"op": "create", "type": "subtask", "data": {"sub_task_name": "Soy", "parent_task_id": milk.id}},
+            {"op": "complete", "type": "task", "id": milk.id},
+        ])
+        with self.subTest():
+            self.assertEquals([result["status"] for result in response.json()["results"]], [424, 400, 400, 400])
+        # moving a subtask out of a task deleted in the same batch
+        eggs = Task.objects.create(task_name="Eggs", parent_list=groceries)
+        response = self.batch([
+            {"op": "move", "type": "subtask", "id": oat.id, "task": eggs.id},
+            {"op": "delete", "type": "task", "id": milk.id},
+        ])
+        with self.subTest():
+            self.assertEquals([result["status"] for result in response.json()["results"]], [400, 424])
+            self.assertEquals(response.json()["results"][0]["errors"], {"parent_task_id": [f"Task {milk.id} is deleted in this batch."]})
+        self.assertEquals((SubTask.objects.get(id=oat.id).parent_task_id, Task.objects.get(id=eggs.id).subtask_count), (milk.id, 0))
+
+
+class FilterTest(TestCase):
+    def test_001_task_and_subtask_filters(self):
+        first, second = make_tree(2, 4, 2)
+        open_tasks = self.client.get(reverse("task_view"), {"list": second.id, "completed": "false"}).json()
+        with self.subTest():
+            # make_tree completes every other task
+            self.assertEquals([task["task_name"] for task in open_tasks], ["Task 1", "Task 3"])
+            self.assertEquals(len(open_tasks[0]["subtasks"]), 2)
+        ids = list(Task.objects.order_by("id").values_list("id", flat=True))
+        page = self.client.get(reverse("task_view"), {"after": ids[2], "limit": 3}).json()
+        with self.subTest():
+            self.assertEquals([task["id"] for task in page], ids[3:6])
+        subtasks = self.client.get(reverse("subtask_view"), {"task": ids[0]}).json()
+        with self.subTest():
+            self.assertEquals({subtask["parent_task_id"] for subtask in subtasks}, {ids[0]})
+        summary = self.client.get(reverse("task_summary"), {"list": first.id, "completed": "true"}).json()
+        self.assertEquals([task["task_name"] for task in summary], ["Task 0", "Task 2"])
+
+    def test_002_bad_filters(self):
+        response = self.client.get(reverse("task_view"), {"list": "abc", "completed": "maybe", "limit": 5000})
+        with self.subTest():
+            self.assertEquals(response.status_code, 400)
+        self.assertEquals(set(response.json()), {"list", "completed", "limit"})
+
+    def test_003_filters_are_index_backed(self):
+        # every case of `explain_queries` has to be answerable without reading a whole table
+        if connection.vendor == "postgresql":
+            # the fixtures are tiny, make the planner prefer an index whenever one can be used
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        todo_list = make_tree(3, 5, 2)[1]
+        task = Task.objects.filter(parent_list=todo_list).first()
+        task.save()
+        for case in CASES:
+            url = case.format(list=todo_list.id, task=task.id, seq=0)
+            with self.subTest(url=url):
+                self.assertEquals([lines for _, _, lines in scans(url) if lines], [])
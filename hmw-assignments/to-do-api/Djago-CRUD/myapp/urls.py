@@ -1,8 +1,12 @@
 from django.urls import path, register_converter
-from .views import ListView, TaskView, SubTaskView
+from .views import ListView, TaskView, SubTaskView, ListSummaryView, TaskSummaryView, SyncView, BatchView
 
 urlpatterns = [
     path('api/lists/', ListView.as_view(), name='list_view'),
     path('api/tasks/', TaskView.as_view(), name='task_view'),
     path('api/subtasks/', SubTaskView.as_view(), name='subtask_view'),
+    path('api/lists/summary/', ListSummaryView.as_view(), name='list_summary'),
+    path('api/tasks/summary/', TaskSummaryView.as_view(), name='task_summary'),
+    path('api/sync/', SyncView.as_view(), name='sync'),
+    path('api/batch/', BatchView.as_view(), name='batch'),
 ]
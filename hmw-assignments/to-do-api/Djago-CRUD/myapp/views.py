@@ -2,26 +2,95 @@ from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from . import batch, changes
+from .filters import filter_items
 from .models import List, Task, SubTask
-from .serializers import ListSerializer, TaskSerializer, SubTaskSerializer
+from .serializers import (
+    ListSerializer, TaskSerializer, SubTaskSerializer, ListSummarySerializer, TaskSummarySerializer,
+    ListSyncSerializer, TaskSyncSerializer,
+)
 
 # Create your views here.
 class ListView(APIView):
     def get(self, request):
-        lists = List.objects.all()  # Fetch all Lists
+        # Fetch all Lists with their tasks and subtasks, 3 queries no matter how big the tree is
+        lists = ListSerializer.setup_eager_loading(List.objects.order_by('id'))
         serializer = ListSerializer(lists, many=True)
         return Response(serializer.data)
 
-# Task View - GET all Tasks
+# Task View - GET all Tasks, or some of them: ?list=<id>&completed=<bool>&after=<id>&limit=<n>
+# (see myapp/filters.py)
 class TaskView(APIView):
     def get(self, request):
-        tasks = Task.objects.all()  # Fetch all Tasks
+        tasks = filter_items(Task.objects.all(), request.query_params)
+        tasks = TaskSerializer.setup_eager_loading(tasks)  # and their subtasks
         serializer = TaskSerializer(tasks, many=True)
         return Response(serializer.data)
 
-# SubTask View - GET all SubTasks
+# SubTask View - GET all SubTasks, or some of them: ?task=<id>&completed=<bool>&after=<id>&limit=<n>
 class SubTaskView(APIView):
     def get(self, request):
-        subtasks = SubTask.objects.all()  # Fetch all SubTasks
+        subtasks = filter_items(SubTask.objects.all(), request.query_params)
         serializer = SubTaskSerializer(subtasks, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+# Summary Views - "x of y done" for dashboards, read from the counters on List/Task
+# in a single query instead of serializing the whole tree
+class ListSummaryView(APIView):
+    def get(self, request):
+        lists = List.objects.order_by('id')
+        return Response(ListSummarySerializer(lists, many=True).data)
+
+# GET /api/tasks/summary/?list=<id> for the tasks of one list, takes the same filters as /api/tasks/
+class TaskSummaryView(APIView):
+    def get(self, request):
+        tasks = filter_items(Task.objects.all(), request.query_params)
+        return Response(TaskSummarySerializer(tasks, many=True).data)
+
+
+# Sync View - GET /api/sync/?since=<seq>&resync=<bool>&limit=<n>, what changed after `seq` (0 for everything):
+#   {"seq": 42, "more": false, "reset": false, "resync": false,
+#    "lists": [...], "tasks": [...], "subtasks": [...],
+#    "deleted": {"lists": [ids], "tasks": [ids], "subtasks": [ids]}}
+# The client applies it, keeps "seq" for its next call and calls again right away while
+# "more" is true, passing back "resync" as it got it. "reset" means it was too far behind:
+# drop everything it has and keep paging from this response on. Rows are sent as they are NOW, so a row that changed 5
+# times since `seq` is sent once
+class SyncView(APIView):
+    SERIALIZERS = {"lists": ListSyncSerializer, "tasks": TaskSyncSerializer, "subtasks": SubTaskSerializer}
+
+    def get(self, request):
+        config = changes.config()
+        params, errors = {}, {}
+        for name, default in [("since", 0), ("limit", config["PAGE_SIZE"])]:
+            value = request.query_params.get(name, str(default))
+            if not value.isdigit():
+                errors[name] = ["A valid integer is required."]
+            else:
+                params[name] = int(value)
+        resync = request.query_params.get("resync", "false").lower()
+        if resync not in ("true", "false"):
+            errors["resync"] = ["Must be a valid boolean."]
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(params["limit"], 1), config["MAX_PAGE_SIZE"])
+
+        page = changes.since(params["since"], limit, resync=resync == "true")
+        data = {"seq": page["seq"], "more": page["more"], "reset": page["reset"], "resync": page["resync"]}
+        for kind, serializer in self.SERIALIZERS.items():
+            ids = page["saved"][kind]
+            # one query per kind. A row deleted after this page was read is simply missing,
+            # its tombstone comes with a later seq
+            rows = changes.MODELS[kind].objects.filter(id__in=ids).order_by("id") if ids else []
+            data[kind] = serializer(rows, many=True).data
+        data["deleted"] = page["deleted"]
+        return Response(data)
+
+
+# Batch View - POST /api/batch/ {"operations": [...]}, many Task/SubTask writes in one
+# request and one transaction, see myapp/batch.py for the operations
+class BatchView(APIView):
+    def post(self, request):
+        operations = request.data.get("operations") if isinstance(request.data, dict) else None
+        code, body = batch.run(operations)
+        return Response(body, status=code)